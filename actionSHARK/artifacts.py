@@ -0,0 +1,217 @@
+from typing import Iterable, Optional
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from time import sleep
+import os
+import threading
+import requests
+import logging
+
+from actionSHARK.ratelimit import RateGovernor
+
+
+# start logger
+logger = logging.getLogger("main.artifacts")
+
+
+class ArtifactDownloader:
+    """
+    Streaming artifact archives to a directory, skipping the downloaded ones and
+    resuming partial downloads"""
+
+    # bytes written at a time, an archive is never held in memory
+    chunk_size = 1024 * 1024
+
+    def __init__(
+        self,
+        directory: str,
+        session: requests.Session,
+        rate_governor: Optional[RateGovernor] = None,
+        workers: int = 4,
+        budget: Optional[int] = None,
+        retries: int = 3,
+    ) -> None:
+        """Initializing the download directory.
+
+        Args:
+            directory (str): Directory of the archives, named by artifact id.
+            session (requests.Session): Session to download with, e.g. GitHub.create_session.
+            rate_governor (RateGovernor, optional): Tokens and pacing of the requests. Defaults to unauthenticated requests.
+            workers (int): Number of concurrent downloads. Defaults to 4.
+            budget (int, optional): Maximum number of bytes to download, archives exceeding it are skipped. Defaults to None.
+            retries (int): Number of retries of a failed download. Defaults to 3.
+        """
+
+        self.directory = directory
+        self.session = session
+        self.rate_governor = rate_governor or RateGovernor()
+        self.workers = max(1, workers)
+        self.budget = budget
+        self.retries = retries
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__reserved = 0
+        self.__stats = {
+            "downloaded": 0,
+            "present": 0,
+            "over_budget": 0,
+            "failed": 0,
+            "bytes": 0,
+        }
+
+    def path(self, artifact_id: int) -> str:
+        """Path of a downloaded archive.
+
+        Args:
+            artifact_id (int): GitHub id of the artifact.
+        """
+        return os.path.join(self.directory, f"{artifact_id}.zip")
+
+    def download_all(self, artifacts: Iterable[dict]) -> dict:
+        """Download archives concurrently, a failed archive does not stop the others.
+
+        Args:
+            artifacts (Iterable[dict]): Artifacts with artifact_id, size_in_bytes and archive_download_url, e.g. Mongo.artifacts.
+
+        Returns:
+            dict: Number of downloaded, present, over_budget and failed archives and the downloaded bytes.
+        """
+
+        logger.debug(f"Start downloading artifacts to {self.directory}")
+
+        artifacts = iter(artifacts)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # submit a bounded number of downloads, the artifacts are read from
+            # mongo while the archives are downloaded
+            futures = set()
+            try:
+                while True:
+                    for artifact in islice(artifacts, 2 * self.workers - len(futures)):
+                        futures.add(executor.submit(self.__download_artifact, artifact))
+
+                    if not futures:
+                        break
+
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        status = future.result()
+                        with self.__lock:
+                            self.__stats[status] += 1
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        logger.debug(f"Finish downloading artifacts: {self.__stats}")
+
+        return dict(self.__stats)
+
+    def __download_artifact(self, artifact: dict) -> str:
+        """Download an archive, if it is not present and fits the budget.
+
+        Args:
+            artifact (dict): Artifact with artifact_id, size_in_bytes and archive_download_url.
+
+        Returns:
+            str: downloaded, present, over_budget or failed.
+        """
+
+        artifact_id = artifact["artifact_id"]
+        path = self.path(artifact_id)
+        if os.path.exists(path):
+            return "present"
+
+        # the bytes of a partial download were counted by an earlier crawl
+        partial_path = path + ".part"
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+        size = max(0, (artifact.get("size_in_bytes") or 0) - offset)
+
+        with self.__lock:
+            if self.budget is not None and self.__reserved + size > self.budget:
+                return "over_budget"
+            self.__reserved += size
+
+        attempt = 0
+        while True:
+            try:
+                self.__stream(artifact["archive_download_url"], partial_path)
+                break
+            except (requests.RequestException, OSError) as e:
+                # client errors, e.g. an expired archive, are not retried
+                client_error = (
+                    isinstance(e, requests.HTTPError) and e.response.status_code < 500
+                )
+                if attempt >= self.retries or client_error:
+                    logger.error(f"Downloading artifact {artifact_id} failed: {e!r}")
+
+                    # give the bytes not downloaded back to the budget
+                    written = (
+                        os.path.getsize(partial_path) - offset
+                        if os.path.exists(partial_path)
+                        else 0
+                    )
+                    with self.__lock:
+                        self.__reserved -= size - min(size, max(0, written))
+
+                    return "failed"
+
+                attempt += 1
+                sleep(2**attempt)
+
+        os.replace(partial_path, path)
+        return "downloaded"
+
+    def __stream(self, url: str, partial_path: str) -> None:
+        """Append the rest of an archive to its partial file.
+
+        Args:
+            url (str): Download url of the archive.
+            partial_path (str): File of the partial download.
+
+        Raises:
+            requests.HTTPError: If the download failed.
+        """
+
+        while True:
+            token, wait = self.rate_governor.acquire()
+            if wait > 0:
+                sleep(wait)
+
+            # continue after the bytes written by an interrupted download
+            offset = (
+                os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+            )
+
+            headers = {}
+            if token:
+                headers["Authorization"] = f"token {token}"
+            if offset:
+                headers["Range"] = f"bytes={offset}-"
+
+            # the archive is redirected to a storage url, without the token
+            with self.session.get(url, headers=headers, stream=True) as response:
+                retry = self.rate_governor.observe(
+                    token, response.status_code, response.headers
+                )
+                if retry:
+                    continue
+
+                # the partial file is already complete
+                if response.status_code == 416:
+                    return
+
+                response.raise_for_status()
+
+                # a server ignoring the range sends the whole archive again
+                mode = "ab" if response.status_code == 206 else "wb"
+                with open(partial_path, mode) as f:
+                    for chunk in response.iter_content(self.chunk_size):
+                        f.write(chunk)
+
+                        with self.__lock:
+                            self.__stats["bytes"] += len(chunk)
+
+                return
@@ -0,0 +1,517 @@
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple, Union
+import sys
+import time
+import asyncio
+import datetime as dt
+import logging
+from collections import deque
+
+import aiohttp
+
+from actionSHARK.checkpoint import Checkpoint
+from actionSHARK.http_cache import HTTPCache
+from actionSHARK.ratelimit import RateGovernor
+from actionSHARK.metrics import Metrics
+from actionSHARK.profiling import StageProfiler
+from actionSHARK.recording import Recorder
+from actionSHARK.client import BaseGitHub, Pagination
+
+
+# start logger
+logger = logging.getLogger("main.async_github")
+
+
+class AsyncGitHub(BaseGitHub):
+    """
+    Asynchronous alternative to GitHub, keeping several requests in flight"""
+
+    # request header default value
+    __headers = {"Accept": "application/vnd.github.v3+json"}
+
+    def __init__(
+        self,
+        save_mongo: Callable,
+        owner: Optional[str] = None,
+        repo: Optional[str] = None,
+        per_page: int = 100,
+        token: Optional[Union[str, List[str]]] = None,
+        concurrency: int = 10,
+        json_loads: Optional[Callable] = None,
+        since: Optional[dt.datetime] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        retries: int = 3,
+        http_cache: Optional[HTTPCache] = None,
+        rate_governor: Optional[RateGovernor] = None,
+        writers: int = 0,
+        write_queue_size: int = 10,
+        page_workers: int = 1,
+        run_shards: int = 0,
+        metrics: Optional[Metrics] = None,
+        profiler: Optional[StageProfiler] = None,
+        recorder: Optional[Recorder] = None,
+    ) -> None:
+        """Initializing essential variables.
+
+        Args:
+            save_mongo (callable): Callable function to save items in MongoDB.
+            owner (str): Owner of the repository.
+            repo (str): The repository name.
+            per_page (int): Number of items in a response. Defaults to 100.
+            token (str or List[str]): GitHub token(s) to use in header to autherize requests.
+            concurrency (int): Maximum number of requests in flight. Defaults to 10.
+            json_loads (callable, optional): Function decoding response bodies. Defaults to orjson if installed.
+            since (datetime, optional): Only fetch runs and artifacts created since this UTC time. Defaults to None.
+            checkpoint (Checkpoint, optional): Position of the crawl to resume from and to update. Defaults to None.
+            retries (int): Number of retries of a failed request before aborting. Defaults to 3.
+            http_cache (HTTPCache, optional): Cache of responses to send conditional requests. Defaults to None.
+            rate_governor (RateGovernor, optional): Pacing of the requests with its own token pool, replaces token. Defaults to None.
+            writers (int): Number of writer threads saving pages while fetching, 0 saves each page before the next request. Defaults to 0.
+            write_queue_size (int): Number of fetched pages waiting for the writers. Defaults to 10.
+            page_workers (int): Number of pages of a listing fetched concurrently, once the number of pages is known. Defaults to 1.
+            run_shards (int): Number of created date windows of the runs listed concurrently, 0 lists all runs with one query. Defaults to 0.
+            metrics (Metrics, optional): Metrics shared with other clients. Defaults to new metrics.
+            profiler (StageProfiler, optional): Profiles each stage of run(), workflows and artifacts are fetched in one stage. Defaults to None.
+            recorder (Recorder, optional): Records the raw items of each saved page to be replayed. Defaults to None.
+        """
+
+        super().__init__(
+            save_mongo,
+            owner,
+            repo,
+            per_page,
+            token,
+            json_loads=json_loads,
+            since=since,
+            checkpoint=checkpoint,
+            retries=retries,
+            http_cache=http_cache,
+            rate_governor=rate_governor,
+            writers=writers,
+            write_queue_size=write_queue_size,
+            page_workers=page_workers,
+            run_shards=run_shards,
+            metrics=metrics,
+            profiler=profiler,
+            recorder=recorder,
+        )
+
+        self.__headers = dict(self.__headers)
+        self.concurrency = max(1, concurrency)
+
+        # created inside the running event loop
+        self.__session = None
+        self.__semaphore = None
+        self.__run_ids_lock = None
+
+    async def authenticate_user(self) -> bool:
+        """
+        Authenticate the passed tokens by requesting user information,
+        invalid tokens are removed from the pool."""
+
+        for token in self.token_pool.tokens:
+            if not token:
+                continue
+
+            async with self.__session.get(
+                self.api_url + "user", headers={"Authorization": f"token {token}"}
+            ) as basic_auth:
+                self._authenticated(
+                    token, basic_auth.status, basic_auth.reason, basic_auth.headers
+                )
+
+        return self._finish_authentication()
+
+    async def __in_executor(self, func: Callable, *args):
+        """Run a blocking function, e.g. saving to mongo, without blocking the event loop.
+
+        Args:
+            func (callable): The blocking function.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, func, *args)
+
+    async def __get(
+        self, github_url: str, headers: Optional[dict] = None
+    ) -> Tuple[int, Any, Optional[bytes]]:
+        """GET a url, rotating tokens on rate limits and retrying server and
+        connection errors with a backoff.
+
+        Args:
+            github_url (str): GitHub API url.
+            headers (dict, optional): Additional request headers. Defaults to None.
+
+        Returns:
+            Tuple[int, Any, Optional[bytes]]: status, response headers and raw body of a 200 response.
+        """
+
+        attempt = 0
+        while True:
+            token, sleep_time = self._reserve_token()
+            if sleep_time > 0:
+                await asyncio.sleep(sleep_time)
+
+            request_headers = dict(headers or {})
+            if token:
+                request_headers["Authorization"] = f"token {token}"
+
+            try:
+                # only the request itself counts against the concurrency cap
+                async with self.__semaphore:
+                    start = time.monotonic()
+                    async with self.__session.get(
+                        github_url, headers=request_headers
+                    ) as response:
+                        status = response.status
+                        response_headers = response.headers
+                        body = await response.read() if status != 304 else None
+            except aiohttp.ClientError as e:
+                await asyncio.sleep(self._retry_delay(attempt, github_url, repr(e)))
+                attempt += 1
+                continue
+
+            if self._received(
+                github_url,
+                token,
+                status,
+                response_headers,
+                body,
+                time.monotonic() - start,
+            ):
+                continue
+
+            if status in [200, 304]:
+                return status, response_headers, body
+
+            error = f"status_code: {status}"
+            await asyncio.sleep(self._retry_delay(attempt, github_url, error, status))
+            attempt += 1
+
+    async def paginating(
+        self,
+        github_url: str,
+        action: str,
+        checker: Optional[str] = None,
+        incremental: bool = False,
+        track_pages: bool = False,
+    ) -> None:
+        """Fetch all pages for an action and handel API limitation.
+
+        Args:
+            github_url (str): GitHub API url to loop over and collect responses.
+            action (str): Action name of the fetched items, passed to save_mongo.
+            checker (str, optional): The key to the element, who has all items. Defaults to None.
+            incremental (bool): Stop at the first item older than since, items must be sorted newest first. Defaults to False.
+            track_pages (bool): Start from and record the page in the checkpoint. Defaults to False.
+        """
+
+        pagination = self._pagination(
+            github_url, action, checker, incremental, track_pages
+        )
+
+        while not pagination.done:
+            page = pagination.page
+            data, headers = await self.__fetch_page(pagination.page_url())
+
+            response_JSON = pagination.take(data, headers)
+            if response_JSON:
+                await self.__save(response_JSON, action, pagination.on_saved(page))
+                self.metrics.inc("pages_total", action=action)
+
+            pages = pagination.fan_out_pages()
+            if pages:
+                await self.__fan_out(pagination, pages)
+
+    async def __fetch_page(self, page_url: str) -> Tuple[Any, Any]:
+        """GET and decode a page, sending a conditional request if it is cached.
+
+        Args:
+            page_url (str): Url of the page.
+
+        Returns:
+            Tuple[Any, Any]: The decoded body and the response headers.
+        """
+
+        # send conditional requests for cached pages, the cache files are read
+        # and written in the executor
+        use_cache = bool(self.http_cache)
+
+        while True:
+            # a 304 response does not count against the rate limit
+            cache_headers = {}
+            if use_cache:
+                cache_headers = await self.__in_executor(
+                    self.http_cache.validators, page_url
+                )
+            status, headers, body = await self.__get(page_url, cache_headers)
+
+            if status == 304:
+                body = await self.__in_executor(self.http_cache.body, page_url)
+
+                # the entry was evicted meanwhile, request the page again
+                if body is None:
+                    use_cache = False
+                    continue
+            elif self.http_cache:
+                await self.__in_executor(self.http_cache.store, page_url, headers, body)
+
+            return self.json_loads(body), headers
+
+    async def __fan_out(self, pagination: Pagination, pages: range) -> None:
+        """Fetch pages concurrently and save them in page order.
+
+        Args:
+            pagination (Pagination): The listing, taking the pages.
+            pages (range): Pages to fetch.
+        """
+
+        pages = iter(pages)
+
+        # fetch a bounded number of pages ahead of the saved one
+        window = deque()
+
+        def submit() -> None:
+            page = next(pages, None)
+            if page is not None:
+                task = asyncio.ensure_future(
+                    self.__fetch_page(pagination.page_url(page))
+                )
+                window.append((page, task))
+
+        try:
+            for _ in range(2 * self.page_workers):
+                submit()
+
+            while window and not pagination.done:
+                page, task = window.popleft()
+                data, _ = await task
+
+                response_JSON = pagination.take_page(page, data)
+                if not response_JSON:
+                    break
+
+                submit()
+                self.metrics.inc("pages_total", action=pagination.action)
+                await self.__save(
+                    response_JSON, pagination.action, pagination.on_saved(page)
+                )
+        finally:
+            # do not fetch pages past an empty one or an error
+            for _, task in window:
+                task.cancel()
+            await asyncio.gather(*[task for _, task in window], return_exceptions=True)
+
+    async def __save(
+        self,
+        documents: List[dict],
+        action: str,
+        on_saved: Optional[Callable] = None,
+    ) -> None:
+        """Save a page right away, or queue it for the writers.
+
+        Args:
+            documents (List[dict]): Items of the page, may be empty to only call on_saved.
+            action (str): Action name of the items.
+            on_saved (callable, optional): Called after the page and all pages before are saved. Defaults to None.
+        """
+
+        # submit blocks while the queue is full
+        if self._pipeline:
+            await self.__in_executor(self._pipeline.submit, documents, action, on_saved)
+            return
+
+        if documents:
+            await self.__in_executor(self._save_documents, documents, action)
+
+        if on_saved:
+            await self.__in_executor(on_saved)
+
+    async def __drain(self) -> None:
+        """Wait for the writers, before the next stage reads the saved documents."""
+        if self._pipeline:
+            await self.__in_executor(self._pipeline.drain)
+
+    async def get_workflows(self) -> None:
+        """Fetching workflows data from GitHub API."""
+
+        logger.debug(f"Start fetching workflows")
+        await self.paginating(*self._listing("workflow"))
+        logger.debug(f"Finish fetching workflows")
+
+    async def get_runs(self) -> None:
+        """Fetching workflows' runs data from GitHub API."""
+
+        logger.debug(f"Start fetching runs")
+        if self.run_shards:
+            await self.__get_sharded_runs()
+        else:
+            await self.paginating(*self._listing("run"))
+        logger.debug(f"Finish fetching runs")
+
+    async def __get_sharded_runs(self) -> None:
+        """Fetch the runs in created date windows concurrently, a window with
+        more runs than the result cap of a query is split in halves.
+        """
+
+        # the first window starts with the repository
+        created_at = None
+        if not self.since:
+            data, _ = await self.__fetch_page(self._action_url("repository"))
+            created_at = data["created_at"]
+
+        windows = self._run_windows(created_at)
+        await self.__gather(*[self.__fetch_run_window(*w) for w in windows])
+
+        logger.debug(f"Listed {len(self._listed_runs)} runs in sharded windows")
+
+    async def __fetch_run_window(self, start: dt.datetime, end: dt.datetime) -> None:
+        """Fetch all runs created in a window, splitting it in halves if it has
+        more runs than the result cap.
+
+        Args:
+            start (datetime): First created second of the window, naive UTC.
+            end (datetime): Last created second of the window, naive UTC.
+        """
+
+        pagination = self._pagination(
+            self._window_url(start, end), "run", "workflow_runs", fan_out=False
+        )
+
+        while not pagination.done:
+            data, _ = await self.__fetch_page(pagination.page_url())
+            if pagination.page == 1:
+                halves = self._split_capped_window(start, end, data)
+                if halves:
+                    await self.__gather(*[self.__fetch_run_window(*w) for w in halves])
+                    return
+
+            # a run is only saved by the first window listing it
+            runs = self._unlisted_runs(pagination.take(data))
+
+            self.metrics.inc("pages_total", action="run")
+            if runs:
+                await self.__save(runs, "run")
+
+    async def get_jobs(self, run_id: int) -> None:
+        """Fetching runs' jobs data from GitHub API for specific run id.
+
+        Args:
+            run_id (int): Run id to get the jobs.
+        """
+        await self.paginating(*self._listing("job", run_id=run_id))
+
+    async def get_artifacts(self) -> None:
+        """Fetching artifacts data from GitHub API."""
+
+        logger.debug(f"Start fetching artifacts")
+        await self.paginating(*self._listing("artifact"))
+        logger.debug(f"Finish fetching artifacts")
+
+    async def __jobs_worker(self, run_ids: Iterator[int]) -> None:
+        """Fetch jobs for run ids taken from a shared iterator.
+
+        Args:
+            run_ids (Iterator[int]): Iterator shared between all workers.
+        """
+        while True:
+            # the run ids are queried from mongo in the executor, a generator
+            # can only be advanced by one worker at a time
+            async with self.__run_ids_lock:
+                run_id = await self.__in_executor(next, run_ids, None)
+
+            if run_id is None:
+                return
+
+            await self.get_jobs(run_id)
+
+            # the run is finished after its jobs are saved
+            await self.__save([], "job", self._run_done(run_id))
+
+    async def __gather(self, *coroutines) -> None:
+        """Run coroutines concurrently, cancelling the others if one fails."""
+
+        tasks = [asyncio.ensure_future(c) for c in coroutines]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def __fetch_action(self, action: str, fetch: Callable) -> None:
+        """Fetch an action, unless it was finished before resuming.
+
+        Args:
+            action (str): Action name.
+            fetch (callable): Coroutine function fetching the action.
+        """
+        if self._skip_action(action):
+            return
+
+        await fetch()
+
+        # runs need the saved workflows, jobs need the saved runs
+        await self.__drain()
+        await self.__in_executor(self.checkpoint.action_done, action)
+
+    async def run(
+        self, run_ids: Optional[Callable[[Optional[dt.datetime]], Iterable[int]]] = None
+    ) -> None:
+        """Collect all action's data form a repository.
+
+        Args:
+            run_ids (callable): Called with since to get the stored run ids of the repository in ascending order, e.g. Mongo.run_ids.
+
+        Raises:
+            GitHubRequestError: If a request failed, the checkpoint is saved before.
+        """
+
+        if not run_ids:
+            logger.error("Run ids source is not passed")
+            logger.error("Run ids source is needed to get Jobs")
+            sys.exit(1)
+
+        self.__semaphore = asyncio.Semaphore(self.concurrency)
+        self.__run_ids_lock = asyncio.Lock()
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+
+        self.__session = aiohttp.ClientSession(
+            headers=self.__headers, connector=connector
+        )
+
+        self._open_pipeline()
+
+        try:
+            # verify correct tokens if any
+            if self._needs_authentication() and not await self.authenticate_user():
+                sys.exit(1)
+
+            # workflows and artifacts are independent, runs need the workflows
+            with self._stage("workflow_artifact"):
+                await self.__gather(
+                    self.__fetch_action("workflow", self.get_workflows),
+                    self.__fetch_action("artifact", self.get_artifacts),
+                )
+            with self._stage("run"):
+                await self.__fetch_action("run", self.get_runs)
+
+            # only fetch jobs of runs listed by an incremental crawl,
+            # the ids are streamed in ascending order to resume
+            logger.debug(f"Start fetching jobs with concurrency {self.concurrency}")
+            with self._stage("job"):
+                run_ids = self.checkpoint.pending_runs(run_ids(self.since))
+                await self.__gather(
+                    *[self.__jobs_worker(run_ids) for _ in range(self.concurrency)]
+                )
+                await self.__drain()
+            logger.debug(f"Finish fetching jobs")
+        except BaseException:
+            await self.__in_executor(self._interrupted)
+            raise
+        finally:
+            await self.__session.close()
+            self.__session = None
+
+        await self.__in_executor(self._close_pipeline)
+        await self.__in_executor(self.checkpoint.clear)
+
+        self._finishing_message()
@@ -0,0 +1,104 @@
+from typing import Callable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import re
+import time
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.batch")
+
+
+def read_manifest(path: str) -> List[Tuple[str, str]]:
+    """Read the repositories of a batch crawl.
+
+    Args:
+        path (str): File with one repository url or "owner/repository" per line, '#' starts a comment.
+
+    Returns:
+        List[Tuple[str, str]]: Owner and name of each repository.
+    """
+
+    repositories = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+
+            # urls like https://github.com/owner/repository.git
+            parts = re.sub(r"\.git$", "", line.rstrip("/")).split("/")
+            if len(parts) < 2:
+                logger.error(f"Skipping invalid manifest line: {line}")
+                continue
+
+            repository = (parts[-2], parts[-1])
+            if repository not in repositories:
+                repositories.append(repository)
+
+    return repositories
+
+
+def run_batch(
+    repositories: List[Tuple[str, str]],
+    crawl: Callable[[str, str], None],
+    repo_workers: int = 1,
+) -> List[dict]:
+    """Crawl several repositories concurrently, a failed repository does not
+    stop the others.
+
+    Args:
+        repositories (List[Tuple[str, str]]): Owner and name of each repository.
+        crawl (callable): Called with owner and name to crawl one repository.
+        repo_workers (int): Number of repositories crawled at the same time. Defaults to 1.
+
+    Returns:
+        List[dict]: repository, status, error and seconds of each crawl.
+    """
+
+    total = len(repositories)
+    done = []
+
+    def crawl_repository(index: int, owner: str, repo: str) -> dict:
+        name = f"{owner}/{repo}"
+        logger.debug(f"[{index}/{total}] Start crawling {name}")
+
+        start = time.monotonic()
+        error: Optional[str] = None
+        try:
+            crawl(owner, repo)
+        except (Exception, SystemExit) as e:
+            # SystemExit is raised by the clients on invalid arguments or tokens
+            error = repr(e)
+            logger.error(f"[{index}/{total}] Crawling {name} failed: {error}")
+
+        result = {
+            "repository": name,
+            "status": "failed" if error else "finished",
+            "error": error,
+            "seconds": round(time.monotonic() - start, 1),
+        }
+
+        done.append(result)
+        logger.debug(
+            f"[{index}/{total}] {result['status'].capitalize()} {name} "
+            f"in {result['seconds']}s, {len(done)} of {total} done"
+        )
+
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, repo_workers)) as executor:
+        futures = [
+            executor.submit(crawl_repository, index, owner, repo)
+            for index, (owner, repo) in enumerate(repositories, start=1)
+        ]
+        results = [future.result() for future in futures]
+
+    failed = [r for r in results if r["status"] == "failed"]
+    logger.debug(
+        f"Batch finished: {total - len(failed)} of {total} repositories crawled"
+    )
+    for result in failed:
+        logger.error(f"Failed: {result['repository']} {result['error']}")
+
+    return results
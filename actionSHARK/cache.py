@@ -0,0 +1,95 @@
+from typing import Any, Callable, Hashable
+from collections import OrderedDict
+import threading
+
+
+class LRUCache:
+    """
+    Bounded thread safe mapping, evicting the least recently used entries"""
+
+    def __init__(self, maxsize: int = 100000, cache_none: bool = True) -> None:
+        """Initializing an empty cache.
+
+        Args:
+            maxsize (int): Maximum number of entries. Defaults to 100000.
+            cache_none (bool): Keep loaded None values, e.g. for entries known to be missing. Defaults to True.
+        """
+
+        self.maxsize = max(1, maxsize)
+        self.cache_none = cache_none
+
+        self.hits = 0
+        self.misses = 0
+
+        self.__lock = threading.Lock()
+        self.__data = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.__lock:
+            return key in self.__data
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Add or replace an entry.
+
+        Args:
+            key (Hashable): Key of the entry.
+            value (Any): Value of the entry.
+        """
+        with self.__lock:
+            self.__data[key] = value
+            self.__data.move_to_end(key)
+
+            if len(self.__data) > self.maxsize:
+                self.__data.popitem(last=False)
+
+    def get_or_load(self, key: Hashable, loader: Callable) -> Any:
+        """Return a cached entry, or load and cache it on a miss.
+
+        Args:
+            key (Hashable): Key of the entry.
+            loader (callable): Called with the key to load a missing entry.
+
+        Returns:
+            Any: The cached or loaded value.
+        """
+        with self.__lock:
+            if key in self.__data:
+                self.hits += 1
+                self.__data.move_to_end(key)
+                return self.__data[key]
+
+            self.misses += 1
+
+        # load outside of the lock, a concurrent load of the same key is harmless
+        value = loader(key)
+
+        if value is not None or self.cache_none:
+            self.put(key, value)
+
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self.__lock:
+            self.__data.clear()
+
+    def stats(self) -> dict:
+        """Summary of the cache usage.
+
+        Returns:
+            dict: size, hits, misses and hit_rate.
+        """
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 4),
+        }
@@ -0,0 +1,150 @@
+from typing import Iterable, Iterator, Optional
+from collections import deque
+import threading
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.checkpoint")
+
+
+class Checkpoint:
+    """
+    Position of a crawl, to resume a failed crawl where it stopped"""
+
+    def __init__(self, store=None, resume: bool = False, interval: int = 100) -> None:
+        """Load or reset the checkpoint of a repository.
+
+        Args:
+            store (Mongo, optional): Object with load_checkpoint, save_checkpoint and clear_checkpoint. Defaults to None.
+            resume (bool): Continue from the stored checkpoint instead of starting over. Defaults to False.
+            interval (int): Number of finished runs between two saves of the jobs position. Defaults to 100.
+        """
+
+        self.store = store
+        self.interval = max(1, interval)
+
+        self.__lock = threading.Lock()
+        self.__reset()
+
+        if not self.store:
+            return
+
+        if resume:
+            self.__state.update(self.store.load_checkpoint() or {})
+            logger.debug(f"Resuming crawl from checkpoint {self.__state}")
+        else:
+            self.store.clear_checkpoint()
+
+    def __reset(self) -> None:
+        """Start from the beginning of a crawl."""
+        self.__state = {"completed_actions": [], "pages": {}, "last_run_id": None}
+
+        # run ids handed out to fetch jobs in order, and the finished ones
+        self.__in_flight = deque()
+        self.__finished_runs = set()
+        self.__unsaved_runs = 0
+
+    @property
+    def last_run_id(self) -> Optional[int]:
+        return self.__state["last_run_id"]
+
+    def save(self) -> None:
+        """Persist the current position."""
+        if not self.store:
+            return
+
+        with self.__lock:
+            state = {
+                "completed_actions": list(self.__state["completed_actions"]),
+                "pages": dict(self.__state["pages"]),
+                "last_run_id": self.__state["last_run_id"],
+            }
+            self.__unsaved_runs = 0
+
+        self.store.save_checkpoint(state)
+
+    def clear(self) -> None:
+        """Remove the stored position after a successful crawl."""
+        with self.__lock:
+            self.__reset()
+
+        if self.store:
+            self.store.clear_checkpoint()
+
+    def is_completed(self, action: str) -> bool:
+        """Check if an action was already fetched completely.
+
+        Args:
+            action (str): Action name.
+        """
+        return action in self.__state["completed_actions"]
+
+    def start_page(self, action: str) -> int:
+        """First page to fetch for an action.
+
+        Args:
+            action (str): Action name.
+        """
+        return self.__state["pages"].get(action, 1)
+
+    def page_done(self, action: str, page: int) -> None:
+        """Record a page of an action as saved.
+
+        Args:
+            action (str): Action name.
+            page (int): The saved page number.
+        """
+        with self.__lock:
+            self.__state["pages"][action] = page + 1
+        self.save()
+
+    def action_done(self, action: str) -> None:
+        """Record an action as fetched completely.
+
+        Args:
+            action (str): Action name.
+        """
+        with self.__lock:
+            self.__state["pages"].pop(action, None)
+            self.__state["completed_actions"].append(action)
+        self.save()
+
+    def pending_runs(self, run_ids: Iterable[int]) -> Iterator[int]:
+        """Skip the run ids finished before, and track the handed out ones.
+        The run ids must be sorted in ascending order.
+
+        Args:
+            run_ids (Iterable[int]): Run ids to fetch jobs for.
+        """
+        last_run_id = self.last_run_id
+
+        for run_id in run_ids:
+            if last_run_id is not None and run_id <= last_run_id:
+                continue
+
+            with self.__lock:
+                self.__in_flight.append(run_id)
+
+            yield run_id
+
+    def run_done(self, run_id: int) -> None:
+        """Record the jobs of a run as saved. The stored position only moves
+        past runs, whose preceding runs are finished as well.
+
+        Args:
+            run_id (int): Run id.
+        """
+        with self.__lock:
+            self.__finished_runs.add(run_id)
+
+            while self.__in_flight and self.__in_flight[0] in self.__finished_runs:
+                finished = self.__in_flight.popleft()
+                self.__finished_runs.discard(finished)
+                self.__state["last_run_id"] = finished
+                self.__unsaved_runs += 1
+
+            should_save = self.__unsaved_runs >= self.interval
+
+        if should_save:
+            self.save()
@@ -0,0 +1,736 @@
+from typing import Any, Callable, List, Mapping, Optional, Tuple, Union
+from contextlib import nullcontext
+from functools import partial
+import re
+import sys
+import math
+import json
+import threading
+import datetime as dt
+import logging
+
+from actionSHARK.checkpoint import Checkpoint
+from actionSHARK.http_cache import HTTPCache
+from actionSHARK.tokens import TokenPool
+from actionSHARK.ratelimit import RateGovernor
+from actionSHARK.pipeline import WritePipeline
+from actionSHARK.metrics import Metrics, endpoint
+from actionSHARK.profiling import StageProfiler
+from actionSHARK.recording import Recorder
+
+# use the faster orjson decoder if installed
+try:
+    import orjson
+
+    default_json_loads = orjson.loads
+except ImportError:
+    default_json_loads = json.loads
+
+
+# start logger
+logger = logging.getLogger("main.client")
+
+# timestamp format of the API and its created queries
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def created_before(item: dict, since: Optional[dt.datetime] = None) -> bool:
+    """Check if an item was created before an incremental high-water mark.
+
+    Args:
+        item (dict): Item with a 'created_at' timestamp.
+        since (datetime, optional): High-water mark as naive UTC datetime.
+
+    Returns:
+        bool
+    """
+    created_at = item.get("created_at")
+    if not since or not created_at:
+        return False
+
+    created_at = dt.datetime.strptime(created_at, TIMESTAMP_FORMAT)
+    return created_at < since
+
+
+def last_page(data: Any, headers: Mapping, per_page: int = 100) -> Optional[int]:
+    """Number of pages of a listing, from the Link header or total_count.
+
+    Args:
+        data (Any): Decoded first page.
+        headers (Mapping): Response headers of the first page.
+        per_page (int): Number of items in a response. Defaults to 100.
+
+    Returns:
+        Optional[int]: The last page, None if unknown.
+    """
+
+    match = re.search(r'[?&]page=(\d+)[^>]*>;\s*rel="last"', headers.get("Link") or "")
+    if match:
+        return int(match.group(1))
+
+    if isinstance(data, dict) and data.get("total_count") is not None:
+        return math.ceil(int(data["total_count"]) / per_page)
+
+    return None
+
+
+def run_windows(
+    start: dt.datetime, end: dt.datetime, shards: int
+) -> List[Tuple[dt.datetime, dt.datetime]]:
+    """Split a created date range in equal windows, each one starts a second
+    after the previous one ends.
+
+    Args:
+        start (datetime): First created second, naive UTC.
+        end (datetime): Last created second, naive UTC.
+        shards (int): Number of windows.
+
+    Returns:
+        List[Tuple[datetime, datetime]]: First and last second of each window.
+    """
+
+    step = max(dt.timedelta(seconds=1), (end - start) / max(1, shards))
+    windows = []
+    while start <= end:
+        window_end = min(end, (start + step).replace(microsecond=0))
+        windows.append((start, window_end))
+        start = window_end + dt.timedelta(seconds=1)
+
+    return windows
+
+
+def split_window(
+    start: dt.datetime, end: dt.datetime
+) -> List[Tuple[dt.datetime, dt.datetime]]:
+    """Split a window in halves, a single second can not be split.
+
+    Args:
+        start (datetime): First created second of the window, naive UTC.
+        end (datetime): Last created second of the window, naive UTC.
+
+    Returns:
+        List[Tuple[datetime, datetime]]: The halves, empty for a single second.
+    """
+
+    if end <= start:
+        return []
+
+    middle = (start + (end - start) / 2).replace(microsecond=0)
+    return [(start, middle), (middle + dt.timedelta(seconds=1), end)]
+
+
+class GitHubRequestError(Exception):
+    """
+    Raised when a GitHub API request failed after all retries"""
+
+
+class Pagination:
+    """
+    Position and stop decisions of a paginated listing, the engines fetch the
+    pages and save the taken items"""
+
+    def __init__(
+        self,
+        github_url: str,
+        action: str,
+        checker: Optional[str] = None,
+        per_page: int = 100,
+        since: Optional[dt.datetime] = None,
+        page_workers: int = 1,
+        checkpoint: Optional[Checkpoint] = None,
+    ) -> None:
+        """Initializing the first page.
+
+        Args:
+            github_url (str): GitHub API url of the listing.
+            action (str): Action name of the listed items.
+            checker (str, optional): The key to the element, who has all items. Defaults to None.
+            per_page (int): Number of items in a response. Defaults to 100.
+            since (datetime, optional): Stop at the first item created before, items must be sorted newest first. Defaults to None.
+            page_workers (int): Number of pages fetched concurrently after the first one. Defaults to 1.
+            checkpoint (Checkpoint, optional): Start from and record the saved pages. Defaults to None.
+        """
+
+        self.github_url = github_url
+        self.action = action
+        self.checker = checker
+        self.per_page = per_page
+        self.since = since
+        self.checkpoint = checkpoint
+
+        # page is kept per listing to allow concurrent pagination
+        self.page = checkpoint.start_page(action) if checkpoint else 1
+        self.done = False
+
+        # an incremental listing stops within a page, it is fetched page by page
+        self.__fan_out = page_workers > 1 and not since
+        self.__fan_out_pages = range(0)
+
+    def page_url(self, page: Optional[int] = None) -> str:
+        """Url of a page.
+
+        Args:
+            page (int, optional): Page number. Defaults to the current page.
+
+        Returns:
+            str
+        """
+        return self.github_url + f"&page={page or self.page}"
+
+    def items(self, data: Any) -> List[dict]:
+        """Get the items of a decoded page from its sub key.
+
+        Args:
+            data (Any): Decoded page.
+
+        Returns:
+            List[dict]
+        """
+        if self.checker:
+            data = data.get(self.checker)
+        return data or []
+
+    def take(self, data: Any, headers: Optional[Mapping] = None) -> List[dict]:
+        """Take the items of the current page and move to the next one.
+
+        Args:
+            data (Any): Decoded current page.
+            headers (Mapping, optional): Response headers, to find the last page to fan out. Defaults to None.
+
+        Returns:
+            List[dict]: Items to save, empty if the listing is done.
+        """
+
+        items = self.items(data)
+        response_count = len(items)
+
+        # drop already crawled items, all following pages are older
+        if self.since:
+            items = [i for i in items if not created_before(i, self.since)]
+
+        self.advance(response_count, len(items))
+        if self.done or not self.__fan_out:
+            return items
+        self.__fan_out = False
+
+        # the listing may grow meanwhile, continue one by one after the last page
+        last = last_page(data, headers or {}, self.per_page)
+        if last and last >= self.page:
+            self.__fan_out_pages = range(self.page, last + 1)
+
+        return items
+
+    def advance(self, response_count: int, saved_count: int) -> None:
+        """Move to the next page after a page was taken.
+
+        Args:
+            response_count (int): Number of items of the page.
+            saved_count (int): Number of items of the page created since.
+        """
+
+        # if no items, jump to next action
+        if not saved_count:
+            self.done = True
+            return
+
+        self.page += 1
+
+        # stop after saving if number of items is less than per_page
+        self.done = response_count < self.per_page or saved_count < response_count
+
+    def fan_out_pages(self) -> range:
+        """Pages to fetch concurrently, known once after the first page was taken.
+
+        Returns:
+            range: Empty if the pages are fetched one by one.
+        """
+        pages, self.__fan_out_pages = self.__fan_out_pages, range(0)
+        return pages
+
+    def take_page(self, page: int, data: Any) -> List[dict]:
+        """Take the items of a concurrently fetched page, pages are taken in order.
+
+        Args:
+            page (int): Page number of data.
+            data (Any): Decoded page.
+
+        Returns:
+            List[dict]: Items to save, empty if the listing is done.
+        """
+
+        items = self.items(data)
+        self.page = page
+        self.advance(len(items), len(items))
+
+        return items
+
+    def on_saved(self, page: int) -> Optional[Callable]:
+        """Callback recording a saved page in the checkpoint.
+
+        Args:
+            page (int): Page number.
+
+        Returns:
+            Optional[Callable]: None if the pages are not tracked.
+        """
+        if not self.checkpoint:
+            return None
+        return partial(self.checkpoint.page_done, self.action, page)
+
+
+class BaseGitHub:
+    """
+    Urls, pagination, run windows, rate limit and checkpoint decisions shared
+    by the GitHub engines, which only send the requests and schedule them"""
+
+    # base url
+    api_url = "https://api.github.com/"
+
+    # API URLs for each action
+    actions_url = {
+        "repository": "repos/{owner}/{repo}",
+        "workflow": "repos/{owner}/{repo}/actions/workflows?per_page={per_page}",
+        "run": "repos/{owner}/{repo}/actions/runs?per_page={per_page}",
+        "job": "repos/{owner}/{repo}/actions/runs/{run_id}/jobs?per_page={per_page}",
+        "artifact": "repos/{owner}/{repo}/actions/artifacts?per_page={per_page}",
+    }
+
+    # sub key, incremental and tracked pages of each listing
+    listings = {
+        "workflow": ("workflows", False, True),
+        "run": ("workflow_runs", True, True),
+        "job": ("jobs", False, False),
+        "artifact": ("artifacts", True, True),
+    }
+
+    # tracking requests
+    total_requests = 0
+
+    # number of results of a listing query, the following pages are empty
+    result_cap = 1000
+
+    def __init__(
+        self,
+        save_mongo: Callable,
+        owner: Optional[str] = None,
+        repo: Optional[str] = None,
+        per_page: int = 100,
+        token: Optional[Union[str, List[str]]] = None,
+        json_loads: Optional[Callable] = None,
+        since: Optional[dt.datetime] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        retries: int = 3,
+        http_cache: Optional[HTTPCache] = None,
+        rate_governor: Optional[RateGovernor] = None,
+        writers: int = 0,
+        write_queue_size: int = 10,
+        page_workers: int = 1,
+        run_shards: int = 0,
+        metrics: Optional[Metrics] = None,
+        profiler: Optional[StageProfiler] = None,
+        recorder: Optional[Recorder] = None,
+    ) -> None:
+        """Initializing essential variables, the arguments are described by the engines."""
+
+        # check owner and repo
+        if not owner or not repo or not save_mongo:
+            logger.error(
+                f"Please make to sure to pass owner and repo names and save_mongo function."
+            )
+            sys.exit(1)
+
+        # tokens are added per request, rotating to the one with the most budget
+        if isinstance(token, str):
+            token = [token]
+        self.rate_governor = rate_governor or RateGovernor(TokenPool(token))
+        self.token_pool = self.rate_governor.pool
+
+        self.json_loads = json_loads or default_json_loads
+
+        # MongoDB save function
+        self.save_mongo = save_mongo
+
+        # essential variables
+        self.owner = owner
+        self.repo = repo
+        self.per_page = per_page
+        self.since = since
+        self.checkpoint = checkpoint or Checkpoint()
+        self.retries = retries
+        self.http_cache = http_cache
+        self.writers = max(0, writers)
+        self.write_queue_size = write_queue_size
+        self.page_workers = max(1, page_workers)
+        self.run_shards = max(0, run_shards)
+        self.metrics = metrics or Metrics()
+        self.profiler = profiler
+        self.recorder = recorder
+
+        # shared state between concurrent listings and workers
+        self._lock = threading.Lock()
+        self._pipeline = None
+        self._listed_runs = set()
+
+    def _action_url(self, action: str, **kwargs) -> str:
+        """Construct the GET url of an action.
+
+        Args:
+            action (str): Action name.
+
+        Returns:
+            str: Full GitHub API url.
+        """
+        url = self.actions_url[action].format(
+            owner=self.owner, repo=self.repo, per_page=self.per_page, **kwargs
+        )
+        return self.api_url + url
+
+    def _listing(self, action: str, **kwargs) -> Tuple[str, str, str, bool, bool]:
+        """Arguments of paginating for the listing of an action.
+
+        Args:
+            action (str): Action name.
+
+        Returns:
+            Tuple[str, str, str, bool, bool]: github_url, action, checker, incremental and track_pages.
+        """
+
+        github_url = self._action_url(action, **kwargs)
+        checker, incremental, track_pages = self.listings[action]
+
+        # only list runs created since the last crawl
+        if action == "run" and self.since:
+            github_url += f"&created=>={self.since:{TIMESTAMP_FORMAT}}"
+
+        return github_url, action, checker, incremental, track_pages
+
+    def _pagination(
+        self,
+        github_url: str,
+        action: str,
+        checker: Optional[str] = None,
+        incremental: bool = False,
+        track_pages: bool = False,
+        fan_out: bool = True,
+    ) -> Pagination:
+        """Start a listing.
+
+        Args:
+            github_url (str): GitHub API url of the listing.
+            action (str): Action name of the listed items.
+            checker (str, optional): The key to the element, who has all items. Defaults to None.
+            incremental (bool): Stop at the first item older than since. Defaults to False.
+            track_pages (bool): Start from and record the page in the checkpoint. Defaults to False.
+            fan_out (bool): Fetch the remaining pages with page_workers. Defaults to True.
+
+        Returns:
+            Pagination
+        """
+        return Pagination(
+            github_url,
+            action,
+            checker,
+            self.per_page,
+            since=self.since if incremental else None,
+            page_workers=self.page_workers if fan_out else 1,
+            checkpoint=self.checkpoint if track_pages else None,
+        )
+
+    def _window_url(self, start: dt.datetime, end: dt.datetime) -> str:
+        """Url listing the runs created in a window.
+
+        Args:
+            start (datetime): First created second of the window, naive UTC.
+            end (datetime): Last created second of the window, naive UTC.
+
+        Returns:
+            str
+        """
+        return (
+            self._action_url("run")
+            + f"&created={start:{TIMESTAMP_FORMAT}}..{end:{TIMESTAMP_FORMAT}}"
+        )
+
+    def _run_windows(
+        self, created_at: Optional[str] = None
+    ) -> List[Tuple[dt.datetime, dt.datetime]]:
+        """Windows of the sharded runs listing, forgetting the runs listed before.
+
+        Args:
+            created_at (str, optional): Creation time of the repository, the earliest possible run. Only needed without since.
+
+        Returns:
+            List[Tuple[datetime, datetime]]: First and last second of each window.
+        """
+
+        start = self.since or dt.datetime.strptime(created_at, TIMESTAMP_FORMAT)
+        end = dt.datetime.utcnow().replace(microsecond=0)
+
+        self._listed_runs = set()
+        return run_windows(start, end, self.run_shards)
+
+    def _split_capped_window(
+        self, start: dt.datetime, end: dt.datetime, data: Any
+    ) -> List[Tuple[dt.datetime, dt.datetime]]:
+        """Halves of a window with more runs than the result cap of a query.
+
+        Args:
+            start (datetime): First created second of the window, naive UTC.
+            end (datetime): Last created second of the window, naive UTC.
+            data (Any): Decoded first page of the window.
+
+        Returns:
+            List[Tuple[datetime, datetime]]: The halves, empty if the window is listed as is.
+        """
+
+        if (data.get("total_count") or 0) <= self.result_cap:
+            return []
+
+        # runs past the cap can not be listed, a single second is fetched anyway
+        halves = split_window(start, end)
+        if halves:
+            logger.debug(f"Splitting runs window {start} - {end} at {halves[0][1]}")
+        else:
+            logger.warning(f"More runs created at {start} than can be listed")
+
+        return halves
+
+    def _unlisted_runs(self, runs: List[dict]) -> List[dict]:
+        """Drop runs listed by another window, a run is only saved once.
+
+        Args:
+            runs (List[dict]): Runs of a window page.
+
+        Returns:
+            List[dict]
+        """
+        with self._lock:
+            runs = [r for r in runs if r["id"] not in self._listed_runs]
+            self._listed_runs.update(r["id"] for r in runs)
+
+        return runs
+
+    def _authenticated(self, token: str, status: int, reason: Any, headers) -> None:
+        """Keep an authenticated token with its budget, or remove it.
+
+        Args:
+            token (str): The token.
+            status (int): Status of the user request.
+            reason (Any): Reason of the status.
+            headers (Mapping): Response headers.
+        """
+
+        self._count_request()
+
+        # if 401 = 'Unauthorized', but other responses mean the user is authorized
+        # Unauthorized users have much lower limit, 60 per hour.
+        if status == 401:
+            logger.error(f"Error authenticated using token ...{token[-4:]}")
+            logger.error(f"Authentication status_code: {status}")
+            logger.error(reason)
+            logger.error(self.api_url + "user")
+
+            self.token_pool.remove(token)
+            return
+
+        self.token_pool.update(token, headers)
+
+    def _finish_authentication(self) -> bool:
+        """Check if any token was authenticated.
+
+        Returns:
+            bool
+        """
+
+        if not self.token_pool.tokens:
+            return False
+
+        self.token_pool.authenticated = True
+
+        logger.debug(
+            f"Successfully authenticated using {len(self.token_pool)} token(s)"
+        )
+
+        return True
+
+    def _needs_authentication(self) -> bool:
+        """Check if the passed tokens have to be authenticated before the crawl.
+
+        Returns:
+            bool
+        """
+
+        if not any(self.token_pool.tokens):
+            logger.debug(f"Proceding without token")
+            return False
+
+        return not self.token_pool.authenticated
+
+    def _count_request(self) -> None:
+        """Increment the requests counter, safe to call from job workers."""
+        with self._lock:
+            self.total_requests += 1
+
+    def _reserve_token(self) -> Tuple[Optional[str], float]:
+        """
+        Take the token with the most remaining requests and the seconds to
+        wait while the requests are paced or every token of the pool is exhausted."""
+
+        token, sleep_time = self.rate_governor.acquire()
+        if sleep_time > 0:
+            if sleep_time >= 1:
+                logger.debug(f"Rate limit, sleeping {sleep_time:.0f}s")
+            self.metrics.inc("rate_limit_sleep_seconds_total", sleep_time)
+
+        return token, sleep_time
+
+    def _received(
+        self,
+        github_url: str,
+        token: Optional[str],
+        status: int,
+        headers: Mapping,
+        body: Optional[bytes],
+        seconds: float,
+    ) -> bool:
+        """Record a response and check if it has to be repeated.
+
+        Args:
+            github_url (str): GitHub API url.
+            token (str, optional): Token of the request.
+            status (int): Response status.
+            headers (Mapping): Response headers.
+            body (bytes, optional): Body of a rate limited response.
+            seconds (float): Time until the response headers were read.
+
+        Returns:
+            bool: True to repeat the request with another token or after the reset.
+        """
+
+        url_endpoint = endpoint(github_url)
+
+        self._count_request()
+        self.metrics.observe("request_seconds", seconds, endpoint=url_endpoint)
+        self.metrics.inc("requests_total", endpoint=url_endpoint, status=str(status))
+
+        return self.rate_governor.observe(token, status, headers, body)
+
+    def _retry_delay(
+        self, attempt: int, github_url: str, error: str, status: Optional[int] = None
+    ) -> int:
+        """Seconds to wait before retrying a failed request.
+
+        Args:
+            attempt (int): Number of retries so far.
+            github_url (str): GitHub API url.
+            error (str): Description of the failure.
+            status (int, optional): Response status, None for a connection error. Defaults to None.
+
+        Raises:
+            GitHubRequestError: If the retries are used up or the error is a client error.
+
+        Returns:
+            int
+        """
+
+        if status is None:
+            self.metrics.inc(
+                "requests_total", endpoint=endpoint(github_url), status="error"
+            )
+
+        # client errors will not change by retrying
+        if attempt >= self.retries or (status is not None and status < 500):
+            logger.error(f"Error in request {error}")
+            logger.error(f"Error in request github_url: {github_url}")
+            raise GitHubRequestError(f"{error} for {github_url}")
+
+        logger.debug(f"Retrying {github_url} after error {error}")
+        self.metrics.inc("retry_sleep_seconds_total", 2**attempt)
+
+        return 2**attempt
+
+    def _save_documents(self, documents: List[dict], action: str) -> None:
+        """Save documents with save_mongo, measuring the upsert latency.
+
+        Args:
+            documents (List[dict]): Items to save.
+            action (str): Action name of the items.
+        """
+
+        # recorded before mapping, a mapping error can be fixed by a replay
+        if self.recorder:
+            self.recorder.record(self.owner, self.repo, action, documents)
+
+        with self.metrics.time("upsert_seconds", action=action):
+            self.save_mongo(documents, action)
+
+        self.metrics.inc("documents_total", len(documents), action=action)
+
+    def _open_pipeline(self) -> None:
+        """Save pages in the background while fetching the next ones."""
+        if self.writers:
+            self._pipeline = WritePipeline(
+                self._save_documents, self.writers, self.write_queue_size
+            )
+
+    def _close_pipeline(self) -> None:
+        """Stop the writers after saving the queued pages."""
+        if self._pipeline:
+            self._pipeline.close()
+            self._pipeline = None
+
+    def _skip_action(self, action: str) -> bool:
+        """Check if an action was finished before resuming.
+
+        Args:
+            action (str): Action name.
+
+        Returns:
+            bool
+        """
+        if self.checkpoint.is_completed(action):
+            logger.debug(f"Skip fetching {action}s, finished before")
+            return True
+
+        return False
+
+    def _run_done(self, run_id: int) -> Callable:
+        """Callback recording a run in the checkpoint, after its jobs are saved.
+
+        Args:
+            run_id (int): Run id.
+
+        Returns:
+            Callable
+        """
+        return partial(self.checkpoint.run_done, run_id)
+
+    def _stage(self, name: str):
+        """Context of a crawl stage, profiled if a profiler was passed.
+
+        Args:
+            name (str): Stage name.
+        """
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+
+    def _interrupted(self) -> None:
+        """Save the queued pages and keep the position to continue with --resume."""
+        self._close_pipeline()
+        self.checkpoint.save()
+        self._finishing_message()
+
+    def _finishing_message(self):
+        """
+        Finish message to append after finishing run()
+        """
+        logger.debug(f"Number of requests: {self.total_requests}")
+        logger.debug(f"Number of stopping: {self.rate_governor.stalls}")
+
+        self.metrics.set("rate_limit_stalls", self.rate_governor.stalls)
+        if self.http_cache:
+            self.metrics.set_stats("http_cache", self.http_cache.stats())
+
+        logger.debug(f"Metrics: {json.dumps(self.metrics.summary())}")
+        self.metrics.export()
+
+        logger.debug("Finished fetching actions.")
@@ -3,7 +3,7 @@ import logging
 import logging.config
 import json
 import datetime as dt
-from typing import Optional
+from typing import List, Optional
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -11,7 +11,7 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 class Config:
     def __init__(self, args):
 
-        self.token = args.token
+        self.tokens = self.get_tokens(args.token, args.token_env, args.token_file)
         self.parse_url(args.owner, args.repository, args.url)
         self.db_database = args.db_database
         self.db_user = args.db_user
@@ -20,16 +20,43 @@ class Config:
         self.db_port = args.db_port
         self.db_authentication = args.db_authentication
         self.db_ssl = args.ssl
+        self.manifest = args.manifest
+        self.repo_workers = args.repo_workers
+        self.workers = args.workers
+        self.page_workers = args.page_workers
+        self.run_shards = args.run_shards
+        self.download_artifacts = args.download_artifacts
+        self.artifact_workers = args.artifact_workers
+        self.artifact_budget = args.artifact_budget
+        self.metrics_file = args.metrics_file
+        self.metrics_json = args.metrics_json
+        self.metrics_port = args.metrics_port
+        self.profile = args.profile
+        self.record = args.record
+        self.replay = args.replay
+        self.export = args.export
+        self.export_batch_size = args.export_batch_size
+        self.engine = args.engine
+        self.concurrency = args.concurrency
+        self.pool_size = args.pool_size
+        self.incremental = args.incremental
+        self.refetch_jobs = args.refetch_jobs
+        self.resume = args.resume
+        self.writers = args.writers
+        self.write_queue_size = args.write_queue_size
+        self.stream_chunk_size = args.stream_chunk_size
+        self.bulk_write = args.bulk_write
+        self.write_concern = self.get_write_concern(args.write_concern)
+        self.cache_size = args.cache_size
+        self.http_cache = args.http_cache
+        self.http_cache_size = args.http_cache_size
+        self.rate_reserve = args.rate_reserve
         self.logger_level = self.get_logger_level(args.debug)
 
-        # if environment variable passed and not concrete token
-        if not self.token and args.token_env:
-            self.token = os.environ.get(args.token_env)
-
     def __str__(self):
         return "\n".join(
             [
-                f"token: {self.token}",
+                f"tokens: {self.tokens}",
                 f"owner: {self.owner}",
                 f"repo: {self.repo}",
                 f"url: {self.url}",
@@ -40,6 +67,37 @@ class Config:
                 f"db_port: {self.db_port}",
                 f"db_authentication: {self.db_authentication}",
                 f"db_ssl: {self.db_ssl}",
+                f"manifest: {self.manifest}",
+                f"repo_workers: {self.repo_workers}",
+                f"workers: {self.workers}",
+                f"page_workers: {self.page_workers}",
+                f"run_shards: {self.run_shards}",
+                f"download_artifacts: {self.download_artifacts}",
+                f"artifact_workers: {self.artifact_workers}",
+                f"artifact_budget: {self.artifact_budget}",
+                f"metrics_file: {self.metrics_file}",
+                f"metrics_json: {self.metrics_json}",
+                f"metrics_port: {self.metrics_port}",
+                f"profile: {self.profile}",
+                f"record: {self.record}",
+                f"replay: {self.replay}",
+                f"export: {self.export}",
+                f"export_batch_size: {self.export_batch_size}",
+                f"engine: {self.engine}",
+                f"concurrency: {self.concurrency}",
+                f"pool_size: {self.pool_size}",
+                f"incremental: {self.incremental}",
+                f"refetch_jobs: {self.refetch_jobs}",
+                f"resume: {self.resume}",
+                f"writers: {self.writers}",
+                f"write_queue_size: {self.write_queue_size}",
+                f"stream_chunk_size: {self.stream_chunk_size}",
+                f"bulk_write: {self.bulk_write}",
+                f"write_concern: {self.write_concern}",
+                f"cache_size: {self.cache_size}",
+                f"http_cache: {self.http_cache}",
+                f"http_cache_size: {self.http_cache_size}",
+                f"rate_reserve: {self.rate_reserve}",
                 f"logger_level: {self.logger_level}",
             ]
         )
@@ -64,6 +122,45 @@ class Config:
 
         self.url = f"https://github.com/{self.owner}/{self.repo}.git"
 
+    def get_tokens(
+        self,
+        token: Optional[str] = None,
+        token_env: Optional[str] = None,
+        token_file: Optional[str] = None,
+    ) -> List[str]:
+
+        # each source may hold several comma separated tokens
+        values = [token]
+
+        # if environment variable passed
+        if token_env:
+            values.append(os.environ.get(token_env))
+
+        # one token per line
+        if token_file:
+            with open(token_file, "r") as f:
+                values.extend(f.read().splitlines())
+
+        tokens = []
+        for value in values:
+            for t in (value or "").split(","):
+                t = t.strip()
+                if t and t not in tokens:
+                    tokens.append(t)
+
+        return tokens
+
+    def get_write_concern(self, value: Optional[str] = None):
+
+        if not value:
+            return None
+
+        # numbers of acknowledging nodes, otherwise a tag like "majority"
+        if value.isdigit():
+            return int(value)
+
+        return value
+
     def get_logger_level(self, level: str = "DEBUG"):
 
         level = level.capitalize()
@@ -0,0 +1,276 @@
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import shutil
+import datetime as dt
+import logging
+
+from bson import ObjectId
+from mongoengine import (
+    BooleanField,
+    DateTimeField,
+    EmbeddedDocumentListField,
+    IntField,
+)
+
+from actionSHARK.mongo import (
+    Mongo,
+    Workflow,
+    Run,
+    RunPullRequest,
+    Job,
+    JobStep,
+    Artifact,
+)
+
+# pyarrow is only needed to export
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# start logger
+logger = logging.getLogger("main.export")
+
+# action, document class, field of the partition month and the embedded list
+# flattened into its own table with the keys of its parent
+TABLES = {
+    "workflows": ("workflow", Workflow, "created_at", None),
+    "runs": ("run", Run, "created_at", ("run_pull_requests", "pull_requests")),
+    "jobs": ("job", Job, "started_at", ("job_steps", "steps")),
+    "artifacts": ("artifact", Artifact, "created_at", None),
+}
+
+# columns named apart from their database field, run_id always is the GitHub id
+# and run_object_id the ObjectId of a run
+RENAMED_COLUMNS = {"jobs": {"run_id": "run_object_id"}}
+
+# columns read from keys added by Mongo.project_documents, with their Arrow type
+EXTRA_COLUMNS = {"jobs": [("run_id", "run_github_id", "int64")]}
+
+# parent keys of the rows of the embedded tables, column, key in the parent and Arrow type
+EMBEDDED_KEYS = {
+    "run_pull_requests": (
+        RunPullRequest,
+        [("run_object_id", "_id", "string"), ("run_id", "run_id", "int64")],
+    ),
+    "job_steps": (
+        JobStep,
+        [
+            ("job_object_id", "_id", "string"),
+            ("job_id", "job_id", "int64"),
+            ("run_object_id", "run_id", "string"),
+            ("run_id", "run_github_id", "int64"),
+        ],
+    ),
+}
+
+
+def arrow_type(field: Any) -> "pa.DataType":
+    """Arrow type of a mongoengine field, unknown fields are exported as string.
+
+    Args:
+        field (BaseField): mongoengine field.
+    """
+    if isinstance(field, BooleanField):
+        return pa.bool_()
+    if isinstance(field, IntField):
+        return pa.int64()
+    if isinstance(field, DateTimeField):
+        return pa.timestamp("ms")
+    return pa.string()
+
+
+def model_columns(model: Any) -> List[Tuple[str, str, "pa.DataType"]]:
+    """Columns of the database fields of a document class, without embedded lists.
+
+    Args:
+        model (Document): Document or EmbeddedDocument class.
+
+    Returns:
+        List[Tuple[str, str, pa.DataType]]: Column, database field and Arrow type.
+    """
+    return [
+        (field.db_field, field.db_field, arrow_type(field))
+        for field in model._fields.values()
+        if not isinstance(field, EmbeddedDocumentListField)
+    ]
+
+
+def arrow_value(value: Any) -> Any:
+    """Convert a value read by pymongo to a value of its Arrow type."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    return value
+
+
+class ParquetExporter:
+    """
+    Exporting the documents of a repository to Parquet files, partitioned by
+    repository and month, with embedded lists flattened into their own tables"""
+
+    def __init__(self, directory: str, batch_size: int = 50000) -> None:
+        """Initializing the export directory.
+
+        Args:
+            directory (str): Directory of the tables, <table>/repository=<owner>_<repo>/month=<YYYY-MM>/part-<number>.parquet.
+            batch_size (int): Number of buffered rows of a table, before they are written. Defaults to 50000.
+        """
+
+        if pa is None:
+            raise ImportError("The Parquet export requires pyarrow, please install it.")
+
+        self.directory = directory
+        self.batch_size = max(1, batch_size)
+
+        self.__columns = {}
+        for table, (_, model, _, embedded) in TABLES.items():
+            renamed = RENAMED_COLUMNS.get(table, {})
+            self.__columns[table] = [
+                (renamed.get(column, column), key, arrow)
+                for column, key, arrow in model_columns(model)
+            ] + [
+                (column, key, getattr(pa, t)())
+                for column, key, t in EXTRA_COLUMNS.get(table, [])
+            ]
+
+            if embedded:
+                embedded_table, _ = embedded
+                embedded_model, keys = EMBEDDED_KEYS[embedded_table]
+                self.__columns[embedded_table] = [
+                    (column, column, getattr(pa, t)()) for column, _, t in keys
+                ] + model_columns(embedded_model)
+
+    def export(self, mongo: Mongo, owner: str, repo: str) -> Dict[str, int]:
+        """Export all tables of a repository, replacing an earlier export of it.
+
+        Args:
+            mongo (Mongo): Mongo instance of the repository, e.g. Mongo.for_project.
+            owner (str): Owner of the repository.
+            repo (str): The repository name.
+
+        Returns:
+            Dict[str, int]: Number of exported rows per table.
+        """
+
+        # GitHub owners can not contain an underscore
+        repository = f"{owner}_{repo}"
+
+        counts = {}
+        for table, (action, _, month_field, embedded) in TABLES.items():
+            writer = _PartitionWriter(self, table, repository)
+            embedded_writer = None
+            if embedded:
+                embedded_table, embedded_field = embedded
+                embedded_writer = _PartitionWriter(self, embedded_table, repository)
+                _, keys = EMBEDDED_KEYS[embedded_table]
+
+            for son in mongo.project_documents(action, batch_size=1000):
+                month = self.__month(son.get(month_field))
+                writer.add(month, son)
+
+                if embedded_writer:
+                    parent = {name: son.get(key) for name, key, _ in keys}
+                    for child in son.get(embedded_field) or []:
+                        embedded_writer.add(month, dict(child, **parent))
+
+            counts[table] = writer.close()
+            if embedded_writer:
+                counts[embedded_table] = embedded_writer.close()
+
+        logger.debug(f"Exported {owner}/{repo} to {self.directory}: {counts}")
+
+        return counts
+
+    @staticmethod
+    def __month(value: Optional[dt.datetime]) -> str:
+        return f"{value:%Y-%m}" if value else "unknown"
+
+    def columns(self, table: str) -> List[Tuple[str, str, "pa.DataType"]]:
+        """Columns of a table.
+
+        Args:
+            table (str): Table name.
+
+        Returns:
+            List[Tuple[str, str, pa.DataType]]: Column, key in the row and Arrow type.
+        """
+        return self.__columns[table]
+
+    def schema(self, table: str) -> "pa.Schema":
+        """Arrow schema of a table.
+
+        Args:
+            table (str): Table name.
+        """
+        return pa.schema(
+            [(column, arrow) for column, _, arrow in self.__columns[table]]
+        )
+
+
+class _PartitionWriter:
+    """
+    Buffered rows of a table of one repository, written as one Parquet file per
+    month and flush"""
+
+    def __init__(self, exporter: ParquetExporter, table: str, repository: str) -> None:
+        self.exporter = exporter
+        self.table = table
+        self.columns = exporter.columns(table)
+        self.schema = exporter.schema(table)
+        self.directory = os.path.join(
+            exporter.directory, table, f"repository={repository}"
+        )
+
+        # a repository is exported completely, stale months are removed
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+        self.rows: Dict[str, List[dict]] = {}
+        self.buffered = 0
+        self.written = 0
+        self.parts: Dict[str, int] = {}
+
+    def add(self, month: str, son: dict) -> None:
+        """Buffer a row, writing all buffered rows once the batch is full.
+
+        Args:
+            month (str): Partition month, YYYY-MM.
+            son (dict): Document read by pymongo, fields outside the columns are dropped.
+        """
+
+        self.rows.setdefault(month, []).append(
+            {column: arrow_value(son.get(key)) for column, key, _ in self.columns}
+        )
+        self.buffered += 1
+
+        if self.buffered >= self.exporter.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows, one file per month."""
+
+        for month, rows in self.rows.items():
+            directory = os.path.join(self.directory, f"month={month}")
+            os.makedirs(directory, exist_ok=True)
+
+            part = self.parts.get(month, 0)
+            self.parts[month] = part + 1
+
+            table = pa.Table.from_pylist(rows, schema=self.schema)
+            pq.write_table(table, os.path.join(directory, f"part-{part:05d}.parquet"))
+
+        self.written += self.buffered
+        self.rows = {}
+        self.buffered = 0
+
+    def close(self) -> int:
+        """Write the remaining rows.
+
+        Returns:
+            int: Number of written rows.
+        """
+        self.flush()
+        return self.written
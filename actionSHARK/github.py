@@ -1,48 +1,80 @@
-from typing import Callable, Optional
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import deque
 from time import sleep
-import os
+import io
 import sys
+import threading
+import time
 import datetime as dt
 import requests
 import logging
 
+from requests.adapters import HTTPAdapter
+
+from actionSHARK.checkpoint import Checkpoint
+from actionSHARK.http_cache import HTTPCache
+from actionSHARK.ratelimit import RateGovernor
+from actionSHARK.metrics import Metrics
+from actionSHARK.profiling import StageProfiler
+from actionSHARK.recording import Recorder
+from actionSHARK.client import BaseGitHub, Pagination, created_before
+
+# ijson is only needed to stream pages
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 
 # start logger
 logger = logging.getLogger("main.github")
 
 
-class GitHub:
+class GitHub(BaseGitHub):
     """
     Managing different type of get Request to fetch data from GitHub REST API"""
 
-    # base url
-    api_url = "https://api.github.com/"
-
     # request header default value
-    __headers = {"Accept": "application/vnd.github.v3+json"}
-
-    # API URLs for each action
-    actions_url = {
-        "workflow": "repos/{owner}/{repo}/actions/workflows?per_page={per_page}",
-        "run": "repos/{owner}/{repo}/actions/runs?per_page={per_page}",
-        "job": "repos/{owner}/{repo}/actions/runs/{run_id}/jobs?per_page={per_page}",
-        "artifact": "repos/{owner}/{repo}/actions/artifacts?per_page={per_page}",
+    __headers = {
+        "Accept": "application/vnd.github.v3+json",
+        "Accept-Encoding": "gzip, deflate",
     }
 
-    # essential variable
-    current_action = None
-
-    # tracking requests
-    total_requests = 0
-    limit_handler_counter = 0
-
     def __init__(
         self,
         save_mongo: Callable,
         owner: Optional[str] = None,
         repo: Optional[str] = None,
         per_page: int = 100,
-        token: Optional[str] = None,
+        token: Optional[Union[str, List[str]]] = None,
+        workers: int = 1,
+        pool_size: Optional[int] = None,
+        json_loads: Optional[Callable] = None,
+        since: Optional[dt.datetime] = None,
+        checkpoint: Optional[Checkpoint] = None,
+        retries: int = 3,
+        http_cache: Optional[HTTPCache] = None,
+        rate_governor: Optional[RateGovernor] = None,
+        session: Optional[requests.Session] = None,
+        writers: int = 0,
+        write_queue_size: int = 10,
+        stream_chunk_size: int = 0,
+        page_workers: int = 1,
+        run_shards: int = 0,
+        metrics: Optional[Metrics] = None,
+        profiler: Optional[StageProfiler] = None,
+        recorder: Optional[Recorder] = None,
     ) -> None:
         """Initializing essential variables.
 
@@ -51,264 +83,619 @@ class GitHub:
             owner (str): Owner of the repository.
             repo (str): The repository name.
             per_page (int): Number of items in a response. Defaults to 100.
-            token (str): GitHub token to use in header to autherize requests.
+            token (str or List[str]): GitHub token(s) to use in header to autherize requests.
+            workers (int): Number of concurrent workers fetching jobs. Defaults to 1.
+            pool_size (int, optional): Number of kept-alive connections. Defaults to workers times page_workers times run_shards.
+            json_loads (callable, optional): Function decoding response bodies. Defaults to orjson if installed.
+            since (datetime, optional): Only fetch runs and artifacts created since this UTC time. Defaults to None.
+            checkpoint (Checkpoint, optional): Position of the crawl to resume from and to update. Defaults to None.
+            retries (int): Number of retries of a failed request before aborting. Defaults to 3.
+            http_cache (HTTPCache, optional): Cache of responses to send conditional requests. Defaults to None.
+            rate_governor (RateGovernor, optional): Pacing of the requests with its own token pool, replaces token. Defaults to None.
+            session (requests.Session, optional): Session shared with other clients, replaces pool_size. Defaults to None.
+            writers (int): Number of writer threads saving pages while fetching, 0 saves each page before the next request. Defaults to 0.
+            write_queue_size (int): Number of fetched pages waiting for the writers. Defaults to 10.
+            stream_chunk_size (int): Parse pages while they are downloaded and save them in chunks of this many items, 0 decodes whole pages. Defaults to 0.
+            page_workers (int): Number of pages of a listing fetched concurrently, once the number of pages is known. Defaults to 1.
+            run_shards (int): Number of created date windows of the runs listed concurrently, 0 lists all runs with one query. Defaults to 0.
+            metrics (Metrics, optional): Metrics shared with other clients. Defaults to new metrics.
+            profiler (StageProfiler, optional): Profiles each stage of run(). Defaults to None.
+            recorder (Recorder, optional): Records the raw items of each saved page to be replayed. Defaults to None.
         """
 
-        # check owner and repo
-        if not owner or not repo or not save_mongo:
-            logger.error(
-                f"Please make to sure to pass owner and repo names and save_mongo function."
-            )
-            sys.exit(1)
+        super().__init__(
+            save_mongo,
+            owner,
+            repo,
+            per_page,
+            token,
+            json_loads=json_loads,
+            since=since,
+            checkpoint=checkpoint,
+            retries=retries,
+            http_cache=http_cache,
+            rate_governor=rate_governor,
+            writers=writers,
+            write_queue_size=write_queue_size,
+            page_workers=page_workers,
+            run_shards=run_shards,
+            metrics=metrics,
+            profiler=profiler,
+            recorder=recorder,
+        )
+
+        # one pooled keep-alive session for all requests, each shard fans out its pages
+        self.session = session or self.create_session(
+            pool_size or self.pool_size(workers, self.page_workers, self.run_shards)
+        )
+
+        self.workers = max(1, workers)
+        self.stream_chunk_size = max(0, stream_chunk_size)
+
+        if self.stream_chunk_size and not ijson:
+            logger.warning("Streaming pages requires ijson, decoding whole pages")
+            self.stream_chunk_size = 0
+
+        # stops the job workers once one has failed
+        self.__abort = threading.Event()
+
+    @staticmethod
+    def pool_size(workers: int, page_workers: int, run_shards: int) -> int:
+        """Number of connections used at the same time by a crawl.
+
+        Args:
+            workers (int): Number of concurrent workers fetching jobs.
+            page_workers (int): Number of pages of a listing fetched concurrently.
+            run_shards (int): Number of created date windows of the runs listed concurrently.
 
-        # add token to header
-        self.__token = None
-        if token:
-            self.__token = token
-            self.__headers["Authorization"] = f"token {token}"
+        Returns:
+            int
+        """
+        return max(1, workers) * max(1, page_workers) * max(1, run_shards)
+
+    @classmethod
+    def create_session(cls, pool_size: int = 1) -> requests.Session:
+        """Create a pooled keep-alive session with the default headers.
 
-        # MongoDB save function
-        self.save_mongo = save_mongo
+        Args:
+            pool_size (int): Number of kept-alive connections. Defaults to 1.
+
+        Returns:
+            requests.Session
+        """
 
-        # essential variables
-        self.owner = owner
-        self.repo = repo
-        self.per_page = per_page
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.headers.update(cls.__headers)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
 
     def authenticate_user(self):
         """
-        Authenticate the passed token by requesting user information."""
+        Authenticate the passed tokens by requesting user information,
+        invalid tokens are removed from the pool."""
 
-        basic_auth = requests.get(self.api_url + "user", headers=self.__headers)
+        for token in self.token_pool.tokens:
+            if not token:
+                continue
 
-        self.total_requests += 1
+            basic_auth = self.session.get(
+                self.api_url + "user", headers={"Authorization": f"token {token}"}
+            )
+            self._authenticated(
+                token, basic_auth.status_code, basic_auth.reason, basic_auth.headers
+            )
+
+        return self._finish_authentication()
+
+    def __get(
+        self, github_url: str, headers: Optional[dict] = None, stream: bool = False
+    ) -> requests.Response:
+        """GET a url, rotating tokens on rate limits and retrying server and
+        connection errors with a backoff.
+
+        Args:
+            github_url (str): GitHub API url.
+            headers (dict, optional): Additional request headers. Defaults to None.
+            stream (bool): Return a 200 response before reading its body. Defaults to False.
+
+        Returns:
+            requests.Response: Response with status_code 200 or 304.
+        """
+
+        attempt = 0
+        while True:
+            token, sleep_time = self._reserve_token()
+            if sleep_time > 0:
+                sleep(sleep_time)
 
-        # if 401 = 'Unauthorized', but other responses mean the user is authorized
-        # Unauthorized users have much lower limit, 60 per hour.
-        if basic_auth.status_code == 401:
+            request_headers = dict(headers or {})
+            if token:
+                request_headers["Authorization"] = f"token {token}"
 
-            logger.error(f"Error authenticated using token")
-            logger.error("Authentication status_code:", basic_auth.status_code)
-            logger.error(basic_auth.reason)
-            logger.error(self.api_url + "user")
+            # a streamed response is timed until its headers are read
+            start = time.monotonic()
+            try:
+                response = self.session.get(
+                    github_url, headers=request_headers, stream=stream
+                )
+            except requests.RequestException as e:
+                sleep(self._retry_delay(attempt, github_url, repr(e)))
+                attempt += 1
+                continue
 
-            return False
+            # the body tells a secondary rate limit apart from a forbidden request
+            body = None
+            if response.status_code in [403, 429]:
+                body = response.content
+
+            if self._received(
+                github_url,
+                token,
+                response.status_code,
+                response.headers,
+                body,
+                time.monotonic() - start,
+            ):
+                continue
 
-        logger.debug(f"Successfully authenticated using token")
+            if response.status_code in [200, 304]:
+                return response
 
-        return True
+            error = f"status_code: {response.status_code}"
+            sleep(self._retry_delay(attempt, github_url, error, response.status_code))
+            attempt += 1
 
-    def paginating(self, github_url: str, checker: Optional[str] = None):
+    def paginating(
+        self,
+        github_url: str,
+        action: str,
+        checker: Optional[str] = None,
+        incremental: bool = False,
+        track_pages: bool = False,
+    ) -> None:
         """Fetch all pages for an action and handel API limitation.
 
         Args:
             github_url (str): GitHub API url to loop over and collect responses.
+            action (str): Action name of the fetched items, passed to save_mongo.
             checker (str, optional): The key to the element, who has all items. Defaults to None.
+            incremental (bool): Stop at the first item older than since, items must be sorted newest first. Defaults to False.
+            track_pages (bool): Start from and record the page in the checkpoint. Defaults to False.
+        """
+
+        # a streamed page is saved before the number of pages is known
+        pagination = self._pagination(
+            github_url,
+            action,
+            checker,
+            incremental,
+            track_pages,
+            fan_out=not self.stream_chunk_size,
+        )
+
+        while not pagination.done:
+            page = pagination.page
+
+            # save the items while the page is parsed
+            if self.stream_chunk_size:
+                counts = self.__stream_page(pagination, pagination.on_saved(page))
+                pagination.advance(*counts)
+                if counts[1]:
+                    self.metrics.inc("pages_total", action=action)
+                continue
+
+            data, headers = self.__fetch_page(pagination.page_url())
+
+            # save items to mongodb
+            response_JSON = pagination.take(data, headers)
+            if response_JSON:
+                self.__save(response_JSON, action, pagination.on_saved(page))
+                self.metrics.inc("pages_total", action=action)
+
+            pages = pagination.fan_out_pages()
+            if pages:
+                self.__fan_out(pagination, pages)
+
+    def __decode_page(self, response: requests.Response, page_url: str) -> Any:
+        """Decode a page, taking the body of a 304 response from the HTTP cache.
+
+        Args:
+            response (requests.Response): Response with status_code 200 or 304.
+            page_url (str): Url of the page.
+
+        Returns:
+            Any: The decoded body, None if the cached body was evicted.
         """
 
+        body = response.content
+        if response.status_code == 304:
+            body = self.http_cache.body(page_url)
+            if body is None:
+                return None
+        elif self.http_cache:
+            self.http_cache.store(page_url, response.headers, body)
+
+        return self.json_loads(body)
+
+    def __fetch_page(self, page_url: str) -> Tuple[Any, Any]:
+        """GET and decode a page, sending a conditional request if it is cached.
+
+        Args:
+            page_url (str): Url of the page.
+
+        Returns:
+            Tuple[Any, Any]: The decoded body and the response headers.
+        """
+
+        # a 304 response does not count against the rate limit
+        use_cache = bool(self.http_cache)
         while True:
-            # append page number to the url
-            github_url += f"&page={self.page}"
+            cache_headers = self.http_cache.validators(page_url) if use_cache else {}
+            response = self.__get(page_url, cache_headers)
 
-            # GET response
-            response = requests.get(github_url, headers=self.__headers)
+            data = self.__decode_page(response, page_url)
+            if data is not None:
+                return data, response.headers
 
-            self.total_requests += 1
+            # the cache entry was evicted meanwhile, request the page again
+            use_cache = False
 
-            # Abort if unknown error occurred
-            if response.status_code not in [200, 403]:
-                logger.error(f"Error in request status_code: {response.status_code}")
-                logger.error(f"Error in request github_url: {github_url}")
-                logger.error(response)
-                sys.exit(1)
+    def __fan_out(self, pagination: Pagination, pages: range) -> None:
+        """Fetch pages concurrently and save them in page order.
 
-            # handle number of requests limitation
-            if response.status_code == 403:
+        Args:
+            pagination (Pagination): The listing, taking the pages.
+            pages (range): Pages to fetch.
+        """
 
-                # get the next reset time
-                headers_dict = response.headers
-                ratelimit = headers_dict.get("X-RateLimit-Reset")
+        pages = iter(pages)
 
-                if ratelimit:
-                    reset_time = dt.datetime.fromtimestamp(int(ratelimit))
-                else:
-                    logger.error(
-                        f"Error fetching 'X-RateLimit-Reset' from request's header."
-                    )
-                    logger.error(f"The value is: X-RateLimit-Reset = {ratelimit}")
-                    sys.exit(1)
+        # fetch a bounded number of pages ahead of the saved one
+        window = deque()
 
-                # calculate the sleep time
-                current_time = dt.datetime.now().replace(microsecond=0)
+        def submit() -> None:
+            page = next(pages, None)
+            if page is not None:
+                future = executor.submit(self.__fetch_page, pagination.page_url(page))
+                window.append((page, future))
 
-                sleep_time = (reset_time - current_time).seconds
+        with ThreadPoolExecutor(max_workers=self.page_workers) as executor:
+            try:
+                for _ in range(2 * self.page_workers):
+                    submit()
 
-                self.limit_handler_counter += 1
+                while window and not pagination.done:
+                    page, future = window.popleft()
+                    data, _ = future.result()
 
-                logger.debug(f"Limit handler is triggered")
-                logger.debug(
-                    f"Program will sleep for approximately {sleep_time:n} seconds."
-                )
-                logger.debug(f"Next Restart will be on {reset_time}")
+                    response_JSON = pagination.take_page(page, data)
+                    if not response_JSON:
+                        break
 
-                # sleep till limit reset
-                sleep(sleep_time)
+                    submit()
+                    self.metrics.inc("pages_total", action=pagination.action)
+                    self.__save(
+                        response_JSON, pagination.action, pagination.on_saved(page)
+                    )
+            finally:
+                # do not fetch pages past an empty one or an error
+                for _, future in window:
+                    future.cancel()
 
-                logger.debug(
-                    f"Continue with fetching {self.current_action} from last GET request"
-                )
+    def __stream_page(
+        self, pagination: Pagination, on_saved: Optional[Callable] = None
+    ) -> Tuple[int, int]:
+        """Parse the items of the current page while it is downloaded and save
+        them in chunks, so the memory of a page is bounded by the chunk size.
 
-                # after sleeping restart last loop to continue from last action
-                continue
+        Args:
+            pagination (Pagination): The listing.
+            on_saved (callable, optional): Called after the last chunk of the page is saved. Defaults to None.
 
-            # get the items from a sub key
-            response_JSON = response.json()
-            if checker:
-                response_JSON = response_JSON.get(checker)
+        Returns:
+            Tuple[int, int]: Number of items of the page and of saved items.
+        """
 
-            # count number of items
-            response_count = len(response_JSON)
+        page_url = pagination.page_url()
 
-            # if no items, jump to next action
-            if not response_JSON:
+        # send a conditional request, unless the cache entry was evicted meanwhile
+        use_cache = bool(self.http_cache)
+        while True:
+            cache_headers = self.http_cache.validators(page_url) if use_cache else {}
+            response = self.__get(page_url, cache_headers, stream=True)
+
+            source: BinaryIO
+            if response.status_code != 304:
+                # decompress gzip while reading
+                response.raw.decode_content = True
+                source = response.raw
+                if self.http_cache:
+                    source = self.http_cache.tee(page_url, response.headers, source)
                 break
 
-            # save items to mongodb
-            self.save_mongo(response_JSON, self.current_action)
+            body = self.http_cache.body(page_url)
+            if body is not None:
+                source = io.BytesIO(body)
+                break
 
-            # handel page incrementing
-            github_url = github_url[: -len(f"&page={self.page}")]
-            self.page += 1
+            use_cache = False
 
-            # updating metric variables
-            self.total_requests += 1
+        response_count = 0
+        saved_count = 0
+        chunk = []
+        try:
+            prefix = f"{pagination.checker}.item" if pagination.checker else "item"
+            for item in ijson.items(source, prefix, use_float=True):
+                response_count += 1
 
-            # break after saving if number of items is less than per_page
-            if response_count < self.per_page:
-                break
+                # drop already crawled items, all following pages are older
+                if created_before(item, pagination.since):
+                    continue
 
-    def get_workflows(self) -> None:
-        """Fetching workflows data from GitHub API."""
+                chunk.append(item)
+                saved_count += 1
 
-        # set what action to run and starting page
-        self.current_action = "workflow"
-        self.page = 1
+                if len(chunk) >= self.stream_chunk_size:
+                    self.__save(chunk, pagination.action)
+                    chunk = []
 
-        # constructing the GET url
-        url = self.actions_url["workflow"].format(
-            owner=self.owner, repo=self.repo, per_page=self.per_page
-        )
-        github_url = self.api_url + url
+            # read to the end, to complete the cache entry
+            while source.read(64 * 1024):
+                pass
+        finally:
+            if source is not response.raw and hasattr(source, "close"):
+                source.close()
+            response.close()
+
+        if saved_count:
+            self.__save(chunk, pagination.action, on_saved)
+
+        return response_count, saved_count
+
+    def __save(
+        self,
+        documents: List[dict],
+        action: str,
+        on_saved: Optional[Callable] = None,
+    ) -> None:
+        """Save a page right away, or queue it for the writers.
+
+        Args:
+            documents (List[dict]): Items of the page, may be empty to only call on_saved.
+            action (str): Action name of the items.
+            on_saved (callable, optional): Called after the page and all pages before are saved. Defaults to None.
+        """
+
+        if self._pipeline:
+            self._pipeline.submit(documents, action, on_saved)
+            return
+
+        if documents:
+            self._save_documents(documents, action)
+
+        if on_saved:
+            on_saved()
+
+    def __drain(self) -> None:
+        """Wait for the writers, before the next stage reads the saved documents."""
+        if self._pipeline:
+            self._pipeline.drain()
+
+    def get_workflows(self) -> None:
+        """Fetching workflows data from GitHub API."""
 
         # start fetching
         logger.debug(f"Start fetching workflows")
 
-        self.paginating(github_url, "workflows")
+        self.paginating(*self._listing("workflow"))
 
         logger.debug(f"Finish fetching workflows")
 
     def get_runs(self) -> None:
         """Fetching workflows' runs data from GitHub API."""
 
-        # set what action to run and starting page
-        self.current_action = "run"
-        self.page = 1
-
-        # constructing the GET url
-        url = self.actions_url["run"].format(
-            owner=self.owner, repo=self.repo, per_page=self.per_page
-        )
-        github_url = self.api_url + url
-
         # start fetching
         logger.debug(f"Start fetching runs")
 
-        self.paginating(github_url, "workflow_runs")
+        if self.run_shards:
+            self.__get_sharded_runs()
+        else:
+            self.paginating(*self._listing("run"))
 
         logger.debug(f"Finish fetching runs")
 
-    def get_jobs(self, run_id: int) -> None:
-        """Fetching runs' jobs data from GitHub API for specific run id.
+    def __get_sharded_runs(self) -> None:
+        """Fetch the runs in created date windows concurrently, a window with
+        more runs than the result cap of a query is split in halves.
+        """
+
+        # the first window starts with the repository
+        created_at = None
+        if not self.since:
+            data, _ = self.__fetch_page(self._action_url("repository"))
+            created_at = data["created_at"]
+
+        windows = self._run_windows(created_at)
+        with ThreadPoolExecutor(max_workers=self.run_shards) as executor:
+            futures = {executor.submit(self.__fetch_run_window, *w) for w in windows}
+
+            try:
+                while futures:
+                    done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for window in future.result():
+                            futures.add(
+                                executor.submit(self.__fetch_run_window, *window)
+                            )
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        logger.debug(f"Listed {len(self._listed_runs)} runs in sharded windows")
+
+    def __fetch_run_window(
+        self, start: dt.datetime, end: dt.datetime
+    ) -> List[Tuple[dt.datetime, dt.datetime]]:
+        """Fetch all runs created in a window.
 
         Args:
-            run_id (int): Run id to get the jobs.
-        """
+            start (datetime): First created second of the window, naive UTC.
+            end (datetime): Last created second of the window, naive UTC.
 
-        # set what action to run and starting page
-        self.current_action = "job"
-        self.page = 1
+        Returns:
+            List[Tuple[datetime, datetime]]: The halves of the window, if it has more runs than the result cap, otherwise empty.
+        """
 
-        # constructing the GET url
-        url = self.actions_url["job"].format(
-            owner=self.owner, repo=self.repo, run_id=run_id, per_page=self.per_page
+        pagination = self._pagination(
+            self._window_url(start, end), "run", "workflow_runs", fan_out=False
         )
-        github_url = self.api_url + url
 
-        self.paginating(github_url, "jobs")
+        while not pagination.done:
+            data, _ = self.__fetch_page(pagination.page_url())
+            if pagination.page == 1:
+                halves = self._split_capped_window(start, end, data)
+                if halves:
+                    return halves
 
-    def get_artifacts(self) -> None:
-        """Fetching artifacts data from GitHub API."""
+            # a run is only saved by the first window listing it
+            runs = self._unlisted_runs(pagination.take(data))
 
-        # set what action to run and starting page
-        self.current_action = "artifact"
-        self.page = 1
+            self.metrics.inc("pages_total", action="run")
+            if runs:
+                self.__save(runs, "run")
 
-        # constructing the GET url
-        url = self.actions_url["artifact"].format(
-            owner=self.owner, repo=self.repo, per_page=self.per_page
-        )
-        github_url = self.api_url + url
+        return []
+
+    def get_jobs(self, run_id: int) -> None:
+        """Fetching runs' jobs data from GitHub API for specific run id.
+
+        Args:
+            run_id (int): Run id to get the jobs.
+        """
+        self.paginating(*self._listing("job", run_id=run_id))
+
+    def get_artifacts(self) -> None:
+        """Fetching artifacts data from GitHub API."""
 
         # start fetching
         logger.debug(f"Start fetching artifacts")
 
-        self.paginating(github_url, "artifacts")
+        self.paginating(*self._listing("artifact"))
 
         logger.debug(f"Finish fetching artifacts")
 
-    def __finishing_message(self):
-        """
-        Finish message to append after finishing run()
+    def __fetch_run_jobs(self, run_id: int) -> None:
+        """Fetch the jobs of a run and record it in the checkpoint.
+
+        Args:
+            run_id (int): Run id to get the jobs.
         """
-        logger.debug(f"Number of requests: {self.total_requests}")
-        logger.debug(f"Number of stopping: {self.limit_handler_counter}")
-        logger.debug("Finished fetching actions.")
 
-    def run(self, runs_object=None) -> None:
-        """Collect all action's data form a repository.
+        # skip the remaining runs once a worker has failed
+        if self.__abort.is_set():
+            return
+
+        try:
+            self.get_jobs(run_id)
+        except BaseException:
+            self.__abort.set()
+            raise
+
+        # the run is finished after its jobs are saved
+        self.__save([], "job", self._run_done(run_id))
+
+    def __jobs_worker(self, run_ids: Iterator[int]) -> None:
+        """Fetch jobs for run ids taken from a shared iterator.
 
         Args:
-            runs_object (Document): Runs collection to extract all run ids.
+            run_ids (Iterator[int]): Iterator shared between all workers.
         """
 
-        # verify correct token if any
-        if self.__token:
-            if not self.authenticate_user():
-                sys.exit(1)
+        while not self.__abort.is_set():
+            # a generator can only be advanced by one thread at a time
+            with self._lock:
+                run_id = next(run_ids, None)
 
-        if not self.__token:
-            logger.debug(f"Proceding without token")
+            if run_id is None:
+                return
 
-        # fetching actions
-        self.get_workflows()
-        self.get_artifacts()
-        self.get_runs()
+            self.__fetch_run_jobs(run_id)
 
-        # if Run object was passed, for each run get jobs
-        if not runs_object:
-            logger.error("Run object is not passed")
-            logger.error("Run object is needed to get Jobs")
-            self.__finishing_message()
-            sys.exit(1)
+    def run(
+        self, run_ids: Optional[Callable[[Optional[dt.datetime]], Iterable[int]]] = None
+    ) -> None:
+        """Collect all action's data form a repository.
+
+        Args:
+            run_ids (callable): Called with since to get the stored run ids of the repository in ascending order, e.g. Mongo.run_ids.
+
+        Raises:
+            GitHubRequestError: If a request failed, the checkpoint is saved before.
+        """
 
-        # collect ids in a list to avoid cursor timeout
-        logger.debug("Collecting run ids")
-        run_ids = [run.run_id for run in runs_object.objects()]
+        # verify correct tokens if any
+        if self._needs_authentication() and not self.authenticate_user():
+            sys.exit(1)
 
-        # logger is used here to not log each time the function excutes
-        logger.debug(f"Start fetching jobs")
-        for run in run_ids:
-            self.get_jobs(run)
-        logger.debug(f"Finish fetching jobs")
+        # if run ids source was passed, for each run get jobs
+        if not run_ids:
+            logger.error("Run ids source is not passed")
+            logger.error("Run ids source is needed to get Jobs")
+            self._finishing_message()
+            sys.exit(1)
 
-        self.__finishing_message()
+        self._open_pipeline()
+
+        try:
+            # fetching actions, skipping the ones finished before resuming
+            for action, fetch in [
+                ("workflow", self.get_workflows),
+                ("artifact", self.get_artifacts),
+                ("run", self.get_runs),
+            ]:
+                if self._skip_action(action):
+                    continue
+
+                # the queued pages are saved within the stage
+                with self._stage(action):
+                    fetch()
+                    self.__drain()
+
+                # runs need the saved workflows, jobs need the saved runs
+                self.checkpoint.action_done(action)
+
+            with self._stage("job"):
+                # only fetch jobs of runs listed by an incremental crawl,
+                # the ids are streamed in ascending order to resume
+                run_ids = self.checkpoint.pending_runs(run_ids(self.since))
+
+                # logger is used here to not log each time the function excutes
+                logger.debug(f"Start fetching jobs with {self.workers} worker(s)")
+                if self.workers == 1:
+                    for run in run_ids:
+                        self.__fetch_run_jobs(run)
+                else:
+                    with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                        futures = [
+                            executor.submit(self.__jobs_worker, run_ids)
+                            for _ in range(self.workers)
+                        ]
+
+                        # raise exceptions from the workers
+                        for future in futures:
+                            future.result()
+                self.__drain()
+            logger.debug(f"Finish fetching jobs")
+        except BaseException:
+            self._interrupted()
+            raise
+
+        self._close_pipeline()
+
+        self.checkpoint.clear()
+
+        self._finishing_message()
@@ -0,0 +1,272 @@
+from typing import BinaryIO, Mapping, Optional
+import os
+import json
+import hashlib
+import threading
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.http_cache")
+
+
+class HTTPCache:
+    """
+    Persistent size bounded cache of response bodies and their ETag / Last-Modified
+    validators, to send conditional requests. GitHub does not count 304 responses
+    against the rate limit."""
+
+    def __init__(self, directory: str, max_bytes: int = 1024 * 1024 * 1024) -> None:
+        """Open or create the cache directory.
+
+        Args:
+            directory (str): Directory of the cache files.
+            max_bytes (int): Maximum total size of the cache files. Defaults to 1 GiB.
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self.__lock = threading.Lock()
+        self.__size = sum(
+            entry.stat().st_size
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".cache")
+        )
+
+    def __path(self, url: str) -> str:
+        """File path of the cache entry of a url."""
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{key}.cache")
+
+    def validators(self, url: str) -> dict:
+        """Conditional request headers for a cached url.
+
+        Args:
+            url (str): Request url.
+
+        Returns:
+            dict: If-None-Match and If-Modified-Since headers, empty if not cached.
+        """
+
+        try:
+            with open(self.__path(url), "rb") as f:
+                meta = json.loads(f.readline())
+        except (OSError, ValueError):
+            return {}
+
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+        return headers
+
+    def body(self, url: str) -> Optional[bytes]:
+        """Cached body of a url, after a 304 response.
+
+        Args:
+            url (str): Request url.
+
+        Returns:
+            Optional[bytes]: The body or None if it was evicted meanwhile.
+        """
+
+        path = self.__path(url)
+        try:
+            with open(path, "rb") as f:
+                f.readline()
+                body = f.read()
+        except OSError:
+            with self.__lock:
+                self.misses += 1
+            return None
+
+        # the modification time orders the entries for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        with self.__lock:
+            self.hits += 1
+
+        return body
+
+    def store(self, url: str, headers: Mapping, body: bytes) -> None:
+        """Store a 200 response, if it has a validator.
+
+        Args:
+            url (str): Request url.
+            headers (Mapping): Response headers.
+            body (bytes): Raw response body.
+        """
+
+        entry = self.__open_entry(url, headers)
+        if not entry:
+            return
+
+        entry.write(body)
+        self.commit(url, entry)
+
+    def tee(self, url: str, headers: Mapping, stream: BinaryIO) -> BinaryIO:
+        """Wrap a streamed 200 response, storing the body while it is read.
+
+        Args:
+            url (str): Request url.
+            headers (Mapping): Response headers.
+            stream (BinaryIO): Raw response body.
+
+        Returns:
+            BinaryIO: Readable stream, the entry is stored when it is closed after reading to the end.
+        """
+
+        entry = self.__open_entry(url, headers)
+        if not entry:
+            return stream
+
+        return _TeeReader(self, url, stream, entry)
+
+    def __open_entry(self, url: str, headers: Mapping) -> Optional[BinaryIO]:
+        """Open a temporary file for a new entry, if the response has a validator.
+
+        Args:
+            url (str): Request url.
+            headers (Mapping): Response headers.
+
+        Returns:
+            Optional[BinaryIO]: The file, positioned after the meta line.
+        """
+
+        with self.__lock:
+            self.misses += 1
+
+        meta = {
+            "url": url,
+            "etag": headers.get("ETag"),
+            "last_modified": headers.get("Last-Modified"),
+        }
+        if not meta["etag"] and not meta["last_modified"]:
+            return None
+
+        # write to a temporary file first, readers never see partial entries
+        tmp_path = f"{self.__path(url)}.{threading.get_ident()}.tmp"
+        entry = open(tmp_path, "wb")
+        entry.write(json.dumps(meta).encode("utf-8") + b"\n")
+
+        return entry
+
+    def commit(self, url: str, entry: BinaryIO) -> None:
+        """Replace the entry of a url with a completely written temporary file.
+
+        Args:
+            url (str): Request url.
+            entry (BinaryIO): File returned by __open_entry.
+        """
+
+        path = self.__path(url)
+
+        try:
+            old_size = os.path.getsize(path)
+        except OSError:
+            old_size = 0
+
+        new_size = entry.tell()
+        entry.close()
+        os.replace(entry.name, path)
+
+        with self.__lock:
+            self.__size += new_size - old_size
+            evict = self.__size > self.max_bytes
+
+        if evict:
+            self.__evict()
+
+    def discard(self, entry: BinaryIO) -> None:
+        """Delete an incompletely written temporary file.
+
+        Args:
+            entry (BinaryIO): File returned by __open_entry.
+        """
+        entry.close()
+        try:
+            os.remove(entry.name)
+        except OSError:
+            pass
+
+    def __evict(self) -> None:
+        """Delete the least recently used entries down to 90% of max_bytes."""
+
+        with self.__lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if not entry.name.endswith(".cache"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+            entries.sort()
+            self.__size = sum(size for _, size, _ in entries)
+
+            target = self.max_bytes * 0.9
+            evicted = 0
+            for _, size, path in entries:
+                if self.__size <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                self.__size -= size
+                evicted += 1
+
+        logger.debug(f"Evicted {evicted} entries from the HTTP cache")
+
+    def stats(self) -> dict:
+        """Summary of the cache usage.
+
+        Returns:
+            dict: size_bytes, hits and misses.
+        """
+        return {"size_bytes": self.__size, "hits": self.hits, "misses": self.misses}
+
+
+class _TeeReader:
+    """
+    Readable stream copying everything read into a cache entry"""
+
+    def __init__(
+        self, cache: HTTPCache, url: str, stream: BinaryIO, entry: BinaryIO
+    ) -> None:
+        self.cache = cache
+        self.url = url
+        self.stream = stream
+        self.entry = entry
+        self.complete = False
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.stream.read(size)
+        if data:
+            self.entry.write(data)
+        elif size != 0:
+            self.complete = True
+        return data
+
+    def close(self) -> None:
+        """Store the entry if the body was read to the end, otherwise drop it."""
+        if self.entry.closed:
+            return
+
+        if self.complete:
+            self.cache.commit(self.url, self.entry)
+        else:
+            self.cache.discard(self.entry)
@@ -0,0 +1,282 @@
+from typing import Dict, Iterator, Optional, Tuple
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import os
+import re
+import json
+import time
+import threading
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.metrics")
+
+# upper bounds in seconds of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def endpoint(url: str) -> str:
+    """Endpoint of a GitHub API url, without repository, ids and query.
+
+    Args:
+        url (str): GitHub API url, e.g. https://api.github.com/repos/o/r/actions/runs/1/jobs?page=2.
+
+    Returns:
+        str: e.g. /actions/runs/{id}/jobs.
+    """
+    path = re.sub(r"^/repos/[^/]+/[^/]+", "", urlparse(url).path)
+    return re.sub(r"/\d+(?=/|$)", "/{id}", path) or "/"
+
+
+class Metrics:
+    """
+    Thread-safe counters, gauges and histograms of a crawl, exported in the
+    Prometheus text format and as a JSON summary"""
+
+    def __init__(
+        self,
+        namespace: str = "actionshark",
+        prometheus_file: Optional[str] = None,
+        json_file: Optional[str] = None,
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """Initializing empty metrics.
+
+        Args:
+            namespace (str): Prefix of the metric names. Defaults to "actionshark".
+            prometheus_file (str, optional): File written by export in the Prometheus text format, e.g. for the node exporter textfile collector. Defaults to None.
+            json_file (str, optional): File written by export with the JSON summary. Defaults to None.
+            buckets (Tuple[float, ...]): Upper bounds of the histogram buckets in seconds.
+        """
+
+        self.namespace = namespace
+        self.prometheus_file = prometheus_file
+        self.json_file = json_file
+        self.buckets = tuple(sorted(buckets))
+
+        self.__lock = threading.Lock()
+        self.__start = time.monotonic()
+
+        # keyed by name and sorted label items
+        self.__counters: Dict[Tuple, float] = {}
+        self.__gauges: Dict[Tuple, float] = {}
+        self.__histograms: Dict[Tuple, dict] = {}
+
+    def __key(self, name: str, labels: dict) -> Tuple:
+        return (f"{self.namespace}_{name}", tuple(sorted(labels.items())))
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        """Increase a counter.
+
+        Args:
+            name (str): Metric name without namespace.
+            value (float): Amount to add. Defaults to 1.
+        """
+        key = self.__key(name, labels)
+        with self.__lock:
+            self.__counters[key] = self.__counters.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        """Set a gauge.
+
+        Args:
+            name (str): Metric name without namespace.
+            value (float): Current value.
+        """
+        with self.__lock:
+            self.__gauges[self.__key(name, labels)] = value
+
+    def set_stats(self, name: str, stats: dict, **labels) -> None:
+        """Set a gauge for each numeric value of a stats dict, e.g. HTTPCache.stats.
+
+        Args:
+            name (str): Prefix of the metric names without namespace.
+            stats (dict): Values keyed by the metric name suffix.
+        """
+        for key, value in stats.items():
+            if isinstance(value, (int, float)):
+                self.set(f"{name}_{key}", value, **labels)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Add a value to a histogram.
+
+        Args:
+            name (str): Metric name without namespace.
+            value (float): Observed value, e.g. a duration in seconds.
+        """
+        key = self.__key(name, labels)
+        with self.__lock:
+            histogram = self.__histograms.get(key)
+            if histogram is None:
+                histogram = {
+                    "buckets": [0] * len(self.buckets),
+                    "count": 0,
+                    "sum": 0.0,
+                    "max": 0.0,
+                }
+                self.__histograms[key] = histogram
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+
+            histogram["count"] += 1
+            histogram["sum"] += value
+            histogram["max"] = max(histogram["max"], value)
+
+    @contextmanager
+    def time(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of a block in a histogram.
+
+        Args:
+            name (str): Metric name without namespace.
+        """
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - start, **labels)
+
+    @staticmethod
+    def __series(name: str, labels: Tuple, extra: Tuple = ()) -> str:
+        """Name and labels of a sample in the Prometheus text format."""
+        items = [
+            (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for k, v in labels + extra
+        ]
+        if not items:
+            return name
+        return name + "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+    def prometheus(self) -> str:
+        """All metrics in the Prometheus text format.
+
+        Returns:
+            str
+        """
+
+        with self.__lock:
+            counters = sorted(self.__counters.items())
+            gauges = sorted(self.__gauges.items())
+            histograms = sorted(
+                (key, dict(h, buckets=list(h["buckets"])))
+                for key, h in self.__histograms.items()
+            )
+
+        lines = []
+        typed = set()
+
+        def add_type(name: str, kind: str) -> None:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            add_type(name, "counter")
+            lines.append(f"{self.__series(name, labels)} {value}")
+
+        for (name, labels), value in gauges:
+            add_type(name, "gauge")
+            lines.append(f"{self.__series(name, labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            add_type(name, "histogram")
+
+            # buckets are cumulative in the text format
+            cumulative = 0
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                cumulative += count
+                series = self.__series(f"{name}_bucket", labels, (("le", bound),))
+                lines.append(f"{series} {cumulative}")
+
+            series = self.__series(f"{name}_bucket", labels, (("le", "+Inf"),))
+            lines.append(f"{series} {histogram['count']}")
+            lines.append(f"{self.__series(f'{name}_sum', labels)} {histogram['sum']}")
+            lines.append(
+                f"{self.__series(f'{name}_count', labels)} {histogram['count']}"
+            )
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> dict:
+        """All metrics as JSON serializable dict, with the rate per second of the counters.
+
+        Returns:
+            dict: elapsed_seconds, counters, rates, gauges and histograms with count, sum, mean and max.
+        """
+
+        elapsed = time.monotonic() - self.__start
+
+        with self.__lock:
+            counters = {self.__series(*key): v for key, v in self.__counters.items()}
+            gauges = {self.__series(*key): v for key, v in self.__gauges.items()}
+            histograms = {
+                self.__series(*key): {
+                    "count": h["count"],
+                    "sum": round(h["sum"], 6),
+                    "mean": round(h["sum"] / h["count"], 6) if h["count"] else 0.0,
+                    "max": round(h["max"], 6),
+                }
+                for key, h in self.__histograms.items()
+            }
+
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "counters": counters,
+            "rates": {
+                name: round(value / elapsed, 3) if elapsed else 0.0
+                for name, value in counters.items()
+            },
+            "gauges": gauges,
+            "histograms": histograms,
+        }
+
+    def export(self) -> None:
+        """Write the configured Prometheus and JSON files, replacing them atomically."""
+
+        for path, content in [
+            (self.prometheus_file, self.prometheus),
+            (self.json_file, lambda: json.dumps(self.summary(), indent=2)),
+        ]:
+            if not path:
+                continue
+
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(content())
+            os.replace(tmp_path, path)
+
+    def serve(self, port: int, host: str = "") -> ThreadingHTTPServer:
+        """Serve the metrics in the Prometheus text format from a daemon thread.
+
+        Args:
+            port (int): Port to listen on.
+            host (str): Address to bind. Defaults to all interfaces.
+
+        Returns:
+            ThreadingHTTPServer: The running server, stopped with shutdown().
+        """
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                body = metrics.prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        logger.debug(f"Serving metrics on port {server.server_port}")
+
+        return server
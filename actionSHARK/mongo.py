@@ -1,12 +1,18 @@
 import sys
+import threading
 import datetime as dt
-from typing import Optional, Any, Tuple, List
+from typing import Optional, Any, Tuple, List, Iterator
 import logging
 
 from pycoshark.utils import create_mongodb_uri_string
 from pycoshark.mongomodels import VCSSystem, Commit
 
-from mongoengine import connect
+from actionSHARK.cache import LRUCache
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
+from pymongo.write_concern import WriteConcern
+from mongoengine import connect, NotUniqueError
 from mongoengine import (
     Document,
     StringField,
@@ -14,6 +20,8 @@ from mongoengine import (
     IntField,
     BooleanField,
     ObjectIdField,
+    ListField,
+    DictField,
     EmbeddedDocument,
     EmbeddedDocumentListField,
 )
@@ -37,6 +45,12 @@ class Workflow(Document):
     project_id = ObjectIdField(default=None)
     vcs_system_id = ObjectIdField(default=None)
 
+    # indexes are created by Mongo at startup
+    meta = {
+        "indexes": [{"fields": ["workflow_id"], "unique": True}],
+        "auto_create_index": False,
+    }
+
 
 class RunPullRequest(EmbeddedDocument):
     """
@@ -79,6 +93,11 @@ class Run(Document):
     triggering_commit_message = StringField()
     triggering_commit_timestamp = DateTimeField()
 
+    meta = {
+        "indexes": [{"fields": ["run_id"], "unique": True}],
+        "auto_create_index": False,
+    }
+
 
 class JobStep(EmbeddedDocument):
     """
@@ -112,6 +131,12 @@ class Job(Document):
     runner_group_id = IntField()
     runner_group_name = StringField()
 
+    # run_id serves the lookup of the jobs already stored for a run
+    meta = {
+        "indexes": [{"fields": ["job_id"], "unique": True}, {"fields": ["run_id"]}],
+        "auto_create_index": False,
+    }
+
 
 class Artifact(Document):
     """
@@ -125,9 +150,35 @@ class Artifact(Document):
     created_at = DateTimeField()
     updated_at = DateTimeField()
     expires_at = DateTimeField()
+    project_url = StringField(default=None)
     project_id = ObjectIdField(default=None)
     vcs_system_id = ObjectIdField(default=None)
 
+    meta = {
+        "indexes": [{"fields": ["artifact_id"], "unique": True}],
+        "auto_create_index": False,
+    }
+
+
+class SyncState(Document):
+    """
+    SyncState collection schema, high-water mark of incremental crawls"""
+
+    project_url = StringField(required=True, unique=True)
+    high_water_mark = DateTimeField()
+    updated_at = DateTimeField()
+
+
+class CrawlCheckpoint(Document):
+    """
+    CrawlCheckpoint collection schema, position of an unfinished crawl"""
+
+    project_url = StringField(required=True, unique=True)
+    completed_actions = ListField(StringField(), default=[])
+    pages = DictField(default={})
+    last_run_id = IntField(default=None)
+    updated_at = DateTimeField()
+
 
 class Mongo:
     def __init__(
@@ -140,19 +191,26 @@ class Mongo:
         db_port: int = 27017,
         db_authentication_database: Optional[str] = None,
         db_ssl_enabled: bool = False,
+        bulk_write: bool = False,
+        write_concern: Optional[WriteConcern] = None,
+        cache_size: int = 100000,
+        db_uri: Optional[str] = None,
     ) -> None:
 
-        self.__operations = {
-            "workflow": self.__upsert_workflow,
-            "run": self.__upsert_run,
-            "job": self.__upsert_job,
-            "artifact": self.__upsert_artifact,
-        }
-
         self.db_database = db_database
-        self.project_url = project_url
+        self.bulk_write = bulk_write
+        self.write_concern = write_concern
+
+        # ObjectIds resolved on the hot path, commits and projects are mostly missing
+        self.__project_ids = LRUCache(cache_size)
+        self.__workflow_ids = LRUCache(cache_size, cache_none=False)
+        self.__run_ids = LRUCache(cache_size, cache_none=False)
+        self.__commit_ids = LRUCache(cache_size)
 
-        self.__conn_uri = create_mongodb_uri_string(
+        self.__bind_project(project_url)
+
+        # a full connection uri, e.g. mongomock://localhost, replaces the host settings
+        self.__conn_uri = db_uri or create_mongodb_uri_string(
             db_user,
             db_password,
             db_hostname,
@@ -165,13 +223,300 @@ class Mongo:
 
         logger.debug(f"Mongo connected to {db_database}")
 
+        self.__create_indexes()
+
     # define a property to pass to github class for fetching jobs
     @property
     def runs(self):
         return Run
 
+    def run_ids(
+        self,
+        since: Optional[dt.datetime] = None,
+        chunk_size: int = 1000,
+        skip_ingested: bool = False,
+    ) -> Iterator[int]:
+        """Run ids of the repository in ascending order, to fetch their jobs.
+        Only the needed fields are read, in chunks queried after the last returned id,
+        so no cursor is kept open between chunks.
+
+        Args:
+            since (datetime, optional): Only runs created since this UTC time. Defaults to None.
+            chunk_size (int): Number of runs read per query. Defaults to 1000.
+            skip_ingested (bool): Skip completed runs, whose jobs of the latest attempt are stored and completed. Defaults to False.
+
+        Returns:
+            Iterator[int]
+        """
+
+        query = {"workflow_id": {"$in": self.__project_workflow_object_ids()}}
+        if since:
+            query["created_at"] = {"$gte": since}
+
+        projection = {"run_id": 1, "_id": 0}
+        if skip_ingested:
+            projection = {"run_id": 1, "status": 1, "run_attempt": 1}
+
+        collection = Run._get_collection()
+        while True:
+            chunk = list(
+                collection.find(query, projection).sort("run_id", 1).limit(chunk_size)
+            )
+
+            pending = chunk
+            if skip_ingested:
+                pending = self.__runs_without_jobs(chunk)
+                logger.debug(
+                    f"Skipping {len(chunk) - len(pending)} of {len(chunk)} runs with stored jobs"
+                )
+
+            yield from (son["run_id"] for son in pending)
+
+            if len(chunk) < chunk_size:
+                return
+
+            query["run_id"] = {"$gt": chunk[-1]["run_id"]}
+
+    def artifacts(self, chunk_size: int = 1000) -> Iterator[dict]:
+        """Unexpired artifacts of the repository in ascending order, to download their archives.
+
+        Args:
+            chunk_size (int): Number of artifacts read per query. Defaults to 1000.
+
+        Returns:
+            Iterator[dict]: artifact_id, size_in_bytes and archive_download_url of each artifact.
+        """
+
+        _, project_id = self.__project_object_id(self.project_url)
+
+        # artifacts of projects missing in vcs_system only have the url
+        query = {"project_url": self.project_url, "expired": False}
+        if project_id:
+            query = {"project_id": project_id, "expired": False}
+
+        projection = {
+            "artifact_id": 1,
+            "size_in_bytes": 1,
+            "archive_download_url": 1,
+            "_id": 0,
+        }
+
+        collection = Artifact._get_collection()
+        while True:
+            chunk = list(
+                collection.find(query, projection)
+                .sort("artifact_id", 1)
+                .limit(chunk_size)
+            )
+
+            yield from (son for son in chunk if son.get("archive_download_url"))
+
+            if len(chunk) < chunk_size:
+                return
+
+            query["artifact_id"] = {"$gt": chunk[-1]["artifact_id"]}
+
+    def project_documents(self, action: str, batch_size: int = 1000) -> Iterator[dict]:
+        """Raw documents of an action of the repository, read in batches.
+        Jobs carry the GitHub id of their run in run_github_id, as their run_id
+        is the ObjectId of the run.
+
+        Args:
+            action (str): Action name.
+            batch_size (int): Number of documents read per round trip. Defaults to 1000.
+
+        Returns:
+            Iterator[dict]
+        """
+
+        model = self.__mappers[action][0]
+
+        # runs and jobs belong to the repository through their workflow
+        if action in ["run", "job"]:
+            query = {"workflow_id": {"$in": self.__project_workflow_object_ids()}}
+        else:
+            _, project_id = self.__project_object_id(self.project_url)
+            query = {"project_url": self.project_url}
+            if project_id:
+                query = {"project_id": project_id}
+
+        if action != "job":
+            yield from model._get_collection().find(query, batch_size=batch_size)
+            return
+
+        # jobs of a chunk of runs at a time, no runs cursor is kept open meanwhile
+        runs = Run._get_collection()
+        while True:
+            run_github_ids = {
+                son["_id"]: son.get("run_id")
+                for son in runs.find(query, {"_id": 1, "run_id": 1})
+                .sort("_id", 1)
+                .limit(batch_size)
+            }
+            if not run_github_ids:
+                return
+
+            for son in Job._get_collection().find(
+                {"run_id": {"$in": list(run_github_ids)}}, batch_size=batch_size
+            ):
+                son["run_github_id"] = run_github_ids[son["run_id"]]
+                yield son
+
+            query["_id"] = {"$gt": max(run_github_ids)}
+
+    def __runs_without_jobs(self, runs: List[dict]) -> List[dict]:
+        """Filter the runs, whose jobs may be missing or may still change.
+        Completed runs with stored and completed jobs of their latest attempt never change.
+
+        Args:
+            runs (List[dict]): Runs with _id, status and run_attempt.
+
+        Returns:
+            List[dict]: New runs, runs not yet completed, runs with a new attempt and
+            runs with jobs stored before they completed.
+        """
+
+        completed = [son["_id"] for son in runs if son.get("status") == "completed"]
+        if not completed:
+            return runs
+
+        # latest attempt of the stored jobs of each run and its jobs not yet completed
+        attempts = {
+            son["_id"]: (son["run_attempt"] or 0, son["open_jobs"])
+            for son in Job._get_collection().aggregate(
+                [
+                    {"$match": {"run_id": {"$in": completed}}},
+                    {
+                        "$group": {
+                            "_id": {"run_id": "$run_id", "run_attempt": "$run_attempt"},
+                            "open_jobs": {
+                                "$sum": {
+                                    "$cond": [{"$eq": ["$status", "completed"]}, 0, 1]
+                                }
+                            },
+                        }
+                    },
+                    {"$sort": {"_id.run_attempt": -1}},
+                    {
+                        "$group": {
+                            "_id": "$_id.run_id",
+                            "run_attempt": {"$first": "$_id.run_attempt"},
+                            "open_jobs": {"$first": "$open_jobs"},
+                        }
+                    },
+                ]
+            )
+        }
+
+        return [
+            son
+            for son in runs
+            if son.get("status") != "completed"
+            or son["_id"] not in attempts
+            or attempts[son["_id"]][0] < (son.get("run_attempt") or 0)
+            or attempts[son["_id"]][1] > 0
+        ]
+
     # ~ essential functions
 
+    def __bind_project(self, project_url: str) -> None:
+        """Set the repository, whose documents are upserted.
+
+        Args:
+            project_url (str): The repository url.
+        """
+
+        self.project_url = project_url
+
+        self.__operations = {
+            "workflow": self.__upsert_workflow,
+            "run": self.__upsert_run,
+            "job": self.__upsert_job,
+            "artifact": self.__upsert_artifact,
+        }
+
+        # document class, natural key and mapping function of each action
+        self.__mappers = {
+            "workflow": (Workflow, "workflow_id", self.__map_workflow),
+            "run": (Run, "run_id", self.__map_run),
+            "job": (Job, "job_id", self.__map_job),
+            "artifact": (Artifact, "artifact_id", self.__map_artifact),
+        }
+
+        # created_at of upserted runs, to compute the next high-water mark
+        self.__lock = threading.Lock()
+        self.__latest_run = None
+        self.__oldest_open_run = None
+
+    def for_project(self, project_url: str) -> "Mongo":
+        """Mongo instance of another repository, sharing the connection and the
+        lookup caches, which are keyed by GitHub ids and urls.
+
+        Args:
+            project_url (str): The repository url.
+
+        Returns:
+            Mongo: Instance upserting the documents of the repository.
+        """
+
+        mongo = Mongo.__new__(Mongo)
+        mongo.__dict__.update(self.__dict__)
+        mongo.__bind_project(project_url)
+
+        return mongo
+
+    def __create_indexes(self) -> None:
+        """Create the unique natural key indexes of the actionSHARK collections."""
+
+        for model in [Workflow, Run, Job, Artifact]:
+            try:
+                model.ensure_indexes()
+            except OperationFailure as e:
+                # existing duplicates from older versions prevent unique indexes
+                logger.error(
+                    f"Could not create indexes of {model._get_collection_name()}, "
+                    f"remove duplicated documents and restart"
+                )
+                logger.error(e)
+
+    def __upsert(self, model: Any, key: str, temp_dict: dict) -> Any:
+        """Insert or update a document identified by its GitHub id.
+
+        Args:
+            model (Document): Document class.
+            key (str): Field name of the GitHub id.
+            temp_dict (dict): Fields of the document.
+
+        Returns:
+            Document: The upserted document.
+        """
+
+        # without its GitHub id the document would replace another one without it
+        if temp_dict.get(key) is None:
+            raise ValueError(f"{model.__name__} without {key}")
+
+        query = {key: temp_dict[key]}
+
+        # modify returns the document within the same round trip
+        try:
+            return model.objects(**query).modify(upsert=True, new=True, **temp_dict)
+        except NotUniqueError:
+            # another worker inserted the same document first, update it
+            return model.objects(**query).modify(upsert=True, new=True, **temp_dict)
+
+    def cache_stats(self) -> dict:
+        """Usage of the ObjectId lookup caches.
+
+        Returns:
+            dict: Stats of each cache.
+        """
+        return {
+            "project": self.__project_ids.stats(),
+            "workflow": self.__workflow_ids.stats(),
+            "run": self.__run_ids.stats(),
+            "commit": self.__commit_ids.stats(),
+        }
+
     def drop_database(self) -> None:
         """Drop current connected database."""
         self.__conn.drop_database(self.db_database)
@@ -203,6 +548,106 @@ class Mongo:
 
         return True
 
+    def get_high_water_mark(self) -> Optional[dt.datetime]:
+        """Find the high-water mark of the last crawl of the repository.
+
+        Returns:
+            Optional[datetime]: Runs created before it were already crawled.
+        """
+        try:
+            state = SyncState.objects.get(project_url=self.project_url)
+        except SyncState.DoesNotExist:
+            return None
+
+        return state.high_water_mark
+
+    def save_high_water_mark(self) -> Optional[dt.datetime]:
+        """Store the high-water mark from the runs upserted in this crawl.
+        Runs not yet completed may still change, so the mark is not moved past them.
+
+        Returns:
+            Optional[datetime]: The stored mark, None if no runs were upserted.
+        """
+
+        with self.__lock:
+            mark = self.__oldest_open_run or self.__latest_run
+
+        if not mark:
+            return None
+
+        SyncState.objects(project_url=self.project_url).upsert_one(
+            project_url=self.project_url,
+            high_water_mark=mark,
+            updated_at=dt.datetime.utcnow(),
+        )
+
+        # the next crawl with this instance tracks its own runs
+        with self.__lock:
+            self.__latest_run = None
+            self.__oldest_open_run = None
+
+        logger.debug(f"High-water mark of {self.project_url} is set to {mark}")
+
+        return mark
+
+    def load_checkpoint(self) -> Optional[dict]:
+        """Find the checkpoint of an unfinished crawl of the repository.
+
+        Returns:
+            Optional[dict]: completed_actions, pages and last_run_id.
+        """
+        try:
+            checkpoint = CrawlCheckpoint.objects.get(project_url=self.project_url)
+        except CrawlCheckpoint.DoesNotExist:
+            return None
+
+        return {
+            "completed_actions": list(checkpoint.completed_actions),
+            "pages": dict(checkpoint.pages),
+            "last_run_id": checkpoint.last_run_id,
+        }
+
+    def save_checkpoint(self, state: dict) -> None:
+        """Store the checkpoint of the running crawl.
+
+        Args:
+            state (dict): completed_actions, pages and last_run_id.
+        """
+        CrawlCheckpoint.objects(project_url=self.project_url).upsert_one(
+            project_url=self.project_url,
+            completed_actions=state.get("completed_actions", []),
+            pages=state.get("pages", {}),
+            last_run_id=state.get("last_run_id"),
+            updated_at=dt.datetime.utcnow(),
+        )
+
+    def clear_checkpoint(self) -> None:
+        """Delete the checkpoint of the repository."""
+        CrawlCheckpoint.objects(project_url=self.project_url).delete()
+
+    def __track_run(self, created_at: Optional[dt.datetime], status: str) -> None:
+        """Keep track of the newest run and the oldest run not yet completed.
+
+        Args:
+            created_at (datetime): Creation time of the run.
+            status (str): Status of the run.
+        """
+
+        if not created_at:
+            return
+
+        # compare as naive UTC, the way mongo returns dates
+        created_at = created_at.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+        with self.__lock:
+            if not self.__latest_run or created_at > self.__latest_run:
+                self.__latest_run = created_at
+
+            if status != "completed" and (
+                not self.__oldest_open_run or created_at < self.__oldest_open_run
+            ):
+                self.__oldest_open_run = created_at
+
     def upsert_documents(
         self, documents: Optional[dict] = None, action: Optional[str] = None
     ) -> None:
@@ -224,6 +669,15 @@ class Mongo:
             logger.error(f"Action {action} was not found in predefined operations")
             return None
 
+        # resolve the triggering commits of a page with one query
+        if action == "run":
+            self.__prefetch_commit_object_ids([d.get("head_sha") for d in documents])
+
+        # save the whole page with one bulk operation
+        if self.bulk_write:
+            self.__bulk_upsert(documents, action)
+            return None
+
         # call the saving function for an action
         func = self.__operations[action]
 
@@ -234,12 +688,126 @@ class Mongo:
                 func(document)
             except Exception as e:
                 logger.error(
-                    f'Failed saving document action:{action}, id:{document["id"]}'
+                    f"Failed saving document action:{action}, id:{document.get('id')}"
                 )
                 logger.exception(e)
                 # continue to avoid system crash if saving document has failed
                 continue
 
+    def map_document(self, document: dict, action: str) -> dict:
+        """Map a GitHub item to the fields of its document, without saving it.
+
+        Args:
+            document (dict): The GitHub item.
+            action (str): Action name of the item.
+
+        Returns:
+            dict: Document fields, including the embedded documents.
+        """
+        _, _, mapper = self.__mappers[action]
+        return mapper(document)
+
+    def map_embedded_documents(self, document: dict, action: str) -> List[Any]:
+        """Create the embedded documents of a GitHub item, the pull requests of a
+        run or the steps of a job, without saving them.
+
+        Args:
+            document (dict): The GitHub item.
+            action (str): Action name of the item.
+
+        Returns:
+            List[Any]: The embedded documents, empty for other actions.
+        """
+        if action == "run":
+            return self.__create_list_embedded_docs(
+                "run_pull_request", document.get("pull_requests")
+            )
+        if action == "job":
+            return self.__create_list_embedded_docs("job_step", document.get("steps"))
+        return []
+
+    def parse_date(
+        self, value: Optional[str] = None, is_millisecond: bool = False
+    ) -> Optional[dt.datetime]:
+        """Convert a datetime string of a GitHub item, like the mapping does.
+
+        Args:
+            value (str): The datetime string to be converted. Defaults to None.
+            is_millisecond (bool, optional): If datetime has millisecond in the string. Defaults to False.
+
+        Returns:
+            datetime: datetime formated or None if no string passed.
+        """
+        return self.__parse_date(value, is_millisecond)
+
+    def __bulk_upsert(self, documents: List[dict], action: str) -> None:
+        """Upsert all documents of a page with one unordered bulk operation.
+        Failed documents are logged, without aborting the rest of the batch.
+
+        Args:
+            documents (List[dict]): Elements.
+            action (str): Action name to map objects to.
+        """
+
+        model, key, mapper = self.__mappers[action]
+        db_key = model._fields[key].db_field
+
+        operations = []
+        sources = []
+        mapped = []
+        keys = []
+        for document in documents:
+            try:
+                temp_dict = mapper(document)
+
+                # convert field values the same way mongoengine does
+                son = model(**temp_dict).to_mongo().to_dict()
+                son.pop("_id", None)
+
+                # a document without its GitHub id raises a KeyError
+                operation = UpdateOne({db_key: son[db_key]}, {"$set": son}, upsert=True)
+            except Exception as e:
+                logger.error(
+                    f"Failed saving document action:{action}, id:{document.get('id')}"
+                )
+                logger.exception(e)
+                continue
+
+            operations.append(operation)
+            sources.append(document)
+            mapped.append(temp_dict)
+            keys.append(son[db_key])
+
+        if not operations:
+            return
+
+        collection = model._get_collection()
+        if self.write_concern:
+            collection = collection.with_options(write_concern=self.write_concern)
+
+        failed = set()
+        try:
+            collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failed.add(error["index"])
+                logger.error(
+                    f'Failed saving document action:{action}, id:{sources[error["index"]]["id"]}'
+                )
+                logger.error(error.get("errmsg"))
+
+        # populate the lookup caches with one query
+        id_cache = {"workflow": self.__workflow_ids, "run": self.__run_ids}.get(action)
+        if id_cache is not None:
+            for son in collection.find({db_key: {"$in": keys}}, {db_key: 1}):
+                id_cache.put(son[db_key], son["_id"])
+
+        # keep track of the saved runs for the high-water mark
+        if action == "run":
+            for index, temp_dict in enumerate(mapped):
+                if index not in failed:
+                    self.__track_run(temp_dict["created_at"], temp_dict["status"])
+
     def __create_list_embedded_docs(
         self,
         sub_operation: Optional[str] = None,
@@ -285,6 +853,21 @@ class Mongo:
             obj (dict): The Object to upsert.
         """
 
+        temp_dict = self.__map_workflow(obj)
+
+        document = self.__upsert(Workflow, "workflow_id", temp_dict)
+        self.__workflow_ids.put(document.workflow_id, document.id)
+
+    def __map_workflow(self, obj: dict) -> dict:
+        """Map a GitHub workflow to the fields of a Workflow document.
+
+        Args:
+            obj (dict): The Object to map.
+
+        Returns:
+            dict: Workflow fields.
+        """
+
         temp_dict = {
             "workflow_id": self.__to_int(obj.get("id")),
             "name": obj.get("name"),
@@ -305,7 +888,7 @@ class Mongo:
             del temp_dict["vcs_system_id"]
             del temp_dict["project_id"]
 
-        Workflow.objects(**temp_dict).upsert_one(**temp_dict)
+        return temp_dict
 
     def __upsert_run(self, obj: dict) -> None:
         """Insert or update a Run document.
@@ -314,6 +897,23 @@ class Mongo:
             obj (dict): The Object to upsert.
         """
 
+        temp_dict = self.__map_run(obj)
+
+        document = self.__upsert(Run, "run_id", temp_dict)
+        self.__run_ids.put(document.run_id, document.id)
+
+        self.__track_run(temp_dict["created_at"], temp_dict["status"])
+
+    def __map_run(self, obj: dict) -> dict:
+        """Map a GitHub workflow run to the fields of a Run document.
+
+        Args:
+            obj (dict): The Object to map.
+
+        Returns:
+            dict: Run fields.
+        """
+
         temp_dict = {
             "run_id": self.__to_int(obj.get("id")),
             "run_number": self.__to_int(obj.get("run_number")),
@@ -348,7 +948,7 @@ class Mongo:
         if triggering_commit_id:
             temp_dict["triggering_commit_id"] = triggering_commit_id
 
-        Run.objects(**temp_dict).upsert_one(**temp_dict)
+        return temp_dict
 
     def __create_run_pull_request(self, obj: dict) -> RunPullRequest:
         """Create an embedded document pull request for a Run document.
@@ -388,6 +988,20 @@ class Mongo:
             obj (dict): The Object to upsert.
         """
 
+        temp_dict = self.__map_job(obj)
+
+        self.__upsert(Job, "job_id", temp_dict)
+
+    def __map_job(self, obj: dict) -> dict:
+        """Map a GitHub job to the fields of a Job document.
+
+        Args:
+            obj (dict): The Object to map.
+
+        Returns:
+            dict: Job fields.
+        """
+
         temp_dict = {
             "job_id": self.__to_int(obj.get("id")),
             "name": obj.get("name"),
@@ -405,7 +1019,7 @@ class Mongo:
             "runner_group_name": obj.get("runner_group_name"),
         }
 
-        Job.objects(**temp_dict).upsert_one(**temp_dict)
+        return temp_dict
 
     def __create_job_step(self, obj: dict) -> JobStep:
         """Create an embedded document step for a Job document.
@@ -435,6 +1049,20 @@ class Mongo:
             obj (dict): The Object to upsert.
         """
 
+        temp_dict = self.__map_artifact(obj)
+
+        self.__upsert(Artifact, "artifact_id", temp_dict)
+
+    def __map_artifact(self, obj: dict) -> dict:
+        """Map a GitHub artifact to the fields of an Artifact document.
+
+        Args:
+            obj (dict): The Object to map.
+
+        Returns:
+            dict: Artifact fields.
+        """
+
         temp_dict = {
             "artifact_id": self.__to_int(obj.get("id")),
             "name": obj.get("name"),
@@ -453,8 +1081,11 @@ class Mongo:
         # if project not yet in vcs_system add the repository url
         if not temp_dict["project_id"]:
             temp_dict["project_url"] = self.project_url
+            # delete keys with None to avoid errors
+            del temp_dict["vcs_system_id"]
+            del temp_dict["project_id"]
 
-        Artifact.objects(**temp_dict).upsert_one(**temp_dict)
+        return temp_dict
 
     # ~ query mongo collections
 
@@ -475,6 +1106,24 @@ class Mongo:
         if not v_workflow_id or not v_name:
             return None
 
+        return self.__workflow_ids.get_or_load(
+            v_workflow_id, lambda key: self.__find_workflow_object_id(key, v_name)
+        )
+
+    def __find_workflow_object_id(
+        self, v_workflow_id: int, v_name: str
+    ) -> Optional[ObjectIdField]:
+        """
+        Query Workflow object_id, creating a 'deleted' workflow if not found.
+
+        Args:
+            v_workflow_id (int): Workflow id.
+            v_name (str): Workflow Name.
+
+        Returns:
+            Optional[ObjectIdField]
+        """
+
         try:
             r = Workflow.objects.get(workflow_id=v_workflow_id).id
         except Workflow.DoesNotExist:
@@ -496,12 +1145,45 @@ class Mongo:
 
         return r
 
+    def __project_workflow_object_ids(self) -> List[ObjectIdField]:
+        """
+        Query the Workflow object_ids of the repository.
+
+        Returns:
+            List[ObjectIdField]
+        """
+
+        _, project_id = self.__project_object_id(self.project_url)
+
+        # workflows of projects missing in vcs_system only have the url
+        query = {"project_url": self.project_url}
+        if project_id:
+            query = {"project_id": project_id}
+
+        return [
+            son["_id"] for son in Workflow._get_collection().find(query, {"_id": 1})
+        ]
+
     def __project_object_id(
         self, value: str
     ) -> Tuple[Optional[ObjectIdField], Optional[ObjectIdField]]:
         """
         Find Repository project id from VCSSystem collection.
 
+        Args:
+            value (str): The URL to the repo.
+
+        Returns:
+            Optional(ObjectIdField, ObjectIdField)
+        """
+        return self.__project_ids.get_or_load(value, self.__find_project_object_id)
+
+    def __find_project_object_id(
+        self, value: str
+    ) -> Tuple[Optional[ObjectIdField], Optional[ObjectIdField]]:
+        """
+        Query VCSSystem for the ids of a repository.
+
         Args:
             value (str): The URL to the repo.
 
@@ -534,6 +1216,19 @@ class Mongo:
         if not value:
             return None
 
+        return self.__run_ids.get_or_load(value, self.__find_run_object_id)
+
+    def __find_run_object_id(self, value: int) -> Optional[ObjectIdField]:
+        """
+        Query Run object_id from Run collection.
+
+        Args:
+            value (int): Run id.
+
+        Returns:
+            Optional[ObjectIdField]
+        """
+
         try:
             r = Run.objects.get(run_id=value).id
         except Run.DoesNotExist:
@@ -557,6 +1252,43 @@ class Mongo:
         if not value:
             return None
 
+        return self.__commit_ids.get_or_load(value, self.__find_commit_object_id)
+
+    def __prefetch_commit_object_ids(self, values: List[Optional[str]]) -> None:
+        """
+        Query the Commit object_ids of many revision hashes at once and cache
+        them, including the ones not found.
+
+        Args:
+            values (List[str]): Revision hashes.
+        """
+
+        missing = [v for v in set(values) if v and v not in self.__commit_ids]
+        if not missing:
+            return
+
+        # projection on the two needed fields only
+        found = {
+            son["revision_hash"]: son["_id"]
+            for son in Commit._get_collection().find(
+                {"revision_hash": {"$in": missing}}, {"_id": 1, "revision_hash": 1}
+            )
+        }
+
+        for value in missing:
+            self.__commit_ids.put(value, found.get(value))
+
+    def __find_commit_object_id(self, value: str) -> Optional[ObjectIdField]:
+        """
+        Query Commit object_id from Commit collection.
+
+        Args:
+            value (str): Revision hash.
+
+        Returns:
+            Optional[ObjectIdField]
+        """
+
         try:
             r = Commit.objects.get(revision_hash=value).id
         except Commit.DoesNotExist:
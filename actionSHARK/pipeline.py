@@ -0,0 +1,140 @@
+from typing import Callable, List, Optional
+from collections import deque
+import queue
+import threading
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.pipeline")
+
+
+class WritePipeline:
+    """
+    Bounded queue of fetched pages, saved by writer threads while the next pages
+    are fetched. Callbacks of saved pages run in the order the pages were submitted."""
+
+    def __init__(self, save: Callable, writers: int = 1, maxsize: int = 10) -> None:
+        """Start the writer threads.
+
+        Args:
+            save (callable): Called with the documents and the action of a page, e.g. Mongo.upsert_documents.
+            writers (int): Number of writer threads. Defaults to 1.
+            maxsize (int): Number of queued pages, before submit blocks. Defaults to 10.
+        """
+
+        self.save = save
+
+        self.__queue = queue.Queue(maxsize=max(1, maxsize))
+        self.__lock = threading.Lock()
+        self.__error = None
+
+        # submitted pages waiting for their callback, and the saved ones
+        self.__sequence = 0
+        self.__pending = deque()
+        self.__saved = set()
+
+        self.__threads = [
+            threading.Thread(target=self.__write, name=f"writer-{i}", daemon=True)
+            for i in range(max(1, writers))
+        ]
+        for thread in self.__threads:
+            thread.start()
+
+    def __raise_error(self) -> None:
+        """Re-raise the first error of a writer in the calling thread."""
+        if self.__error:
+            raise self.__error
+
+    def submit(
+        self,
+        documents: Optional[List[dict]],
+        action: Optional[str],
+        on_saved: Optional[Callable] = None,
+    ) -> None:
+        """Queue a page, blocking while the queue is full.
+
+        Args:
+            documents (List[dict]): Documents of the page, may be empty to only queue a callback.
+            action (str): Action name of the documents.
+            on_saved (callable, optional): Called without arguments after this and all previously submitted pages are saved. Defaults to None.
+        """
+
+        self.__raise_error()
+
+        with self.__lock:
+            self.__sequence += 1
+            sequence = self.__sequence
+            self.__pending.append((sequence, on_saved))
+
+        self.__queue.put((sequence, documents, action))
+
+    def __write(self) -> None:
+        """Save queued pages until the stop marker."""
+
+        while True:
+            item = self.__queue.get()
+            try:
+                if item is None:
+                    return
+
+                sequence, documents, action = item
+
+                # skip the remaining pages after an error, they would be saved out of order
+                if self.__error:
+                    continue
+
+                try:
+                    if documents:
+                        self.save(documents, action)
+                except BaseException as e:
+                    logger.error(f"Writer failed saving {action} page: {e!r}")
+                    self.__error = e
+                    continue
+
+                self.__saved_page(sequence)
+            finally:
+                self.__queue.task_done()
+
+    def __saved_page(self, sequence: int) -> None:
+        """Run the callbacks of the pages, whose preceding pages are saved as well.
+
+        Args:
+            sequence (int): Sequence number of the saved page.
+        """
+
+        callbacks = []
+        with self.__lock:
+            self.__saved.add(sequence)
+
+            while self.__pending and self.__pending[0][0] in self.__saved:
+                saved, on_saved = self.__pending.popleft()
+                self.__saved.discard(saved)
+                if on_saved:
+                    callbacks.append(on_saved)
+
+            # run in order, a concurrent writer waits for the lock
+            for on_saved in callbacks:
+                try:
+                    on_saved()
+                except BaseException as e:
+                    logger.error(f"Callback of a saved page failed: {e!r}")
+                    self.__error = self.__error or e
+
+    def drain(self) -> None:
+        """Wait until all queued pages are saved.
+
+        Raises:
+            BaseException: The first error of a writer.
+        """
+        self.__queue.join()
+        self.__raise_error()
+
+    def close(self) -> None:
+        """Save the queued pages and stop the writer threads."""
+
+        for _ in self.__threads:
+            self.__queue.put(None)
+
+        for thread in self.__threads:
+            thread.join()
@@ -0,0 +1,146 @@
+from typing import Iterator
+from contextlib import contextmanager
+import io
+import os
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.profiling")
+
+
+class StageProfiler:
+    """
+    CPU and allocation profiles of the crawl stages, written as reports to a directory.
+    cProfile only sees the thread a stage runs in, job workers and writer threads
+    are not included, the allocations are traced for all threads."""
+
+    # tracemalloc is process-wide, it is started by the first running stage of all
+    # profilers and stopped by the last one
+    __tracing_lock = threading.Lock()
+    __tracing_stages = 0
+    __started_tracing = False
+
+    def __init__(self, directory: str, top: int = 40) -> None:
+        """Initializing the report directory.
+
+        Args:
+            directory (str): Directory of the reports, created if missing.
+            top (int): Number of functions and allocation sites in a report. Defaults to 40.
+        """
+
+        self.directory = directory
+        self.top = top
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Profile a stage and write its reports.
+
+        Writes <name>.prof, loadable with pstats or snakeviz, and <name>.txt with
+        the slowest functions and the largest allocation sites.
+
+        Args:
+            name (str): Stage name, used as file name of the reports.
+        """
+
+        self.__start_tracing()
+        before = tracemalloc.take_snapshot()
+
+        profile = cProfile.Profile()
+        start = time.monotonic()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            seconds = time.monotonic() - start
+
+            after = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            self.__stop_tracing()
+
+            self.__write(name, profile, seconds, before, after, peak)
+
+    @classmethod
+    def __start_tracing(cls) -> None:
+        """Start tracing the allocations, unless another stage already did."""
+
+        with cls.__tracing_lock:
+            if cls.__tracing_stages == 0:
+                # an outer tracemalloc, e.g. from PYTHONTRACEMALLOC, is left running
+                cls.__started_tracing = not tracemalloc.is_tracing()
+                if cls.__started_tracing:
+                    tracemalloc.start()
+                elif hasattr(tracemalloc, "reset_peak"):
+                    # the peak of this stage only, reset_peak needs Python 3.9
+                    tracemalloc.reset_peak()
+            cls.__tracing_stages += 1
+
+    @classmethod
+    def __stop_tracing(cls) -> None:
+        """Stop tracing the allocations after the last running stage."""
+
+        with cls.__tracing_lock:
+            cls.__tracing_stages -= 1
+            if cls.__tracing_stages == 0 and cls.__started_tracing:
+                tracemalloc.stop()
+                cls.__started_tracing = False
+
+    def __write(
+        self,
+        name: str,
+        profile: cProfile.Profile,
+        seconds: float,
+        before: tracemalloc.Snapshot,
+        after: tracemalloc.Snapshot,
+        peak: int,
+    ) -> None:
+        """Write the reports of a stage.
+
+        Args:
+            name (str): Stage name.
+            profile (cProfile.Profile): CPU profile of the stage.
+            seconds (float): Wall time of the stage.
+            before (tracemalloc.Snapshot): Allocations at the start of the stage.
+            after (tracemalloc.Snapshot): Allocations at the end of the stage.
+            peak (int): Peak traced memory in bytes.
+        """
+
+        path = os.path.join(self.directory, name)
+        profile.dump_stats(f"{path}.prof")
+
+        report = io.StringIO()
+        report.write(f"Stage: {name}\n")
+        report.write(f"Wall time: {seconds:.3f}s\n")
+        report.write(f"Peak traced memory: {peak / 1024 / 1024:.1f} MB\n\n")
+
+        report.write("CPU by cumulative time\n")
+        stats = pstats.Stats(profile, stream=report)
+        stats.sort_stats("cumulative").print_stats(self.top)
+
+        report.write("CPU by own time\n")
+        stats.sort_stats("tottime").print_stats(self.top)
+
+        # allocations still held at the end of the stage, by line
+        report.write("Allocation growth by line\n")
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        differences = after.filter_traces(filters).compare_to(
+            before.filter_traces(filters), "lineno"
+        )
+        for difference in differences[: self.top]:
+            report.write(f"{difference}\n")
+
+        with open(f"{path}.txt", "w") as f:
+            f.write(report.getvalue())
+
+        logger.debug(f"Profile of stage {name} ({seconds:.1f}s) written to {path}.txt")
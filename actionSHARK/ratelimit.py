@@ -0,0 +1,145 @@
+from typing import Mapping, Optional, Tuple
+import threading
+import datetime as dt
+import logging
+
+from actionSHARK.tokens import TokenPool
+
+
+# start logger
+logger = logging.getLogger("main.ratelimit")
+
+
+class RateGovernor:
+    """
+    Pacing requests from the rate limit headers of every response, so the budget
+    of a token lasts until its reset, and pausing on secondary rate limits.
+
+    Requests are only paced once a token is below the reserve share of its limit,
+    above it they are sent right away, so short crawls are not slowed down. A
+    reserve of 1 paces the whole budget"""
+
+    # GitHub asks to wait at least one minute after a secondary rate limit
+    # without Retry-After header
+    secondary_wait = 60
+
+    def __init__(self, pool: Optional[TokenPool] = None, reserve: float = 0.2) -> None:
+        """Initializing the pacing state.
+
+        Args:
+            pool (TokenPool, optional): Tokens to hand out. Defaults to unauthenticated requests.
+            reserve (float): Share of a token's limit, below which its remaining requests are spread evenly until the reset, 1 paces the whole budget. Defaults to 0.2.
+        """
+
+        self.pool = pool or TokenPool()
+        self.reserve = min(1.0, max(0.0, reserve))
+
+        # number of times all requests had to wait for a reset or Retry-After
+        self.stalls = 0
+
+        self.__lock = threading.Lock()
+        self.__next_slot = {}
+        self.__paused_until = None
+
+    def acquire(self) -> Tuple[Optional[str], float]:
+        """Reserve a request.
+
+        Returns:
+            Tuple[Optional[str], float]: The token and the seconds to wait before sending the request with it.
+        """
+
+        now = dt.datetime.now()
+
+        # a secondary rate limit holds back every request
+        with self.__lock:
+            paused_until = self.__paused_until
+
+        if paused_until and paused_until > now:
+            token, wait = self.pool.acquire()
+            return token, max(wait, (paused_until - now).total_seconds())
+
+        token, wait = self.pool.acquire()
+        if wait > 0:
+            return token, wait
+
+        budget = self.pool.budget(token)
+        if not budget or not budget["reset"]:
+            return token, 0.0
+
+        # plenty of budget left, send right away
+        if budget["remaining"] >= budget["limit"] * self.reserve:
+            return token, 0.0
+
+        # spread the remaining requests evenly over the time left until the reset
+        with self.__lock:
+            slot = max(now, self.__next_slot.get(token) or now)
+
+            time_left = max(0.0, (budget["reset"] - slot).total_seconds())
+            interval = time_left / (budget["remaining"] + 1)
+            self.__next_slot[token] = slot + dt.timedelta(seconds=interval)
+
+        return token, (slot - now).total_seconds()
+
+    def observe(
+        self,
+        token: Optional[str],
+        status: int,
+        headers: Mapping,
+        body: Optional[bytes] = None,
+    ) -> bool:
+        """Update the budget from a response and detect rate limited responses.
+
+        Args:
+            token (str): The token used for the request.
+            status (int): Response status code.
+            headers (Mapping): Response headers.
+            body (bytes, optional): Response body, to detect secondary rate limits. Defaults to None.
+
+        Returns:
+            bool: True if the request was rate limited and should be sent again.
+        """
+
+        self.pool.update(token, headers)
+
+        if status not in [403, 429]:
+            return False
+
+        now = dt.datetime.now()
+
+        # primary rate limit, the other tokens are used until all are exhausted
+        ratelimit = headers.get("X-RateLimit-Reset")
+        if headers.get("X-RateLimit-Remaining") == "0" and ratelimit:
+            reset_time = dt.datetime.fromtimestamp(int(ratelimit))
+
+            if self.pool.exhaust(token, reset_time):
+                with self.__lock:
+                    self.stalls += 1
+
+                logger.debug(f"Limit handler is triggered")
+                logger.debug(f"Next Restart will be on {reset_time}")
+
+            return True
+
+        # secondary rate limit, other 403 responses are e.g. missing permissions
+        retry_after = headers.get("Retry-After")
+        if (
+            status == 429
+            or retry_after
+            or (body and b"secondary rate limit" in body.lower())
+        ):
+            seconds = self.secondary_wait
+            if retry_after and retry_after.isdigit():
+                seconds = int(retry_after)
+
+            paused_until = now + dt.timedelta(seconds=seconds)
+
+            with self.__lock:
+                if not self.__paused_until or self.__paused_until < paused_until:
+                    self.__paused_until = paused_until
+                    self.stalls += 1
+
+                    logger.debug(f"Secondary rate limit, pausing until {paused_until}")
+
+            return True
+
+        return False
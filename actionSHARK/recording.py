@@ -0,0 +1,223 @@
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import os
+import re
+import gzip
+import json
+import zlib
+import threading
+import datetime as dt
+import logging
+
+from actionSHARK.pipeline import WritePipeline
+
+
+# start logger
+logger = logging.getLogger("main.recording")
+
+# replay order, runs need the saved workflows and jobs the saved runs
+ACTIONS = ["workflow", "artifact", "run", "job"]
+
+SEGMENT_PATTERN = re.compile(r"^(?P<action>[a-z]+)-\d{8}-\d{6}-\d{4}\.jsonl\.gz$")
+
+
+class Recorder:
+    """
+    Append-only gzip compressed JSONL segments of the fetched pages, one directory
+    per repository and one line per page"""
+
+    def __init__(self, directory: str, segment_size: int = 64 * 1024 * 1024) -> None:
+        """Initializing the recording directory.
+
+        Args:
+            directory (str): Directory of the segments, <owner>/<repo>/<action>-<time>-<number>.jsonl.gz.
+            segment_size (int): Compressed size in bytes, after which the next segment is started. Defaults to 64 MB.
+        """
+
+        self.directory = directory
+        self.segment_size = segment_size
+
+        # segments of a recording never overwrite the ones of an earlier crawl
+        self.__started = dt.datetime.now().strftime("%Y%m%d-%H%M%S")
+
+        self.__lock = threading.Lock()
+        self.__segments: Dict[Tuple[str, str, str], dict] = {}
+
+    def record(self, owner: str, repo: str, action: str, documents: List[dict]) -> None:
+        """Append a page to the open segment of a repository and action.
+
+        Args:
+            owner (str): Owner of the repository.
+            repo (str): The repository name.
+            action (str): Action name of the documents.
+            documents (List[dict]): Raw items of the page.
+        """
+
+        line = json.dumps({"documents": documents}, separators=(",", ":")) + "\n"
+
+        with self.__lock:
+            segment = self.__segment(owner, repo, action)
+            segment["file"].write(line.encode())
+
+            # a sync flush keeps the written pages readable after a crash
+            segment["file"].flush(zlib.Z_SYNC_FLUSH)
+
+            # the compressed size written to the underlying file
+            if segment["file"].fileobj.tell() >= self.segment_size:
+                segment["file"].close()
+                segment["file"] = None
+
+    def __segment(self, owner: str, repo: str, action: str) -> dict:
+        """Open segment of a repository and action, starting the next one if needed.
+
+        Args:
+            owner (str): Owner of the repository.
+            repo (str): The repository name.
+            action (str): Action name.
+
+        Returns:
+            dict: file, path and number of the segment.
+        """
+
+        key = (owner, repo, action)
+        segment = self.__segments.get(key)
+        if segment and segment["file"]:
+            return segment
+
+        number = segment["number"] + 1 if segment else 0
+        directory = os.path.join(self.directory, owner, repo)
+        os.makedirs(directory, exist_ok=True)
+
+        path = os.path.join(
+            directory, f"{action}-{self.__started}-{number:04d}.jsonl.gz"
+        )
+        segment = {"file": gzip.open(path, "ab"), "path": path, "number": number}
+        self.__segments[key] = segment
+
+        return segment
+
+    def close_repository(self, owner: str, repo: str) -> None:
+        """Close the open segments of a repository, e.g. after its crawl.
+
+        Args:
+            owner (str): Owner of the repository.
+            repo (str): The repository name.
+        """
+        with self.__lock:
+            for (segment_owner, segment_repo, _), segment in self.__segments.items():
+                if (segment_owner, segment_repo) == (owner, repo) and segment["file"]:
+                    segment["file"].close()
+                    segment["file"] = None
+
+    def close(self) -> None:
+        """Close the open segments."""
+        with self.__lock:
+            for segment in self.__segments.values():
+                if segment["file"]:
+                    segment["file"].close()
+                    segment["file"] = None
+
+
+def recorded_repositories(directory: str) -> List[Tuple[str, str]]:
+    """Repositories with recorded segments.
+
+    Args:
+        directory (str): Recording directory.
+
+    Returns:
+        List[Tuple[str, str]]: Owner and name of each repository.
+    """
+
+    repositories = []
+    for owner in sorted(os.listdir(directory)):
+        owner_dir = os.path.join(directory, owner)
+        if not os.path.isdir(owner_dir):
+            continue
+
+        for repo in sorted(os.listdir(owner_dir)):
+            if os.path.isdir(os.path.join(owner_dir, repo)):
+                repositories.append((owner, repo))
+
+    return repositories
+
+
+def read_pages(
+    directory: str, owner: str, repo: str, action: str
+) -> Iterator[List[dict]]:
+    """Recorded pages of a repository and action, in recording order.
+
+    Args:
+        directory (str): Recording directory.
+        owner (str): Owner of the repository.
+        repo (str): The repository name.
+        action (str): Action name.
+
+    Returns:
+        Iterator[List[dict]]: Raw items of each page.
+    """
+
+    repo_dir = os.path.join(directory, owner, repo)
+    segments = []
+    for name in os.listdir(repo_dir):
+        match = SEGMENT_PATTERN.match(name)
+        if match and match.group("action") == action:
+            segments.append(name)
+
+    # names sort by recording time and segment number
+    for name in sorted(segments):
+        path = os.path.join(repo_dir, name)
+        try:
+            with gzip.open(path, "rb") as f:
+                for line in f:
+                    yield json.loads(line)["documents"]
+        except (EOFError, gzip.BadGzipFile, ValueError) as e:
+            # the last page of a crawl, which stopped while writing, is skipped
+            logger.warning(f"Segment {path} is truncated: {e!r}")
+
+
+def replay(
+    directory: str,
+    owner: str,
+    repo: str,
+    save: Callable,
+    writers: int = 0,
+    write_queue_size: int = 10,
+) -> Dict[str, int]:
+    """Feed the recorded pages of a repository to a save function, e.g. Mongo.upsert_documents.
+
+    Args:
+        directory (str): Recording directory.
+        owner (str): Owner of the repository.
+        repo (str): The repository name.
+        save (callable): Called with the documents and the action of a page.
+        writers (int): Number of writer threads saving pages while the next ones are read, 0 saves in between. Defaults to 0.
+        write_queue_size (int): Number of read pages waiting for the writers. Defaults to 10.
+
+    Returns:
+        Dict[str, int]: Number of replayed documents per action.
+    """
+
+    pipeline: Optional[WritePipeline] = None
+    if writers:
+        pipeline = WritePipeline(save, writers, write_queue_size)
+
+    counts = {}
+    try:
+        for action in ACTIONS:
+            counts[action] = 0
+            for documents in read_pages(directory, owner, repo, action):
+                if pipeline:
+                    pipeline.submit(documents, action)
+                else:
+                    save(documents, action)
+                counts[action] += len(documents)
+
+            # the next action needs the saved documents
+            if pipeline:
+                pipeline.drain()
+
+            logger.debug(f"Replayed {counts[action]} {action}s of {owner}/{repo}")
+    finally:
+        if pipeline:
+            pipeline.close()
+
+    return counts
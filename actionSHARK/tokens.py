@@ -0,0 +1,168 @@
+from typing import Iterable, List, Mapping, Optional, Tuple
+import threading
+import datetime as dt
+import logging
+
+
+# start logger
+logger = logging.getLogger("main.tokens")
+
+
+class TokenPool:
+    """
+    GitHub tokens with their remaining rate limit budget, handing out the token
+    with the most headroom"""
+
+    # budget assumed for a token before its first response
+    default_limit = 5000
+
+    def __init__(self, tokens: Optional[Iterable[Optional[str]]] = None) -> None:
+        """Initializing the budget of each token.
+
+        Args:
+            tokens (Iterable[str], optional): Tokens, without any the requests are sent unauthenticated.
+        """
+
+        # keep the order and drop duplicates and empty values
+        tokens = list(dict.fromkeys(t for t in (tokens or []) if t))
+
+        # set once the tokens were verified, to share the pool between crawls
+        self.authenticated = False
+
+        self.__lock = threading.Lock()
+        self.__budgets = {
+            token: {
+                "limit": self.default_limit,
+                "remaining": self.default_limit,
+                "reset": None,
+            }
+            for token in tokens or [None]
+        }
+
+    def __len__(self) -> int:
+        return len(self.__budgets)
+
+    @property
+    def tokens(self) -> List[Optional[str]]:
+        return list(self.__budgets.keys())
+
+    def remove(self, token: Optional[str]) -> None:
+        """Stop using a token, e.g. after it failed to authenticate.
+
+        Args:
+            token (str): The token.
+        """
+        with self.__lock:
+            self.__budgets.pop(token, None)
+
+    def acquire(self) -> Tuple[Optional[str], float]:
+        """Reserve one request of the token with the most remaining requests.
+
+        Returns:
+            Tuple[Optional[str], float]: The token and the seconds to wait before using it, 0 if it has budget left.
+        """
+
+        now = dt.datetime.now()
+
+        with self.__lock:
+            if not self.__budgets:
+                raise ValueError("No valid token left in the pool")
+
+            # a passed reset time restores the full budget
+            for budget in self.__budgets.values():
+                if (
+                    budget["reset"]
+                    and budget["reset"] <= now
+                    and budget["remaining"] <= 0
+                ):
+                    budget["remaining"] = budget["limit"]
+                    budget["reset"] = None
+
+            token, budget = max(
+                self.__budgets.items(), key=lambda item: item[1]["remaining"]
+            )
+
+            if budget["remaining"] > 0:
+                budget["remaining"] -= 1
+                return token, 0.0
+
+            # every token is exhausted, wait for the earliest reset
+            token, budget = min(
+                self.__budgets.items(), key=lambda item: item[1]["reset"] or now
+            )
+            wait = ((budget["reset"] or now) - now).total_seconds()
+
+            return token, max(0.0, wait)
+
+    def budget(self, token: Optional[str]) -> Optional[dict]:
+        """Current budget of a token.
+
+        Args:
+            token (str): The token.
+
+        Returns:
+            Optional[dict]: limit, remaining and reset of the token, None if it is not in the pool.
+        """
+        with self.__lock:
+            budget = self.__budgets.get(token)
+            return dict(budget) if budget is not None else None
+
+    def update(self, token: Optional[str], headers: Mapping) -> None:
+        """Update the budget of a token from the rate limit headers of a response.
+
+        Args:
+            token (str): The token used for the request.
+            headers (Mapping): Response headers.
+        """
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+
+        with self.__lock:
+            budget = self.__budgets.get(token)
+            if budget is None:
+                return
+
+            budget["remaining"] = int(remaining)
+            budget["reset"] = dt.datetime.fromtimestamp(int(reset))
+
+            limit = headers.get("X-RateLimit-Limit")
+            if limit is not None:
+                budget["limit"] = int(limit)
+
+    def exhaust(self, token: Optional[str], reset: dt.datetime) -> bool:
+        """Mark a token as exhausted until its reset time.
+
+        Args:
+            token (str): The rate limited token.
+            reset (datetime): Time, when the budget is restored.
+
+        Returns:
+            bool: True if every token is exhausted now.
+        """
+
+        with self.__lock:
+            budget = self.__budgets.get(token)
+            if budget is not None:
+                budget["remaining"] = 0
+                budget["reset"] = reset
+
+            return all(b["remaining"] <= 0 for b in self.__budgets.values())
+
+    def stats(self) -> List[dict]:
+        """Budget of each token, identified by its last characters.
+
+        Returns:
+            List[dict]: token, remaining and reset of each token.
+        """
+        with self.__lock:
+            return [
+                {
+                    "token": f"...{token[-4:]}" if token else None,
+                    "remaining": budget["remaining"],
+                    "reset": budget["reset"],
+                }
+                for token, budget in self.__budgets.items()
+            ]
@@ -0,0 +1,285 @@
+"""
+Microbenchmarks of the document mapping hot path, from decoding a page to
+upserting its documents, with the recorded payloads in benchmarks/payloads.
+
+    python benchmarks/bench_mapping.py --documents 2000 --repeat 3
+
+Runs against mongomock by default, pass --mongo-uri to use a local MongoDB.
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import os
+import sys
+import gc
+import copy
+import json
+import itertools
+import time
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BASE_DIR))
+
+from bson import ObjectId
+from pycoshark.mongomodels import VCSSystem
+from actionSHARK.client import default_json_loads
+from actionSHARK.mongo import Mongo, Workflow, Run, Job, Artifact
+
+PROJECT_URL = "https://github.com/octo-org/octo-repo.git"
+
+# added to the ids of the documents upserted by one repetition, above all replicated ids
+ID_OFFSET = 10**15
+
+# payload file, sub key and document class of each action, in saving order
+ACTIONS = {
+    "workflow": ("workflows", "workflows", Workflow),
+    "run": ("runs", "workflow_runs", Run),
+    "job": ("jobs", "jobs", Job),
+    "artifact": ("artifacts", "artifacts", Artifact),
+}
+
+# datetime fields parsed by the mapping of each action and if they have milliseconds
+DATE_FIELDS = {
+    "workflow": (["created_at", "updated_at"], True),
+    "run": (["created_at", "updated_at", "run_started_at"], False),
+    "job": (["started_at", "completed_at"], False),
+    "artifact": (["created_at", "updated_at", "expires_at"], False),
+}
+
+STAGES = [
+    "decode",
+    "parse_dates",
+    "embedded",
+    "map",
+    "to_mongo",
+    "upsert",
+    "bulk_upsert",
+]
+
+
+def load_payload(name: str, key: str) -> List[dict]:
+    """Items of a recorded payload page.
+
+    Args:
+        name (str): File name in benchmarks/payloads without extension.
+        key (str): Key of the items in the page.
+    """
+    with open(os.path.join(BASE_DIR, "payloads", f"{name}.json"), "r") as f:
+        return json.load(f)[key]
+
+
+def replicate(items: List[dict], count: int, run_ids: List[int]) -> List[dict]:
+    """Copy recorded items with unique ids.
+
+    Args:
+        items (List[dict]): Recorded items.
+        count (int): Number of items to create.
+        run_ids (List[int]): Run ids the created jobs belong to, empty for other actions.
+    """
+
+    documents = []
+    for i in range(count):
+        document = copy.deepcopy(items[i % len(items)])
+        document["id"] = document["id"] * 1000 + i
+        if run_ids:
+            document["run_id"] = run_ids[i % len(run_ids)]
+        documents.append(document)
+
+    return documents
+
+
+def date_values(items: List[dict], action: str) -> List[Tuple[str, bool]]:
+    """Datetime strings parsed when mapping the items, including the ones of job steps.
+
+    Args:
+        items (List[dict]): Replicated items.
+        action (str): Action name of the items.
+    """
+
+    fields, is_millisecond = DATE_FIELDS[action]
+
+    values = []
+    for item in items:
+        values.extend((item.get(field), is_millisecond) for field in fields)
+
+        # only job steps have millisecond timestamps
+        for step in item.get("steps") or []:
+            values.append((step.get("started_at"), True))
+            values.append((step.get("completed_at"), True))
+
+    return values
+
+
+def pages(documents: List[dict], per_page: int) -> List[List[dict]]:
+    return [documents[i : i + per_page] for i in range(0, len(documents), per_page)]
+
+
+def with_fresh_ids(items: List[dict], per_page: int, offset: int) -> List[List[dict]]:
+    """Pages of shallow item copies with ids not yet saved.
+
+    Args:
+        items (List[dict]): Replicated items.
+        per_page (int): Documents per page.
+        offset (int): Added to the id of each item.
+    """
+    return pages([dict(item, id=item["id"] + offset) for item in items], per_page)
+
+
+def measure(
+    func: Callable[[], None], repeat: int, setup: Optional[Callable[[], None]] = None
+) -> float:
+    """Best wall time of a function in seconds, without garbage collection.
+    The setup function runs untimed before each repetition."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        if setup:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+
+    return best
+
+
+def run_benchmarks(
+    mongo: Mongo, documents: int, repeat: int, per_page: int
+) -> Dict[str, Dict[str, float]]:
+    """Time each stage of each action.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Documents per second of each stage, keyed by action.
+    """
+
+    # the same connection and caches, saving each page with one bulk operation
+    bulk_mongo = mongo.for_project(PROJECT_URL)
+    bulk_mongo.bulk_write = True
+
+    results = {}
+    run_ids = []
+    for action, (name, key, model) in ACTIONS.items():
+        # workflows and artifacts of a repository are few
+        count = documents if action in ["run", "job"] else max(1, documents // 10)
+        items = replicate(
+            load_payload(name, key), count, run_ids if action == "job" else []
+        )
+        raw_pages = [
+            json.dumps({key: page}).encode() for page in pages(items, per_page)
+        ]
+
+        # saved untimed first, runs need the saved workflows and jobs the saved runs
+        for page in pages(items, per_page):
+            mongo.upsert_documents(page, action)
+
+        # each repetition of both upsert stages inserts new documents
+        offsets = itertools.count(1)
+        fresh = {}
+
+        def prepare() -> None:
+            fresh["pages"] = with_fresh_ids(items, per_page, next(offsets) * ID_OFFSET)
+
+        upsert_stages = {
+            "upsert": lambda: [
+                mongo.upsert_documents(page, action) for page in fresh["pages"]
+            ],
+            "bulk_upsert": lambda: [
+                bulk_mongo.upsert_documents(page, action) for page in fresh["pages"]
+            ],
+        }
+        dates = date_values(items, action)
+        stages = {
+            "decode": lambda: [default_json_loads(raw) for raw in raw_pages],
+            "parse_dates": lambda: [mongo.parse_date(*value) for value in dates],
+            "map": lambda: [mongo.map_document(item, action) for item in items],
+        }
+
+        # only runs and jobs have embedded documents, pull requests and steps
+        if action in ["run", "job"]:
+            stages["embedded"] = lambda: [
+                mongo.map_embedded_documents(item, action) for item in items
+            ]
+
+        timings = {
+            stage: measure(func, repeat, prepare)
+            for stage, func in upsert_stages.items()
+        }
+        timings.update({stage: measure(func, repeat) for stage, func in stages.items()})
+
+        # mongoengine validation and conversion of the mapped fields
+        mapped = [mongo.map_document(item, action) for item in items]
+        timings["to_mongo"] = measure(
+            lambda: [model(**fields).to_mongo() for fields in mapped], repeat
+        )
+
+        results[action] = {
+            stage: round(count / seconds, 1) if seconds else float("inf")
+            for stage, seconds in timings.items()
+        }
+        results[action]["documents"] = count
+
+        if action == "run":
+            run_ids = [item["id"] for item in items]
+
+    return results
+
+
+def print_table(results: Dict[str, Dict[str, float]]) -> None:
+    print("Documents per second")
+    print(f"{'action':<10}{'documents':>10}" + "".join(f"{s:>13}" for s in STAGES))
+    for action, result in results.items():
+        print(
+            f"{action:<10}{result['documents']:>10}"
+            + "".join(
+                f"{result[s]:>13.1f}" if s in result else f"{'-':>13}" for s in STAGES
+            )
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--documents",
+        help="Number of runs and jobs, a tenth of it for workflows and artifacts.",
+        default=1000,
+        type=int,
+    )
+    parser.add_argument(
+        "--repeat",
+        help="Runs of each stage, the best one is reported.",
+        default=3,
+        type=int,
+    )
+    parser.add_argument("--per-page", help="Documents per page.", default=100, type=int)
+    parser.add_argument(
+        "--mongo-uri",
+        help="MongoDB connection uri, the benchmark database is dropped afterwards.",
+        default="mongomock://localhost",
+    )
+    parser.add_argument(
+        "--json", help="Print the results as JSON.", default=False, action="store_true"
+    )
+    args = parser.parse_args()
+
+    mongo = Mongo("actionshark_benchmark", PROJECT_URL, db_uri=args.mongo_uri)
+
+    # resolved project ids, like in a smartSHARK database
+    VCSSystem(url=PROJECT_URL, project_id=ObjectId(), repository_type="git").save()
+
+    try:
+        results = run_benchmarks(mongo, args.documents, args.repeat, args.per_page)
+    finally:
+        mongo.drop_database()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_table(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,27 @@
 import os
+import sys
+import asyncio
+import datetime as dt
+from functools import partial
 import logging
 import logging.config
 
 import pycoshark.utils as utils
+from pymongo.write_concern import WriteConcern
 from actionSHARK.config import Config, init_logger
 from actionSHARK.mongo import Mongo
 from actionSHARK.github import GitHub
+from actionSHARK.client import GitHubRequestError
+from actionSHARK.checkpoint import Checkpoint
+from actionSHARK.http_cache import HTTPCache
+from actionSHARK.tokens import TokenPool
+from actionSHARK.ratelimit import RateGovernor
+from actionSHARK.batch import read_manifest, run_batch
+from actionSHARK.artifacts import ArtifactDownloader
+from actionSHARK.metrics import Metrics
+from actionSHARK.profiling import StageProfiler
+from actionSHARK.recording import Recorder, recorded_repositories, replay
+from actionSHARK.export import ParquetExporter
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
@@ -13,6 +29,9 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if not os.path.exists(f"{BASE_DIR}/logs"):
     os.mkdir(f"{BASE_DIR}/logs")
 
+# profiles of this process, created with --profile
+PROFILE_DIR = f"{BASE_DIR}/logs/profile_{dt.datetime.now():%Y-%m-%d_%H-%M-%S}"
+
 
 # parsing command line arguments
 def collect_args():
@@ -24,7 +43,7 @@ def collect_args():
     parser.add_argument(
         "-t",
         "--token",
-        help="GitHub token to authenticate user.",
+        help="GitHub token to authenticate user, several tokens are comma separated.",
         required=False,
         type=str,
     )
@@ -35,6 +54,12 @@ def collect_args():
         required=False,
         type=str,
     )
+    parser.add_argument(
+        "--token-file",
+        help="File with one GitHub token per line.",
+        required=False,
+        type=str,
+    )
     parser.add_argument(
         "-o",
         "--owner",
@@ -60,6 +85,239 @@ def collect_args():
         type=str,
     )
 
+    parser.add_argument(
+        "--manifest",
+        help="File with one repository url or owner/repository per line, to crawl in one process.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--repo-workers",
+        help="Number of repositories of a manifest crawled at the same time.",
+        default=1,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--workers",
+        help="Number of concurrent workers fetching jobs.",
+        default=1,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--page-workers",
+        help="Number of pages of a listing fetched concurrently.",
+        default=1,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--run-shards",
+        help="Number of created date windows of the runs listed concurrently, to list more than 1000 runs.",
+        default=0,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--engine",
+        help="HTTP engine used to crawl the repository.",
+        default="sync",
+        choices=["sync", "async"],
+    )
+    parser.add_argument(
+        "--concurrency",
+        help="Maximum number of requests in flight for the async engine.",
+        default=10,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--pool-size",
+        help="Number of kept-alive HTTP connections, defaults to workers times page workers times run shards.",
+        default=None,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--incremental",
+        help="Only fetch runs and artifacts created since the last crawl. "
+        "Runs still open at the last crawl are fetched again, runs re-run "
+        "after they completed before it are not.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--refetch-jobs",
+        help="Fetch the jobs of all runs, also of completed runs whose completed jobs are stored.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--resume",
+        help="Continue a failed crawl from its last checkpoint.",
+        default=False,
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--writers",
+        help="Number of writer threads saving pages while the next ones are fetched, 0 to save in between.",
+        default=0,
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--write-queue-size",
+        help="Number of fetched pages waiting for the writers.",
+        default=10,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--stream-chunk-size",
+        help="Parse pages while downloading and save them in chunks of this many items, 0 to decode whole pages.",
+        default=0,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--download-artifacts",
+        help="Directory to download the artifact archives to after the crawl, disabled if not set.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--artifact-workers",
+        help="Number of concurrent artifact downloads.",
+        default=4,
+        required=False,
+        type=int,
+    )
+    parser.add_argument(
+        "--artifact-budget",
+        help="Maximum size of the downloaded artifact archives per repository in MB.",
+        default=None,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--bulk-write",
+        help="Upsert each page with one unordered bulk operation.",
+        default=False,
+        action="store_true",
+    )
+    parser.add_argument(
+        "--write-concern",
+        help="Write concern 'w' of bulk writes, e.g. 1 or majority.",
+        default=None,
+        required=False,
+        type=str,
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        help="Maximum number of cached ObjectIds per lookup cache.",
+        default=100000,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--http-cache",
+        help="Directory of the conditional request cache, disabled if not set.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--http-cache-size",
+        help="Maximum size of the conditional request cache in MB.",
+        default=1024,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--rate-reserve",
+        help="Share of the rate limit, below which requests are spread evenly until the reset. 1 paces the whole budget.",
+        default=0.2,
+        required=False,
+        type=float,
+    )
+
+    parser.add_argument(
+        "--metrics-file",
+        help="File to write the crawl metrics to in the Prometheus text format.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--metrics-json",
+        help="File to write the summary of the crawl metrics to as JSON.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--metrics-port",
+        help="Port to serve the crawl metrics on in the Prometheus text format.",
+        default=None,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--record",
+        help="Directory to record the raw fetched pages to, disabled if not set.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--replay",
+        help="Directory of recorded pages to save to MongoDB instead of crawling GitHub.",
+        default=None,
+        required=False,
+        type=str,
+    )
+
+    parser.add_argument(
+        "--export",
+        help="Directory to export the stored documents to as Parquet files instead of crawling GitHub.",
+        default=None,
+        required=False,
+        type=str,
+    )
+    parser.add_argument(
+        "--export-batch-size",
+        help="Number of rows of a table written to one Parquet file at most.",
+        default=50000,
+        required=False,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="Write CPU and allocation profiles of each crawl stage to the logs folder.",
+        default=False,
+        action="store_true",
+    )
+
     # General
     parser.add_argument(
         "--debug",
@@ -71,6 +329,188 @@ def collect_args():
     return parser.parse_args()
 
 
+# crawl using the asyncio engine
+def run_async(
+    cfg: Config,
+    owner: str,
+    repo: str,
+    mongo: Mongo,
+    since,
+    checkpoint: Checkpoint,
+    http_cache: HTTPCache,
+    rate_governor: RateGovernor,
+    metrics: Metrics,
+    profiler: StageProfiler,
+    recorder: Recorder,
+):
+    logger = logging.getLogger("main")
+
+    # aiohttp is only needed for the async engine
+    try:
+        from actionSHARK.async_github import AsyncGitHub
+    except ImportError:
+        logger.error("The async engine requires aiohttp, please install it.")
+        sys.exit(1)
+
+    github = AsyncGitHub(
+        owner=owner,
+        repo=repo,
+        rate_governor=rate_governor,
+        concurrency=cfg.concurrency,
+        page_workers=cfg.page_workers,
+        run_shards=cfg.run_shards,
+        writers=cfg.writers,
+        write_queue_size=cfg.write_queue_size,
+        since=since,
+        checkpoint=checkpoint,
+        http_cache=http_cache,
+        metrics=metrics,
+        profiler=profiler,
+        recorder=recorder,
+        save_mongo=mongo.upsert_documents,
+    )
+
+    asyncio.run(github.run(partial(mongo.run_ids, skip_ingested=not cfg.refetch_jobs)))
+
+
+# crawl one repository
+def crawl(
+    cfg: Config,
+    owner: str,
+    repo: str,
+    mongo: Mongo,
+    http_cache: HTTPCache,
+    rate_governor: RateGovernor,
+    metrics: Metrics,
+    recorder=None,
+    session=None,
+):
+    logger = logging.getLogger("main")
+
+    # start from the high-water mark of the last crawl
+    since = None
+    if cfg.incremental:
+        since = mongo.get_high_water_mark()
+        logger.debug(f"Incremental crawl of {owner}/{repo} since {since}")
+
+    # position of the crawl, stored in mongo to be resumed after a failure
+    checkpoint = Checkpoint(mongo, resume=cfg.resume)
+
+    # reports of each stage in logs/profile_<time>/<owner>_<repo>
+    profiler = None
+    if cfg.profile:
+        profiler = StageProfiler(os.path.join(PROFILE_DIR, f"{owner}_{repo}"))
+        if cfg.workers > 1 or cfg.writers:
+            logger.warning(
+                "The CPU profiles only include the main thread, use --workers 1 and --writers 0 to profile the jobs and saving"
+            )
+
+    # get all actions with the selected engine
+    if cfg.engine == "async":
+        run_async(
+            cfg,
+            owner,
+            repo,
+            mongo,
+            since,
+            checkpoint,
+            http_cache,
+            rate_governor,
+            metrics,
+            profiler,
+            recorder,
+        )
+    else:
+        # initiate GitHub instance
+        github = GitHub(
+            owner=owner,
+            repo=repo,
+            rate_governor=rate_governor,
+            workers=cfg.workers,
+            page_workers=cfg.page_workers,
+            run_shards=cfg.run_shards,
+            pool_size=cfg.pool_size,
+            writers=cfg.writers,
+            write_queue_size=cfg.write_queue_size,
+            stream_chunk_size=cfg.stream_chunk_size,
+            since=since,
+            checkpoint=checkpoint,
+            http_cache=http_cache,
+            session=session,
+            metrics=metrics,
+            profiler=profiler,
+            recorder=recorder,
+            save_mongo=mongo.upsert_documents,
+        )
+
+        github.run(partial(mongo.run_ids, skip_ingested=not cfg.refetch_jobs))
+
+    # remember how far this crawl got
+    mongo.save_high_water_mark()
+
+    # stream the archives of the stored artifacts to disk
+    if cfg.download_artifacts:
+        downloader = ArtifactDownloader(
+            os.path.join(cfg.download_artifacts, owner, repo),
+            session or GitHub.create_session(cfg.artifact_workers),
+            rate_governor=rate_governor,
+            workers=cfg.artifact_workers,
+            budget=(
+                cfg.artifact_budget * 1024 * 1024
+                if cfg.artifact_budget is not None
+                else None
+            ),
+        )
+        downloader.download_all(mongo.artifacts())
+
+
+# save recorded pages instead of crawling
+def replay_recordings(cfg: Config, mongo: Mongo) -> bool:
+    logger = logging.getLogger("main")
+
+    # all recorded repositories, unless a repository was selected
+    repositories = recorded_repositories(cfg.replay)
+    if cfg.owner and cfg.repo:
+        repositories = [r for r in repositories if r == (cfg.owner, cfg.repo)]
+
+    def replay_repository(owner: str, repo: str):
+        project_mongo = mongo.for_project(f"https://github.com/{owner}/{repo}.git")
+        counts = replay(
+            cfg.replay,
+            owner,
+            repo,
+            project_mongo.upsert_documents,
+            cfg.writers,
+            cfg.write_queue_size,
+        )
+        logger.debug(f"Replayed {owner}/{repo}: {counts}")
+
+        # the replayed runs continue incremental crawls
+        project_mongo.save_high_water_mark()
+
+    results = run_batch(repositories, replay_repository, cfg.repo_workers)
+    return any(r["status"] == "failed" for r in results)
+
+
+# export the stored documents for analytics
+def export_repositories(cfg: Config, mongo: Mongo, repositories: list) -> bool:
+    logger = logging.getLogger("main")
+
+    # pyarrow is only needed to export
+    try:
+        exporter = ParquetExporter(cfg.export, cfg.export_batch_size)
+    except ImportError as e:
+        logger.error(str(e))
+        sys.exit(1)
+
+    def export_repository(owner: str, repo: str):
+        project_mongo = mongo.for_project(f"https://github.com/{owner}/{repo}.git")
+        exporter.export(project_mongo, owner, repo)
+
+    results = run_batch(repositories, export_repository, cfg.repo_workers)
+    return any(r["status"] == "failed" for r in results)
+
+
 # main function
 def main():
     # collect args from terminal to cfg variable
@@ -82,6 +522,15 @@ def main():
     logger = logging.getLogger("main")
     logger.debug("Start Logging")
 
+    repositories = [(cfg.owner, cfg.repo)]
+    if cfg.manifest:
+        repositories = read_manifest(cfg.manifest)
+
+    # the allocations of concurrent repositories would be traced into each other's stages
+    if cfg.profile and cfg.repo_workers > 1 and len(repositories) > 1:
+        logger.error("Profiling requires --repo-workers 1, please restart with it.")
+        sys.exit(1)
+
     # initiate mongo instance
     mongo = Mongo(
         cfg.db_database,
@@ -92,22 +541,98 @@ def main():
         cfg.db_port,
         cfg.db_authentication,
         cfg.db_ssl,
+        bulk_write=cfg.bulk_write,
+        write_concern=(
+            WriteConcern(w=cfg.write_concern) if cfg.write_concern is not None else None
+        ),
+        cache_size=cfg.cache_size,
     )
 
-    # initiate GitHub instance
-    github = GitHub(
-        owner=cfg.owner,
-        repo=cfg.repo,
-        token=cfg.token,
-        save_mongo=mongo.upsert_documents,
-    )
+    # cache of responses sent as conditional requests
+    http_cache = None
+    if cfg.http_cache:
+        http_cache = HTTPCache(cfg.http_cache, cfg.http_cache_size * 1024 * 1024)
+
+    # tokens and pacing of the requests
+    rate_governor = RateGovernor(TokenPool(cfg.tokens), reserve=cfg.rate_reserve)
+
+    # metrics of all crawled repositories
+    metrics = Metrics(prometheus_file=cfg.metrics_file, json_file=cfg.metrics_json)
+    if cfg.metrics_port is not None:
+        metrics.serve(cfg.metrics_port)
+
+    # raw pages of all crawled repositories
+    recorder = Recorder(cfg.record) if cfg.record else None
+
+    if cfg.replay:
+        failed = replay_recordings(cfg, mongo)
+    elif cfg.export:
+        failed = export_repositories(cfg, mongo, repositories)
+    elif cfg.manifest:
+        # one connection pool, mongo connection and token pool for all repositories
+        pool_size = cfg.pool_size or GitHub.pool_size(
+            cfg.workers, cfg.page_workers, cfg.run_shards
+        )
+        session = GitHub.create_session(max(1, pool_size * cfg.repo_workers))
 
-    # get all actions
-    github.run(mongo.runs)
+        def crawl_repository(owner: str, repo: str):
+            project_mongo = mongo.for_project(f"https://github.com/{owner}/{repo}.git")
+            try:
+                crawl(
+                    cfg,
+                    owner,
+                    repo,
+                    project_mongo,
+                    http_cache,
+                    rate_governor,
+                    metrics,
+                    recorder,
+                    session,
+                )
+            finally:
+                # no open segments are kept for the repositories already crawled
+                if recorder:
+                    recorder.close_repository(owner, repo)
+
+        results = run_batch(repositories, crawl_repository, cfg.repo_workers)
+        failed = any(r["status"] == "failed" for r in results)
+    else:
+        try:
+            crawl(
+                cfg,
+                cfg.owner,
+                cfg.repo,
+                mongo,
+                http_cache,
+                rate_governor,
+                metrics,
+                recorder,
+            )
+        except GitHubRequestError as e:
+            logger.error(f"Crawl aborted: {e}")
+            logger.error("Restart with --resume to continue from the last checkpoint")
+            if recorder:
+                recorder.close()
+            sys.exit(1)
+        failed = False
+
+    if recorder:
+        recorder.close()
+
+    logger.debug(f"Lookup cache stats: {mongo.cache_stats()}")
+    if http_cache:
+        logger.debug(f"HTTP cache stats: {http_cache.stats()}")
+
+    for cache, stats in mongo.cache_stats().items():
+        metrics.set_stats("lookup_cache", stats, cache=cache)
+    metrics.export()
 
     # Finish logging message
     logger.debug("Finish Logging")
 
+    if failed:
+        sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -20,6 +20,13 @@ setup(
         "requests>=2.10.0",
         "pycoshark>=1.3.2",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.7.4"],
+        "fast": ["orjson>=3.6.0"],
+        "stream": ["ijson>=3.1"],
+        "benchmark": ["mongomock>=3.23,<4.2"],
+        "export": ["pyarrow>=7.0.0"],
+    },
     url="https://github.com/smartshark/actionSHARK",
     download_url="https://github.com/smartshark/actionSHARK/zipball/main",
     packages=find_packages(),
@@ -0,0 +1,34 @@
+import logging
+import unittest
+
+import mongoengine
+
+from actionSHARK.mongo import Mongo
+
+# mongomock is only needed for the tests using MongoDB
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+# errors of documents failing on purpose are not logged
+logging.getLogger("main").setLevel(logging.CRITICAL)
+
+
+class MongoTestCase(unittest.TestCase):
+    """
+    Test case with a Mongo instance on mongomock, the database is dropped after each test"""
+
+    project_url = "https://github.com/octo-org/octo-repo.git"
+
+    def setUp(self) -> None:
+        if mongomock is None:
+            self.skipTest("requires mongomock")
+
+        self.mongo = Mongo(
+            "actionshark_test", self.project_url, db_uri="mongomock://localhost"
+        )
+
+    def tearDown(self) -> None:
+        self.mongo.drop_database()
+        mongoengine.disconnect()
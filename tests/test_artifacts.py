@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import requests
+
+from actionSHARK.artifacts import ArtifactDownloader
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, body: bytes = b"") -> None:
+        self.status_code = status_code
+        self.headers = {}
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        pass
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(str(self.status_code), response=self)
+
+    def iter_content(self, chunk_size: int):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i : i + chunk_size]
+
+
+class FakeSession:
+    """Serves archives by url, answering Range requests like GitHub's storage."""
+
+    def __init__(self, archives: dict) -> None:
+        self.archives = archives
+        self.requests = []
+
+    def get(self, url: str, headers: dict, stream: bool) -> FakeResponse:
+        self.requests.append((url, dict(headers)))
+
+        body = self.archives.get(url)
+        if body is None:
+            return FakeResponse(404)
+
+        offset = int(headers.get("Range", "bytes=0-")[6:-1])
+        if offset >= len(body):
+            return FakeResponse(416)
+        if offset:
+            return FakeResponse(206, body[offset:])
+        return FakeResponse(200, body)
+
+
+def artifact(artifact_id: int, size: int) -> dict:
+    return {
+        "artifact_id": artifact_id,
+        "size_in_bytes": size,
+        "archive_download_url": f"https://api.github.com/zip/{artifact_id}",
+    }
+
+
+class ArtifactDownloaderTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def downloader(self, archives: dict, **kwargs) -> ArtifactDownloader:
+        self.session = FakeSession(
+            {f"https://api.github.com/zip/{i}": body for i, body in archives.items()}
+        )
+        return ArtifactDownloader(self.directory, self.session, retries=0, **kwargs)
+
+    def read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+
+    def write(self, path: str, body: bytes) -> None:
+        with open(path, "wb") as f:
+            f.write(body)
+
+    def test_present_archives_are_skipped(self):
+        downloader = self.downloader({1: b"new"})
+        self.write(downloader.path(1), b"old")
+
+        stats = downloader.download_all([artifact(1, 3)])
+
+        self.assertEqual(stats["present"], 1)
+        self.assertEqual(self.session.requests, [])
+        self.assertEqual(self.read(downloader.path(1)), b"old")
+
+    def test_partial_download_continues_with_a_range_request(self):
+        downloader = self.downloader({1: b"abcde"})
+        self.write(downloader.path(1) + ".part", b"ab")
+
+        stats = downloader.download_all([artifact(1, 5)])
+
+        self.assertEqual(stats["downloaded"], 1)
+        self.assertEqual(stats["bytes"], 3)
+        self.assertEqual(self.session.requests[0][1]["Range"], "bytes=2-")
+        self.assertEqual(self.read(downloader.path(1)), b"abcde")
+        self.assertFalse(os.path.exists(downloader.path(1) + ".part"))
+
+    def test_complete_partial_download_is_kept_on_416(self):
+        downloader = self.downloader({1: b"abcde"})
+        self.write(downloader.path(1) + ".part", b"abcde")
+
+        stats = downloader.download_all([artifact(1, 5)])
+
+        self.assertEqual(stats["downloaded"], 1)
+        self.assertEqual(stats["bytes"], 0)
+        self.assertEqual(self.read(downloader.path(1)), b"abcde")
+
+    def test_archives_exceeding_the_budget_are_skipped(self):
+        downloader = self.downloader(
+            {1: b"x" * 60, 2: b"x" * 60, 3: b"x" * 30}, budget=100, workers=1
+        )
+
+        stats = downloader.download_all(
+            [artifact(1, 60), artifact(2, 60), artifact(3, 30)]
+        )
+
+        self.assertEqual(stats["downloaded"], 2)
+        self.assertEqual(stats["over_budget"], 1)
+        self.assertFalse(os.path.exists(downloader.path(2)))
+
+    def test_failed_download_gives_its_budget_back(self):
+        downloader = self.downloader({2: b"x" * 80}, budget=100, workers=1)
+
+        stats = downloader.download_all([artifact(1, 80), artifact(2, 80)])
+
+        self.assertEqual(stats["failed"], 1)
+        self.assertEqual(stats["downloaded"], 1)
+        self.assertEqual(self.read(downloader.path(2)), b"x" * 80)
+
+    def test_artifacts_are_read_while_downloading(self):
+        downloader = self.downloader({i: b"x" for i in range(10)}, workers=1)
+        read = []
+
+        def artifacts():
+            for i in range(10):
+                read.append(i)
+                yield artifact(i, 1)
+
+        # only a bounded number of artifacts is read ahead of the downloads
+        session_get = self.session.get
+
+        def get(url, headers, stream):
+            self.assertLessEqual(len(read), int(url.rsplit("/", 1)[1]) + 2)
+            return session_get(url, headers, stream)
+
+        self.session.get = get
+
+        self.assertEqual(downloader.download_all(artifacts())["downloaded"], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
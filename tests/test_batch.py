@@ -0,0 +1,69 @@
+import os
+import tempfile
+import unittest
+
+from actionSHARK.batch import read_manifest, run_batch
+
+
+class ReadManifestTest(unittest.TestCase):
+    def read(self, content: str):
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+
+        return read_manifest(f.name)
+
+    def test_urls_and_short_names(self):
+        repositories = self.read(
+            "https://github.com/octo-org/octo-repo.git\n"
+            "https://github.com/octo-org/other/\n"
+            "octo-org/third\n"
+        )
+
+        self.assertEqual(
+            repositories,
+            [("octo-org", "octo-repo"), ("octo-org", "other"), ("octo-org", "third")],
+        )
+
+    def test_only_a_trailing_git_suffix_is_removed(self):
+        repositories = self.read(
+            "https://github.com/octo/octo.github.io\n" "octo/gitops.git/\n"
+        )
+
+        self.assertEqual(repositories, [("octo", "octo.github.io"), ("octo", "gitops")])
+
+    def test_comments_blank_lines_and_duplicates_are_skipped(self):
+        repositories = self.read(
+            "# repositories of the study\n"
+            "\n"
+            "octo-org/octo-repo  # the main one\n"
+            "https://github.com/octo-org/octo-repo.git\n"
+        )
+
+        self.assertEqual(repositories, [("octo-org", "octo-repo")])
+
+    def test_invalid_lines_are_skipped(self):
+        self.assertEqual(
+            self.read("octo-repo\nocto-org/octo-repo\n"), [("octo-org", "octo-repo")]
+        )
+
+
+class RunBatchTest(unittest.TestCase):
+    def test_failed_repository_does_not_stop_the_others(self):
+        crawled = []
+
+        def crawl(owner, repo):
+            if repo == "broken":
+                raise RuntimeError("crawl failed")
+            crawled.append((owner, repo))
+
+        results = run_batch([("o", "a"), ("o", "broken"), ("o", "b")], crawl, 2)
+
+        self.assertCountEqual(crawled, [("o", "a"), ("o", "b")])
+        self.assertEqual(
+            [r["status"] for r in results], ["finished", "failed", "finished"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
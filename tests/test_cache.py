@@ -0,0 +1,76 @@
+import unittest
+
+from actionSHARK.cache import LRUCache
+
+
+class LRUCacheTest(unittest.TestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+
+        # reading a makes b the least recently used entry
+        cache.get_or_load("a", self.fail)
+        cache.put("c", 3)
+
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.get_or_load("a", lambda key: None), 1)
+        self.assertEqual(cache.get_or_load("c", lambda key: None), 3)
+        self.assertIsNone(cache.get_or_load("b", lambda key: None))
+
+    def test_hits_and_misses_are_counted(self):
+        cache = LRUCache()
+        loaded = []
+
+        def loader(key):
+            loaded.append(key)
+            return key * 2
+
+        self.assertEqual(cache.get_or_load(1, loader), 2)
+        self.assertEqual(cache.get_or_load(1, loader), 2)
+        self.assertEqual(cache.get_or_load(2, loader), 4)
+
+        self.assertEqual(loaded, [1, 2])
+        self.assertEqual(
+            cache.stats(), {"size": 2, "hits": 1, "misses": 2, "hit_rate": 0.3333}
+        )
+
+    def test_none_values_are_cached_by_default(self):
+        cache = LRUCache()
+        loaded = []
+
+        def loader(key):
+            loaded.append(key)
+
+        cache.get_or_load("missing", loader)
+        cache.get_or_load("missing", loader)
+
+        self.assertEqual(loaded, ["missing"])
+        self.assertEqual(cache.hits, 1)
+
+    def test_none_values_are_loaded_again_without_cache_none(self):
+        cache = LRUCache(cache_none=False)
+        loaded = []
+
+        def loader(key):
+            loaded.append(key)
+
+        cache.get_or_load("missing", loader)
+        cache.get_or_load("missing", loader)
+
+        self.assertEqual(loaded, ["missing", "missing"])
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.misses, 2)
+
+    def test_clear_removes_all_entries(self):
+        cache = LRUCache()
+        cache.put("a", 1)
+
+        cache.clear()
+
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get_or_load("a", lambda key: None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from actionSHARK.checkpoint import Checkpoint
+from tests import MongoTestCase
+
+
+class CheckpointTest(MongoTestCase):
+    def test_resume_continues_from_the_stored_position(self):
+        checkpoint = Checkpoint(self.mongo, interval=1)
+        checkpoint.action_done("workflow")
+        checkpoint.page_done("run", 3)
+
+        for run_id in checkpoint.pending_runs([10, 20, 30]):
+            if run_id == 20:
+                break
+            checkpoint.run_done(run_id)
+
+        resumed = Checkpoint(self.mongo, resume=True)
+
+        self.assertTrue(resumed.is_completed("workflow"))
+        self.assertFalse(resumed.is_completed("run"))
+        self.assertEqual(resumed.start_page("run"), 4)
+        self.assertEqual(resumed.start_page("artifact"), 1)
+        self.assertEqual(list(resumed.pending_runs([10, 20, 30])), [20, 30])
+
+    def test_start_without_resume_clears_the_stored_position(self):
+        checkpoint = Checkpoint(self.mongo)
+        checkpoint.action_done("workflow")
+
+        Checkpoint(self.mongo)
+
+        self.assertIsNone(self.mongo.load_checkpoint())
+        self.assertFalse(Checkpoint(self.mongo, resume=True).is_completed("workflow"))
+
+    def test_position_only_moves_past_contiguous_finished_runs(self):
+        checkpoint = Checkpoint(self.mongo, interval=1)
+        runs = list(checkpoint.pending_runs([1, 2, 3]))
+
+        checkpoint.run_done(runs[1])
+        self.assertIsNone(checkpoint.last_run_id)
+
+        checkpoint.run_done(runs[0])
+        self.assertEqual(checkpoint.last_run_id, 2)
+        self.assertEqual(self.mongo.load_checkpoint()["last_run_id"], 2)
+
+    def test_clear_resets_the_position(self):
+        checkpoint = Checkpoint(self.mongo, interval=1)
+        checkpoint.action_done("run")
+        checkpoint.page_done("artifact", 2)
+        for run_id in checkpoint.pending_runs([5]):
+            checkpoint.run_done(run_id)
+
+        checkpoint.clear()
+
+        self.assertFalse(checkpoint.is_completed("run"))
+        self.assertEqual(checkpoint.start_page("artifact"), 1)
+        self.assertIsNone(checkpoint.last_run_id)
+        self.assertEqual(list(checkpoint.pending_runs([5])), [5])
+        self.assertIsNone(self.mongo.load_checkpoint())
+
+    def test_without_store_nothing_is_persisted(self):
+        checkpoint = Checkpoint()
+        checkpoint.page_done("workflow", 1)
+
+        self.assertEqual(checkpoint.start_page("workflow"), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
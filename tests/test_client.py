@@ -0,0 +1,100 @@
+import unittest
+import datetime as dt
+
+from actionSHARK.client import Pagination, last_page, run_windows, split_window
+
+
+def page_of(count, created_at="2021-06-01T10:00:00Z"):
+    return {
+        "total_count": 250,
+        "workflow_runs": [{"id": i, "created_at": created_at} for i in range(count)],
+    }
+
+
+class PaginationTest(unittest.TestCase):
+    def test_stops_after_a_short_page(self):
+        pagination = Pagination("url?per_page=100", "run", "workflow_runs")
+
+        self.assertEqual(len(pagination.take(page_of(100))), 100)
+        self.assertEqual(pagination.page_url(), "url?per_page=100&page=2")
+        self.assertFalse(pagination.done)
+
+        self.assertEqual(len(pagination.take(page_of(50))), 50)
+        self.assertTrue(pagination.done)
+
+    def test_incremental_listing_stops_at_since(self):
+        pagination = Pagination(
+            "url", "run", "workflow_runs", since=dt.datetime(2021, 5, 1)
+        )
+        data = page_of(100)
+        data["workflow_runs"][60:] = page_of(40, "2021-04-01T10:00:00Z")[
+            "workflow_runs"
+        ]
+
+        self.assertEqual(len(pagination.take(data)), 60)
+        self.assertTrue(pagination.done)
+
+    def test_fans_out_the_remaining_pages_once(self):
+        pagination = Pagination("url", "run", "workflow_runs", page_workers=3)
+
+        pagination.take(page_of(100))
+        self.assertEqual(pagination.fan_out_pages(), range(2, 4))
+        self.assertEqual(pagination.fan_out_pages(), range(0))
+
+        self.assertEqual(len(pagination.take_page(2, page_of(100))), 100)
+        self.assertEqual(len(pagination.take_page(3, page_of(50))), 50)
+        self.assertTrue(pagination.done)
+
+    def test_incremental_listing_is_not_fanned_out(self):
+        pagination = Pagination(
+            "url", "run", "workflow_runs", since=dt.datetime(2021, 5, 1), page_workers=3
+        )
+
+        pagination.take(page_of(100))
+        self.assertEqual(pagination.fan_out_pages(), range(0))
+
+
+class WindowTest(unittest.TestCase):
+    def test_windows_cover_the_range_without_overlap(self):
+        start = dt.datetime(2021, 1, 1)
+        end = dt.datetime(2021, 1, 1, 0, 0, 9)
+
+        windows = run_windows(start, end, 3)
+
+        self.assertEqual(windows[0][0], start)
+        self.assertEqual(windows[-1][1], end)
+        for (_, previous_end), (next_start, _) in zip(windows, windows[1:]):
+            self.assertEqual(next_start - previous_end, dt.timedelta(seconds=1))
+
+    def test_single_second_is_not_split(self):
+        second = dt.datetime(2021, 1, 1)
+
+        self.assertEqual(split_window(second, second), [])
+        self.assertEqual(
+            split_window(second, second + dt.timedelta(seconds=3)),
+            [
+                (second, second + dt.timedelta(seconds=1)),
+                (second + dt.timedelta(seconds=2), second + dt.timedelta(seconds=3)),
+            ],
+        )
+
+
+class LastPageTest(unittest.TestCase):
+    def test_last_page_from_the_link_header(self):
+        headers = {
+            "Link": '<https://api.github.com/x?per_page=100&page=2>; rel="next", '
+            '<https://api.github.com/x?per_page=100&page=7>; rel="last"'
+        }
+
+        self.assertEqual(last_page({"total_count": 10}, headers), 7)
+
+    def test_last_page_from_the_total_count(self):
+        self.assertEqual(last_page({"total_count": 250}, {}), 3)
+        self.assertEqual(last_page({"total_count": 250}, {}, per_page=50), 5)
+
+    def test_unknown_without_link_header_and_total_count(self):
+        self.assertIsNone(last_page([{"id": 1}], {}))
+
+
+if __name__ == "__main__":
+    unittest.main()
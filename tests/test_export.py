@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from actionSHARK.export import ParquetExporter, pq
+from tests import MongoTestCase
+from tests.test_mongo import artifact_item, job_item, run_item, workflow_item
+
+
+@unittest.skipIf(pq is None, "requires pyarrow")
+class ParquetExporterTest(MongoTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+        self.mongo.upsert_documents(
+            [run_item(10), run_item(11, created_at="2021-02-01T00:00:00Z")], "run"
+        )
+        self.mongo.upsert_documents([job_item(100, 10), job_item(101, 11)], "job")
+        self.mongo.upsert_documents([artifact_item(1000)], "artifact")
+
+    def read(self, table: str) -> list:
+        rows = []
+        root = os.path.join(self.directory, table, "repository=octo-org_octo-repo")
+        for month in sorted(os.listdir(root)):
+            for name in sorted(os.listdir(os.path.join(root, month))):
+                rows += pq.read_table(os.path.join(root, month, name)).to_pylist()
+        return rows
+
+    def test_tables_are_partitioned_by_month(self):
+        counts = ParquetExporter(self.directory).export(
+            self.mongo, "octo-org", "octo-repo"
+        )
+
+        self.assertEqual(
+            counts,
+            {
+                "workflows": 1,
+                "runs": 2,
+                "run_pull_requests": 0,
+                "jobs": 2,
+                "job_steps": 2,
+                "artifacts": 1,
+            },
+        )
+        self.assertEqual(
+            sorted(
+                os.listdir(
+                    os.path.join(
+                        self.directory, "runs", "repository=octo-org_octo-repo"
+                    )
+                )
+            ),
+            ["month=2021-01", "month=2021-02"],
+        )
+
+    def test_jobs_and_steps_join_runs_by_both_ids(self):
+        ParquetExporter(self.directory).export(self.mongo, "octo-org", "octo-repo")
+
+        runs = {r["_id"]: r["run_id"] for r in self.read("runs")}
+        jobs = self.read("jobs")
+        steps = self.read("job_steps")
+
+        self.assertEqual(sorted(j["run_id"] for j in jobs), [10, 11])
+        for row in jobs + steps:
+            self.assertEqual(runs[row["run_object_id"]], row["run_id"])
+        self.assertEqual(sorted(s["job_id"] for s in steps), [100, 101])
+
+    def test_export_replaces_the_earlier_one(self):
+        exporter = ParquetExporter(self.directory, batch_size=1)
+        exporter.export(self.mongo, "octo-org", "octo-repo")
+        exporter.export(self.mongo, "octo-org", "octo-repo")
+
+        self.assertEqual(len(self.read("jobs")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,15 @@
+import unittest
+
+from actionSHARK.github import GitHub
+
+
+class PoolSizeTest(unittest.TestCase):
+    def test_every_concurrent_request_gets_a_connection(self):
+        self.assertEqual(GitHub.pool_size(workers=2, page_workers=3, run_shards=4), 24)
+
+    def test_unsharded_crawl_counts_as_one_shard(self):
+        self.assertEqual(GitHub.pool_size(workers=2, page_workers=1, run_shards=0), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from actionSHARK.http_cache import HTTPCache
+
+
+class HTTPCacheTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def age(self, url: str, seconds: float) -> None:
+        """Set the last use of the entry of a url to some seconds ago."""
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            with open(path, "rb") as f:
+                if json.loads(f.readline())["url"] == url:
+                    mtime = time.time() - seconds
+                    os.utime(path, (mtime, mtime))
+                    return
+        self.fail(f"{url} is not cached")
+
+    def test_validators_and_body_of_a_stored_response(self):
+        cache = HTTPCache(self.directory)
+        cache.store("u1", {"ETag": '"abc"', "Last-Modified": "Mon"}, b"body")
+
+        self.assertEqual(
+            cache.validators("u1"),
+            {"If-None-Match": '"abc"', "If-Modified-Since": "Mon"},
+        )
+        self.assertEqual(cache.body("u1"), b"body")
+        self.assertEqual(cache.validators("u2"), {})
+        self.assertIsNone(cache.body("u2"))
+
+    def test_responses_without_validators_are_not_stored(self):
+        cache = HTTPCache(self.directory)
+        cache.store("u1", {}, b"body")
+
+        self.assertEqual(cache.validators("u1"), {})
+        self.assertEqual(cache.stats()["size_bytes"], 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = HTTPCache(self.directory, max_bytes=3000)
+        for url in ["u1", "u2"]:
+            cache.store(url, {"ETag": url}, b"x" * 1000)
+        self.age("u1", 60)
+        self.age("u2", 30)
+
+        # reading an entry marks it as used
+        cache.body("u1")
+        cache.store("u3", {"ETag": "u3"}, b"x" * 1000)
+
+        self.assertIsNone(cache.body("u2"))
+        self.assertEqual(cache.body("u1"), b"x" * 1000)
+        self.assertEqual(cache.body("u3"), b"x" * 1000)
+        self.assertLessEqual(cache.stats()["size_bytes"], 3000 * 0.9)
+
+    def test_replaced_entry_is_counted_once(self):
+        cache = HTTPCache(self.directory)
+        cache.store("u1", {"ETag": "a"}, b"x" * 100)
+        size = cache.stats()["size_bytes"]
+
+        cache.store("u1", {"ETag": "a"}, b"x" * 100)
+
+        self.assertEqual(cache.stats()["size_bytes"], size)
+        self.assertEqual(HTTPCache(self.directory).stats()["size_bytes"], size)
+
+    def test_streamed_body_is_stored_after_reading_to_the_end(self):
+        cache = HTTPCache(self.directory)
+
+        partial = cache.tee("u1", {"ETag": "a"}, io.BytesIO(b"body"))
+        partial.read(2)
+        partial.close()
+        self.assertIsNone(cache.body("u1"))
+
+        complete = cache.tee("u1", {"ETag": "a"}, io.BytesIO(b"body"))
+        while complete.read(2):
+            pass
+        complete.close()
+        self.assertEqual(cache.body("u1"), b"body")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from urllib.request import urlopen
+
+from actionSHARK.metrics import Metrics, endpoint
+
+
+class EndpointTest(unittest.TestCase):
+    def test_repository_ids_and_query_are_removed(self):
+        self.assertEqual(
+            endpoint("https://api.github.com/repos/o/r/actions/runs/12/jobs?page=2"),
+            "/actions/runs/{id}/jobs",
+        )
+        self.assertEqual(endpoint("https://api.github.com/user"), "/user")
+
+
+class MetricsTest(unittest.TestCase):
+    def test_histogram_buckets_are_cumulative(self):
+        metrics = Metrics(buckets=(0.1, 1, 10))
+        for value in [0.05, 0.5, 0.7, 5, 50]:
+            metrics.observe("latency_seconds", value)
+
+        lines = metrics.prometheus().splitlines()
+
+        self.assertIn("# TYPE actionshark_latency_seconds histogram", lines)
+        self.assertEqual(
+            [line for line in lines if "_bucket" in line],
+            [
+                'actionshark_latency_seconds_bucket{le="0.1"} 1',
+                'actionshark_latency_seconds_bucket{le="1"} 3',
+                'actionshark_latency_seconds_bucket{le="10"} 4',
+                'actionshark_latency_seconds_bucket{le="+Inf"} 5',
+            ],
+        )
+        self.assertIn("actionshark_latency_seconds_count 5", lines)
+        self.assertIn("actionshark_latency_seconds_sum 56.25", lines)
+
+    def test_label_values_are_escaped(self):
+        metrics = Metrics()
+        metrics.inc("requests_total", endpoint='a"b\\c\nd', status=200)
+
+        self.assertIn(
+            'actionshark_requests_total{endpoint="a\\"b\\\\c\\nd",status="200"} 1',
+            metrics.prometheus().splitlines(),
+        )
+
+    def test_counters_and_gauges_are_typed_once(self):
+        metrics = Metrics()
+        metrics.inc("pages_total", action="run")
+        metrics.inc("pages_total", 2, action="run")
+        metrics.inc("pages_total", action="job")
+        metrics.set_stats("cache", {"hits": 3, "hit_rate": 0.5, "path": "/tmp"})
+
+        lines = metrics.prometheus().splitlines()
+
+        self.assertEqual(lines.count("# TYPE actionshark_pages_total counter"), 1)
+        self.assertIn('actionshark_pages_total{action="run"} 3', lines)
+        self.assertIn('actionshark_pages_total{action="job"} 1', lines)
+        self.assertIn("actionshark_cache_hits 3", lines)
+        self.assertIn("actionshark_cache_hit_rate 0.5", lines)
+        self.assertFalse(any("cache_path" in line for line in lines))
+
+    def test_summary_has_rates_and_histogram_means(self):
+        metrics = Metrics()
+        metrics.inc("documents_total", 10, action="run")
+        metrics.observe("upsert_seconds", 0.2)
+        metrics.observe("upsert_seconds", 0.4)
+
+        summary = metrics.summary()
+
+        self.assertEqual(
+            summary["counters"], {'actionshark_documents_total{action="run"}': 10}
+        )
+        self.assertGreater(
+            summary["rates"]['actionshark_documents_total{action="run"}'], 0
+        )
+        self.assertEqual(
+            summary["histograms"]["actionshark_upsert_seconds"],
+            {"count": 2, "sum": 0.6, "mean": 0.3, "max": 0.4},
+        )
+        json.dumps(summary)
+
+    def test_export_writes_both_files(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        metrics = Metrics(
+            prometheus_file=os.path.join(directory, "metrics.prom"),
+            json_file=os.path.join(directory, "metrics.json"),
+        )
+        metrics.inc("requests_total")
+
+        metrics.export()
+
+        with open(metrics.prometheus_file) as f:
+            self.assertIn("actionshark_requests_total 1\n", f.read())
+        with open(metrics.json_file) as f:
+            self.assertEqual(
+                json.load(f)["counters"], {"actionshark_requests_total": 1}
+            )
+        self.assertEqual(
+            sorted(os.listdir(directory)), ["metrics.json", "metrics.prom"]
+        )
+
+    def test_serve_answers_with_the_text_format(self):
+        metrics = Metrics()
+        metrics.inc("requests_total")
+
+        server = metrics.serve(0, host="127.0.0.1")
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        with urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            self.assertTrue(response.headers["Content-Type"].startswith("text/plain"))
+            self.assertEqual(response.read().decode(), metrics.prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,304 @@
+import datetime as dt
+import unittest
+
+from bson import ObjectId
+from pycoshark.mongomodels import Commit, VCSSystem
+
+from actionSHARK.mongo import Artifact, Job, Run, Workflow
+from tests import MongoTestCase
+
+
+def workflow_item(workflow_id: int = 1, **fields) -> dict:
+    item = {
+        "id": workflow_id,
+        "name": "CI",
+        "path": ".github/workflows/ci.yml",
+        "state": "active",
+        "created_at": "2021-01-01T00:00:00.000Z",
+        "updated_at": "2021-01-01T00:00:00.000Z",
+    }
+    item.update(fields)
+    return item
+
+
+def run_item(run_id: int, workflow_id: int = 1, **fields) -> dict:
+    item = {
+        "id": run_id,
+        "name": "CI",
+        "run_number": run_id,
+        "event": "push",
+        "status": "completed",
+        "conclusion": "success",
+        "workflow_id": workflow_id,
+        "pull_requests": [],
+        "created_at": "2021-01-02T10:00:00Z",
+        "updated_at": "2021-01-02T10:05:00Z",
+        "run_attempt": 1,
+        "run_started_at": "2021-01-02T10:00:00Z",
+        "head_sha": "a" * 40,
+        "head_branch": "main",
+        "head_commit": {"message": "fix", "timestamp": "2021-01-02T09:59:00Z"},
+        "head_repository": {"full_name": "octo-org/octo-repo"},
+    }
+    item.update(fields)
+    return item
+
+
+def job_item(job_id: int, run_id: int, **fields) -> dict:
+    item = {
+        "id": job_id,
+        "name": "build",
+        "run_id": run_id,
+        "head_sha": "a" * 40,
+        "run_attempt": 1,
+        "status": "completed",
+        "conclusion": "success",
+        "started_at": "2021-01-02T10:00:00Z",
+        "completed_at": "2021-01-02T10:04:00Z",
+        "steps": [
+            {
+                "name": "checkout",
+                "status": "completed",
+                "conclusion": "success",
+                "number": 1,
+                "started_at": "2021-01-02T10:00:00.000Z",
+                "completed_at": "2021-01-02T10:00:05.000Z",
+            }
+        ],
+        "runner_id": 1,
+        "runner_name": "runner",
+        "runner_group_id": 1,
+        "runner_group_name": "default",
+    }
+    item.update(fields)
+    return item
+
+
+def artifact_item(artifact_id: int, **fields) -> dict:
+    item = {
+        "id": artifact_id,
+        "name": "dist",
+        "size_in_bytes": 1024,
+        "archive_download_url": f"https://api.github.com/artifacts/{artifact_id}/zip",
+        "expired": False,
+        "created_at": "2021-01-02T10:04:00Z",
+        "updated_at": "2021-01-02T10:04:00Z",
+        "expires_at": "2021-04-02T10:04:00Z",
+    }
+    item.update(fields)
+    return item
+
+
+class UpsertTest(MongoTestCase):
+    bulk_write = False
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.mongo.bulk_write = self.bulk_write
+
+    def save_all(self) -> None:
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+        self.mongo.upsert_documents([run_item(10), run_item(11)], "run")
+        self.mongo.upsert_documents([job_item(100, 10), job_item(101, 11)], "job")
+        self.mongo.upsert_documents([artifact_item(1000)], "artifact")
+
+    def test_documents_reference_their_parents(self):
+        self.save_all()
+
+        workflow = Workflow.objects.get(workflow_id=1)
+        run = Run.objects.get(run_id=10)
+        job = Job.objects.get(job_id=100)
+
+        self.assertEqual(run.workflow_id, workflow.id)
+        self.assertEqual(job.run_id, run.id)
+        self.assertEqual(len(job.steps), 1)
+
+    def test_saving_a_page_again_is_idempotent(self):
+        self.save_all()
+        ids = {
+            model: sorted(d.id for d in model.objects)
+            for model in [Workflow, Run, Job, Artifact]
+        }
+
+        self.save_all()
+
+        for model, object_ids in ids.items():
+            self.assertEqual(sorted(d.id for d in model.objects), object_ids)
+
+    def test_upsert_updates_the_document_of_a_github_id(self):
+        self.save_all()
+        run_object_id = Run.objects.get(run_id=10).id
+
+        self.mongo.upsert_documents(
+            [run_item(10, status="in_progress", conclusion=None)], "run"
+        )
+
+        run = Run.objects.get(run_id=10)
+        self.assertEqual(run.id, run_object_id)
+        self.assertEqual(run.status, "in_progress")
+        self.assertEqual(Run.objects.count(), 2)
+
+    def test_repository_missing_in_vcs_system_is_stored_by_url(self):
+        self.save_all()
+
+        artifact = Artifact.objects.get(artifact_id=1000)
+        self.assertEqual(artifact.project_url, self.project_url)
+        self.assertIsNone(artifact.project_id)
+        self.assertEqual(Workflow.objects.get().project_url, self.project_url)
+        self.assertEqual([a["artifact_id"] for a in self.mongo.artifacts()], [1000])
+        self.assertEqual(list(self.mongo.run_ids()), [10, 11])
+
+    def test_repository_in_vcs_system_is_stored_by_project_id(self):
+        project_id = ObjectId()
+        VCSSystem(
+            url=self.project_url, project_id=project_id, repository_type="git"
+        ).save()
+        mongo = self.mongo.for_project(self.project_url)
+
+        mongo.upsert_documents([workflow_item()], "workflow")
+        mongo.upsert_documents([artifact_item(1000)], "artifact")
+
+        self.assertEqual(Workflow.objects.get().project_id, project_id)
+        self.assertEqual(Artifact.objects.get().project_id, project_id)
+        self.assertEqual([a["artifact_id"] for a in mongo.artifacts()], [1000])
+
+    def test_invalid_document_does_not_stop_the_page(self):
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+
+        broken = run_item(12)
+        del broken["head_commit"]
+        self.mongo.upsert_documents([run_item(10), broken, run_item(11)], "run")
+
+        self.assertEqual(sorted(r.run_id for r in Run.objects), [10, 11])
+
+    def test_document_without_id_does_not_stop_the_page(self):
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+
+        broken = run_item(12)
+        del broken["id"]
+        self.mongo.upsert_documents([run_item(10), broken, run_item(11)], "run")
+
+        self.assertEqual(sorted(r.run_id for r in Run.objects), [10, 11])
+
+    def test_triggering_commits_of_a_page_are_resolved_up_front(self):
+        commit = Commit(vcs_system_id=ObjectId(), revision_hash="b" * 40)
+        commit.save()
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+
+        self.mongo.upsert_documents(
+            [
+                run_item(10, head_sha="b" * 40),
+                run_item(11, head_sha="c" * 40),
+                run_item(12, head_sha="b" * 40),
+            ],
+            "run",
+        )
+
+        # mapping the runs found every hash in the cache
+        commits = self.mongo.cache_stats()["commit"]
+        self.assertEqual(commits["misses"], 0)
+        self.assertEqual(commits["size"], 2)
+        self.assertEqual(Run.objects.get(run_id=10).triggering_commit_id, commit.id)
+        self.assertEqual(Run.objects.get(run_id=12).triggering_commit_id, commit.id)
+        self.assertIsNone(Run.objects.get(run_id=11).triggering_commit_id)
+
+
+class BulkUpsertTest(UpsertTest):
+    bulk_write = True
+
+
+class SkipIngestedTest(MongoTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+
+    def test_completed_runs_with_completed_jobs_are_skipped(self):
+        self.mongo.upsert_documents([run_item(10), run_item(11)], "run")
+        self.mongo.upsert_documents([job_item(100, 10)], "job")
+
+        self.assertEqual(list(self.mongo.run_ids(skip_ingested=True)), [11])
+        self.assertEqual(list(self.mongo.run_ids()), [10, 11])
+
+    def test_runs_not_yet_completed_are_fetched(self):
+        self.mongo.upsert_documents([run_item(10, status="in_progress")], "run")
+        self.mongo.upsert_documents([job_item(100, 10)], "job")
+
+        self.assertEqual(list(self.mongo.run_ids(skip_ingested=True)), [10])
+
+    def test_jobs_stored_before_the_run_completed_are_fetched_again(self):
+        self.mongo.upsert_documents([run_item(10)], "run")
+        self.mongo.upsert_documents(
+            [job_item(100, 10), job_item(101, 10, status="in_progress")], "job"
+        )
+
+        self.assertEqual(list(self.mongo.run_ids(skip_ingested=True)), [10])
+
+    def test_runs_with_a_new_attempt_are_fetched(self):
+        self.mongo.upsert_documents([run_item(10, run_attempt=2)], "run")
+        self.mongo.upsert_documents([job_item(100, 10, run_attempt=1)], "job")
+
+        self.assertEqual(list(self.mongo.run_ids(skip_ingested=True)), [10])
+
+
+class RunIdsTest(MongoTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+        self.mongo.upsert_documents(
+            [
+                run_item(12, created_at="2021-01-03T10:00:00Z"),
+                run_item(10),
+                run_item(11, created_at="2021-01-03T10:00:00Z"),
+            ],
+            "run",
+        )
+
+        other = self.mongo.for_project("https://github.com/octo-org/other")
+        other.upsert_documents([workflow_item(2)], "workflow")
+        other.upsert_documents([run_item(20, workflow_id=2)], "run")
+
+    def test_run_ids_of_the_repository_in_ascending_chunks(self):
+        self.assertEqual(list(self.mongo.run_ids(chunk_size=2)), [10, 11, 12])
+
+    def test_run_ids_since_a_time(self):
+        since = dt.datetime(2021, 1, 3)
+
+        self.assertEqual(list(self.mongo.run_ids(since)), [11, 12])
+
+
+class HighWaterMarkTest(MongoTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.mongo.upsert_documents([workflow_item()], "workflow")
+
+    def test_mark_stops_at_the_oldest_open_run(self):
+        self.mongo.upsert_documents(
+            [
+                run_item(10, created_at="2021-01-02T10:00:00Z", status="queued"),
+                run_item(11, created_at="2021-01-03T10:00:00Z"),
+            ],
+            "run",
+        )
+
+        mark = self.mongo.save_high_water_mark()
+
+        self.assertEqual(mark, dt.datetime(2021, 1, 2, 10))
+        self.assertEqual(self.mongo.get_high_water_mark(), mark)
+
+    def test_next_crawl_of_the_same_instance_starts_over(self):
+        self.mongo.upsert_documents(
+            [run_item(10, created_at="2021-01-02T10:00:00Z", status="queued")], "run"
+        )
+        self.mongo.save_high_water_mark()
+
+        # the open run was completed meanwhile
+        self.mongo.upsert_documents(
+            [run_item(11, created_at="2021-01-05T10:00:00Z")], "run"
+        )
+
+        self.assertEqual(self.mongo.save_high_water_mark(), dt.datetime(2021, 1, 5, 10))
+        self.assertIsNone(self.mongo.save_high_water_mark())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from actionSHARK.pipeline import WritePipeline
+
+
+class WritePipelineTest(unittest.TestCase):
+    def test_callbacks_run_in_submit_order(self):
+        # the first page is saved last
+        def save(documents, action):
+            if documents[0] == 0:
+                time.sleep(0.1)
+
+        called = []
+        lock = threading.Lock()
+
+        def on_saved(page):
+            with lock:
+                called.append(page)
+
+        pipeline = WritePipeline(save, writers=4, maxsize=10)
+        for page in range(8):
+            pipeline.submit([page], "run", lambda page=page: on_saved(page))
+        pipeline.drain()
+        pipeline.close()
+
+        self.assertEqual(called, list(range(8)))
+
+    def test_empty_page_only_queues_its_callback(self):
+        saved = []
+        called = []
+
+        pipeline = WritePipeline(lambda d, a: saved.append(d), writers=1)
+        pipeline.submit([1], "job")
+        pipeline.submit([], "job", lambda: called.append(True))
+        pipeline.drain()
+        pipeline.close()
+
+        self.assertEqual(saved, [[1]])
+        self.assertEqual(called, [True])
+
+    def test_drain_raises_the_error_of_a_writer(self):
+        def save(documents, action):
+            if documents == ["bad"]:
+                raise ValueError("mapping failed")
+
+        called = []
+        pipeline = WritePipeline(save, writers=1)
+        pipeline.submit(["bad"], "run", lambda: called.append("bad"))
+        pipeline.submit(["good"], "run", lambda: called.append("good"))
+
+        with self.assertRaises(ValueError):
+            pipeline.drain()
+        pipeline.close()
+
+        # the pages after a failed one are not saved out of order
+        self.assertEqual(called, [])
+
+    def test_submit_raises_after_an_error(self):
+        def save(documents, action):
+            raise RuntimeError("connection lost")
+
+        pipeline = WritePipeline(save, writers=1)
+        pipeline.submit([1], "run")
+        with self.assertRaises(RuntimeError):
+            pipeline.drain()
+
+        with self.assertRaises(RuntimeError):
+            pipeline.submit([2], "run")
+        pipeline.close()
+
+    def test_failed_callback_is_raised_by_drain(self):
+        def fail():
+            raise KeyError("checkpoint")
+
+        pipeline = WritePipeline(lambda d, a: None, writers=1)
+        pipeline.submit([1], "run", fail)
+
+        with self.assertRaises(KeyError):
+            pipeline.drain()
+        pipeline.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import tracemalloc
+import unittest
+
+from actionSHARK.profiling import StageProfiler
+
+
+class StageProfilerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def test_stage_writes_its_reports(self):
+        profiler = StageProfiler(self.directory, top=5)
+
+        with profiler.stage("run"):
+            sorted(range(1000), reverse=True)
+
+        self.assertEqual(sorted(os.listdir(self.directory)), ["run.prof", "run.txt"])
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @unittest.skipIf(
+        sys.version_info >= (3, 12), "cProfile can not profile two threads at once"
+    )
+    def test_overlapping_stages_share_the_allocation_trace(self):
+        profiler = StageProfiler(self.directory, top=5)
+        started = threading.Barrier(2)
+        errors = []
+
+        def stage(name: str, hold: threading.Event) -> None:
+            try:
+                with profiler.stage(name):
+                    started.wait()
+                    hold.wait(5)
+            except BaseException as e:
+                errors.append(e)
+
+        # the first stage ends while the second one still runs
+        first, second = threading.Event(), threading.Event()
+        threads = [
+            threading.Thread(target=stage, args=("first", first)),
+            threading.Thread(target=stage, args=("second", second)),
+        ]
+        for thread in threads:
+            thread.start()
+
+        first.set()
+        threads[0].join()
+        self.assertTrue(tracemalloc.is_tracing())
+
+        second.set()
+        threads[1].join()
+
+        self.assertEqual(errors, [])
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertIn("second.txt", os.listdir(self.directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
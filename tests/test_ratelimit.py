@@ -0,0 +1,92 @@
+import datetime as dt
+import unittest
+
+from actionSHARK.ratelimit import RateGovernor
+from actionSHARK.tokens import TokenPool
+from tests.test_tokens import rate_headers
+
+
+class RateGovernorTest(unittest.TestCase):
+    def test_requests_are_sent_right_away_above_the_reserve(self):
+        governor = RateGovernor(TokenPool(["a"]), reserve=0.2)
+        reset = dt.datetime.now() + dt.timedelta(seconds=100)
+        governor.observe("a", 200, rate_headers(4000, reset))
+
+        self.assertEqual(governor.acquire(), ("a", 0.0))
+
+    def test_requests_below_the_reserve_are_spread_until_the_reset(self):
+        governor = RateGovernor(TokenPool(["a"]), reserve=0.2)
+        reset = dt.datetime.now() + dt.timedelta(seconds=100)
+        governor.observe("a", 200, rate_headers(9, reset, limit=100))
+
+        waits = [governor.acquire()[1] for _ in range(3)]
+
+        # each slot is the time left divided by the remaining requests
+        self.assertAlmostEqual(waits[0], 0, delta=0.5)
+        self.assertAlmostEqual(waits[1], 100 / 9, delta=1)
+        self.assertGreater(waits[2], waits[1])
+        self.assertLess(waits[2], 100)
+
+    def test_reserve_of_one_paces_the_whole_budget(self):
+        governor = RateGovernor(TokenPool(["a"]), reserve=1)
+        reset = dt.datetime.now() + dt.timedelta(seconds=100)
+        governor.observe("a", 200, rate_headers(4000, reset))
+
+        waits = [governor.acquire()[1] for _ in range(2)]
+
+        self.assertAlmostEqual(waits[0], 0, delta=0.5)
+        self.assertAlmostEqual(waits[1], 100 / 4000, delta=0.01)
+
+    def test_primary_limit_rotates_to_the_next_token(self):
+        governor = RateGovernor(TokenPool(["a", "b"]))
+        reset = dt.datetime.now() + dt.timedelta(seconds=600)
+
+        retry = governor.observe("a", 403, rate_headers(0, reset))
+
+        self.assertTrue(retry)
+        self.assertEqual(governor.acquire()[0], "b")
+        self.assertEqual(governor.stalls, 0)
+
+    def test_all_tokens_exhausted_is_a_stall(self):
+        governor = RateGovernor(TokenPool(["a"]))
+        reset = dt.datetime.now() + dt.timedelta(seconds=600)
+
+        self.assertTrue(governor.observe("a", 403, rate_headers(0, reset)))
+        token, wait = governor.acquire()
+
+        self.assertEqual(governor.stalls, 1)
+        self.assertEqual(token, "a")
+        self.assertAlmostEqual(wait, 600, delta=5)
+
+    def test_429_pauses_every_request_for_retry_after(self):
+        governor = RateGovernor(TokenPool(["a", "b"]))
+
+        self.assertTrue(governor.observe("a", 429, {"Retry-After": "30"}))
+        _, wait = governor.acquire()
+
+        self.assertAlmostEqual(wait, 30, delta=1)
+        self.assertEqual(governor.stalls, 1)
+
+    def test_429_without_retry_after_waits_a_minute(self):
+        governor = RateGovernor(TokenPool(["a"]))
+
+        self.assertTrue(governor.observe("a", 429, {}))
+
+        self.assertAlmostEqual(governor.acquire()[1], 60, delta=1)
+
+    def test_secondary_limit_is_detected_from_the_body(self):
+        governor = RateGovernor(TokenPool(["a"]))
+        body = b'{"message": "You have exceeded a secondary rate limit."}'
+
+        self.assertTrue(governor.observe("a", 403, {}, body))
+        self.assertGreater(governor.acquire()[1], 0)
+
+    def test_other_403_responses_are_not_retried(self):
+        governor = RateGovernor(TokenPool(["a"]))
+
+        self.assertFalse(governor.observe("a", 403, {}, b"Resource not accessible"))
+        self.assertEqual(governor.acquire(), ("a", 0.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from actionSHARK.recording import Recorder, read_pages, recorded_repositories, replay
+
+
+class RecordingTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def segments(self, owner: str, repo: str):
+        return sorted(os.listdir(os.path.join(self.directory, owner, repo)))
+
+    def test_recorded_pages_are_replayed_in_action_order(self):
+        recorder = Recorder(self.directory)
+        recorder.record("o", "r", "job", [{"id": 3}])
+        recorder.record("o", "r", "run", [{"id": 2}])
+        recorder.record("o", "r", "workflow", [{"id": 1}])
+        recorder.close()
+
+        saved = []
+        counts = replay(self.directory, "o", "r", lambda d, a: saved.append((a, d)))
+
+        self.assertEqual(recorded_repositories(self.directory), [("o", "r")])
+        self.assertEqual(
+            saved,
+            [("workflow", [{"id": 1}]), ("run", [{"id": 2}]), ("job", [{"id": 3}])],
+        )
+        self.assertEqual(counts, {"workflow": 1, "artifact": 0, "run": 1, "job": 1})
+
+    def test_segments_rotate_at_their_compressed_size(self):
+        recorder = Recorder(self.directory, segment_size=4096)
+        for i in range(50):
+            recorder.record("o", "r", "job", [{"id": i, "log": os.urandom(256).hex()}])
+        recorder.close()
+
+        segments = self.segments("o", "r")
+        self.assertGreater(len(segments), 1)
+        for name in segments[:-1]:
+            size = os.path.getsize(os.path.join(self.directory, "o", "r", name))
+            self.assertLess(size, 4096 + 2048)
+
+        pages = list(read_pages(self.directory, "o", "r", "job"))
+        self.assertEqual([p[0]["id"] for p in pages], list(range(50)))
+
+    def test_close_repository_only_closes_its_segments(self):
+        recorder = Recorder(self.directory)
+        recorder.record("o", "a", "run", [{"id": 1}])
+        recorder.record("o", "b", "run", [{"id": 2}])
+
+        recorder.close_repository("o", "a")
+        recorder.record("o", "b", "run", [{"id": 3}])
+
+        # a closed repository continues in a new segment
+        recorder.record("o", "a", "run", [{"id": 4}])
+        recorder.close()
+
+        self.assertEqual(len(self.segments("o", "a")), 2)
+        self.assertEqual(len(self.segments("o", "b")), 1)
+        self.assertEqual(
+            [p[0]["id"] for p in read_pages(self.directory, "o", "a", "run")], [1, 4]
+        )
+
+    def test_truncated_segment_keeps_the_complete_pages(self):
+        recorder = Recorder(self.directory)
+        for i in range(3):
+            recorder.record("o", "r", "run", [{"id": i}])
+
+        # the crawl stopped without closing the segment
+        path = os.path.join(self.directory, "o", "r", self.segments("o", "r")[0])
+        with open(path, "rb") as f:
+            data = f.read()
+        recorder.close()
+        with open(path, "wb") as f:
+            f.write(data)
+
+        pages = list(read_pages(self.directory, "o", "r", "run"))
+        self.assertEqual([p[0]["id"] for p in pages], [0, 1, 2])
+
+
+if __name__ == "__main__":
+    unittest.main()
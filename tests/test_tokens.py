@@ -0,0 +1,70 @@
+import datetime as dt
+import unittest
+
+from actionSHARK.tokens import TokenPool
+
+
+def rate_headers(remaining: int, reset: dt.datetime, limit: int = 5000) -> dict:
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(int(reset.timestamp())),
+    }
+
+
+class TokenPoolTest(unittest.TestCase):
+    def test_without_tokens_requests_are_unauthenticated(self):
+        pool = TokenPool([None, ""])
+
+        self.assertEqual(pool.tokens, [None])
+        self.assertEqual(pool.acquire(), (None, 0.0))
+
+    def test_duplicate_tokens_are_dropped(self):
+        self.assertEqual(TokenPool(["a", "b", "a"]).tokens, ["a", "b"])
+
+    def test_acquire_rotates_to_the_token_with_the_most_budget(self):
+        reset = dt.datetime.now() + dt.timedelta(hours=1)
+        pool = TokenPool(["a", "b"])
+        pool.update("a", rate_headers(10, reset))
+        pool.update("b", rate_headers(12, reset))
+
+        tokens = [pool.acquire()[0] for _ in range(4)]
+
+        self.assertEqual(tokens[:2], ["b", "b"])
+        self.assertCountEqual(tokens[2:], ["a", "b"])
+        self.assertEqual(
+            pool.budget("a")["remaining"] + pool.budget("b")["remaining"], 18
+        )
+
+    def test_exhausted_pool_waits_for_the_earliest_reset(self):
+        now = dt.datetime.now()
+        pool = TokenPool(["a", "b"])
+
+        self.assertFalse(pool.exhaust("a", now + dt.timedelta(seconds=600)))
+        self.assertTrue(pool.exhaust("b", now + dt.timedelta(seconds=300)))
+
+        token, wait = pool.acquire()
+        self.assertEqual(token, "b")
+        self.assertAlmostEqual(wait, 300, delta=5)
+
+    def test_passed_reset_restores_the_budget(self):
+        pool = TokenPool(["a"])
+        pool.update("a", rate_headers(100, dt.datetime.now(), limit=100))
+        pool.exhaust("a", dt.datetime.now() - dt.timedelta(seconds=1))
+
+        self.assertEqual(pool.acquire(), ("a", 0.0))
+        self.assertEqual(pool.budget("a")["remaining"], 99)
+
+    def test_removed_tokens_are_not_handed_out(self):
+        pool = TokenPool(["a", "b"])
+        pool.remove("a")
+
+        self.assertEqual(pool.acquire()[0], "b")
+
+        pool.remove("b")
+        with self.assertRaises(ValueError):
+            pool.acquire()
+
+
+if __name__ == "__main__":
+    unittest.main()